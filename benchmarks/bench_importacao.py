@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark do tempo de inicialização das etapas do pipeline.
+
+Para cada módulo (scripts/*.py e run_pipeline.py) mede, em um interpretador
+novo com `python -X importtime`, o tempo cumulativo de importação do módulo e
+verifica se alguma dependência pesada (pingouin, scipy, matplotlib, ...) foi
+carregada na importação; essas bibliotecas devem ser importadas apenas nas
+funções que as usam. Mede também o tempo de parede de `--help` de cada script.
+
+Cada medida é a menor de várias repetições e é comparada a um orçamento em
+milissegundos. O resultado é gravado em JSON e o script termina com código 1 se
+algum orçamento for ultrapassado ou alguma dependência pesada for importada.
+
+Uso:
+    python benchmarks/bench_importacao.py --repeticoes 5 --saida bench_importacao.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Set, Tuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_SCRIPTS = os.path.join(RAIZ, 'scripts')
+
+# Dependências que nenhuma etapa deve carregar apenas por ser importada
+DEPENDENCIAS_PESADAS = ('pingouin', 'scipy', 'matplotlib', 'seaborn', 'statsmodels', 'sklearn', 'openpyxl')
+
+# (módulo, pasta onde ele está, orçamento da importação em ms, orçamento de --help em ms)
+# Os orçamentos das etapas incluem a importação do pandas, usado por todas elas
+MODULOS = [
+    ('eventos', PASTA_SCRIPTS, 100, None),
+    ('armazenamento', PASTA_SCRIPTS, 1000, None),
+    ('process_all_files', PASTA_SCRIPTS, 1000, 1500),
+    ('combine_user_data', PASTA_SCRIPTS, 1000, 1500),
+    ('analyze_combined_data', PASTA_SCRIPTS, 1000, 1500),
+    ('banco_participantes', PASTA_SCRIPTS, 1000, 1500),
+    ('anova', PASTA_SCRIPTS, 1000, 1500),
+    ('analise_pressupostos', PASTA_SCRIPTS, 1000, 1500),
+    ('run_pipeline', RAIZ, 200, 300),
+]
+
+def medir_importacao(modulo: str, pasta: str, pasta_trabalho: str) -> Tuple[float, Set[str]]:
+    """
+    Importa o módulo em um interpretador novo com -X importtime.
+
+    Args:
+        modulo: Nome do módulo
+        pasta: Pasta do módulo (incluída no PYTHONPATH)
+        pasta_trabalho: Diretório de trabalho do interpretador (recebe os logs criados na importação)
+
+    Returns:
+        Tupla (tempo cumulativo de importação em ms, pacotes de nível superior importados)
+    """
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                               cwd=pasta_trabalho, env={**os.environ, 'PYTHONPATH': pasta},
+                               capture_output=True, text=True, check=True)
+    cumulativo = None
+    pacotes = set()
+    # Linhas no formato "import time: self [us] | cumulative | imported package"
+    for linha in resultado.stderr.splitlines():
+        partes = linha.split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        nome = partes[2].strip()
+        pacotes.add(nome.split('.')[0])
+        if nome == modulo:
+            cumulativo = int(partes[1]) / 1000
+    return cumulativo, pacotes
+
+def medir_ajuda(modulo: str, pasta: str, pasta_trabalho: str) -> float:
+    """Tempo de parede, em ms, de `python <modulo>.py --help`."""
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(pasta, f'{modulo}.py'), '--help'],
+                   cwd=pasta_trabalho, stdout=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - inicio) * 1000
+
+def executar(repeticoes: int, pasta_trabalho: str) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Mede todos os módulos e compara cada medida com seu orçamento.
+
+    Args:
+        repeticoes: Número de repetições de cada medida (vale a menor)
+        pasta_trabalho: Diretório de trabalho dos interpretadores medidos
+
+    Returns:
+        Tupla (medidas por módulo, lista de violações encontradas)
+    """
+    resultados = {}
+    violacoes = []
+    for modulo, pasta, orcamento_importacao, orcamento_ajuda in MODULOS:
+        medidas = [medir_importacao(modulo, pasta, pasta_trabalho) for _ in range(repeticoes)]
+        importacao_ms = min(cumulativo for cumulativo, _ in medidas)
+        pesadas = sorted(set(DEPENDENCIAS_PESADAS).intersection(set().union(*(pacotes for _, pacotes in medidas))))
+        resultado = {
+            'importacao_ms': round(importacao_ms, 1),
+            'orcamento_importacao_ms': orcamento_importacao,
+            'dependencias_pesadas': pesadas,
+        }
+        if importacao_ms > orcamento_importacao:
+            violacoes.append(f"{modulo}: importação em {importacao_ms:.0f} ms (orçamento: {orcamento_importacao} ms)")
+        if pesadas:
+            violacoes.append(f"{modulo}: importa {', '.join(pesadas)} ao ser carregado")
+
+        if orcamento_ajuda is not None:
+            ajuda_ms = min(medir_ajuda(modulo, pasta, pasta_trabalho) for _ in range(repeticoes))
+            resultado['ajuda_ms'] = round(ajuda_ms, 1)
+            resultado['orcamento_ajuda_ms'] = orcamento_ajuda
+            if ajuda_ms > orcamento_ajuda:
+                violacoes.append(f"{modulo}: --help em {ajuda_ms:.0f} ms (orçamento: {orcamento_ajuda} ms)")
+
+        resultados[modulo] = resultado
+        print(f"{modulo:<24} importação {importacao_ms:8.1f} ms"
+              + (f"  --help {resultado['ajuda_ms']:8.1f} ms" if 'ajuda_ms' in resultado else ' ' * 24)
+              + (f"  pesadas: {', '.join(pesadas)}" if pesadas else ''))
+    return resultados, violacoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de inicialização das etapas do pipeline TOL.")
+    parser.add_argument('--repeticoes', type=int, default=5, help="Repetições de cada medida (padrão: 5)")
+    parser.add_argument('--saida', default='bench_importacao.json', help="Arquivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    # Os interpretadores rodam em uma pasta temporária: run_pipeline.py cria seu log ao ser importado
+    with tempfile.TemporaryDirectory(prefix='bench_importacao_') as pasta_trabalho:
+        resultados, violacoes = executar(args.repeticoes, pasta_trabalho)
+    relatorio = {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'repeticoes': args.repeticoes,
+        'resultados': resultados,
+        'violacoes': violacoes,
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em: {args.saida}")
+
+    for violacao in violacoes:
+        print(f"ORÇAMENTO EXCEDIDO - {violacao}")
+    sys.exit(1 if violacoes else 0)
+
+if __name__ == '__main__':
+    main()
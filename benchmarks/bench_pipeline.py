@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ponta a ponta do pipeline em escala configurável.
+
+Gera sessões sintéticas (ver gerar_sessoes_sinteticas.py) em uma pasta de
+trabalho e executa as quatro etapas do pipeline, cada uma em seu próprio
+processo, como em run_pipeline.py. Para cada etapa registra o tempo de parede,
+o tempo de CPU, o número de linhas lidas, linhas/s, o pico de memória
+residente (RSS) e o código de retorno, gravando tudo em um arquivo JSON.
+
+Uso:
+    python benchmarks/bench_pipeline.py --participantes 10000 --saida bench_pipeline.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from gerar_sessoes_sinteticas import gerar_sessoes
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (script, pasta lida pela etapa, padrão dos arquivos, linhas de cabeçalho por arquivo)
+ETAPAS = [
+    ("process_all_files.py", "dados_originais", "*.csv", 1),
+    ("combine_user_data.py", "01_dados_processados", "*.csv", 1),
+    ("analyze_combined_data.py", "02_dados_combinados", "*_combined.csv", 2),
+    ("anova.py", "03_analises_combinadas", "todos_usuarios_analises.csv", 2),
+]
+
+def contar_linhas(pasta: str, padrao: str, linhas_cabecalho: int) -> int:
+    """
+    Conta as linhas de dados dos arquivos de uma pasta.
+
+    Args:
+        pasta: Pasta dos arquivos
+        padrao: Padrão glob dos arquivos
+        linhas_cabecalho: Linhas de cabeçalho a descontar em cada arquivo
+
+    Returns:
+        Número total de linhas de dados
+    """
+    total = 0
+    for caminho in glob.glob(os.path.join(pasta, padrao)):
+        with open(caminho, 'rb') as f:
+            total += max(0, sum(1 for _ in f) - linhas_cabecalho)
+    return total
+
+def executar_etapa(script: str, pasta_trabalho: str, argumentos: List[str]) -> Dict:
+    """
+    Executa uma etapa em um processo filho e coleta as medidas de recursos.
+
+    Args:
+        script: Nome do script em scripts/
+        pasta_trabalho: Diretório de trabalho da etapa
+        argumentos: Argumentos extras do script
+
+    Returns:
+        Dicionário com tempo de parede, CPU, pico de RSS e código de retorno
+    """
+    with tempfile.TemporaryFile() as erros:
+        inicio = time.perf_counter()
+        processo = subprocess.Popen(
+            [sys.executable, os.path.join(RAIZ, 'scripts', script)] + argumentos,
+            cwd=pasta_trabalho, stdout=subprocess.DEVNULL, stderr=erros
+        )
+        # wait4 devolve os recursos usados apenas por este filho (e pelos netos que ele recolheu)
+        _, status, uso = os.wait4(processo.pid, 0)
+        segundos = time.perf_counter() - inicio
+        processo.returncode = os.waitstatus_to_exitcode(status)
+        erros.seek(0)
+        saida_erro = erros.read().decode('utf-8', 'replace')
+
+    return {
+        'segundos': round(segundos, 4),
+        'cpu_segundos': round(uso.ru_utime + uso.ru_stime, 4),
+        'pico_rss_kib': uso.ru_maxrss,  # KiB no Linux
+        'codigo_retorno': processo.returncode,
+        'erro': saida_erro[-2000:] if processo.returncode != 0 else '',
+    }
+
+def executar_benchmark(participantes: int, trials: int, semente: int, pasta_trabalho: str,
+                       jobs: int) -> Dict:
+    """
+    Gera os dados sintéticos e executa as quatro etapas medindo cada uma.
+
+    Args:
+        participantes: Número de participantes sintéticos
+        trials: Problemas por sessão
+        semente: Semente do gerador
+        pasta_trabalho: Pasta onde os dados e as saídas são gravados
+        jobs: Valor de --jobs repassado à etapa de processamento
+
+    Returns:
+        Relatório com as medidas de cada etapa
+    """
+    inicio = time.perf_counter()
+    linhas_brutas = gerar_sessoes(os.path.join(pasta_trabalho, 'dados_originais'), participantes, trials, semente)
+    relatorio = {
+        'participantes': participantes,
+        'linhas_brutas': linhas_brutas,
+        'segundos_geracao': round(time.perf_counter() - inicio, 4),
+        'etapas': [],
+    }
+
+    for script, pasta, padrao, cabecalho in ETAPAS:
+        linhas = contar_linhas(os.path.join(pasta_trabalho, pasta), padrao, cabecalho)
+        argumentos = ['--jobs', str(jobs)] if script == 'process_all_files.py' else []
+        medida = executar_etapa(script, pasta_trabalho, argumentos)
+        medida['etapa'] = script
+        medida['linhas'] = linhas
+        medida['linhas_por_segundo'] = round(linhas / medida['segundos'], 1) if medida['segundos'] > 0 else None
+        relatorio['etapas'].append(medida)
+
+        print(f"{script:<28} {medida['segundos']:9.2f} s  {medida['linhas']:>10} linhas  "
+              f"{medida['linhas_por_segundo'] or 0:>12} linhas/s  {medida['pico_rss_kib'] / 1024:8.1f} MiB")
+        if medida['codigo_retorno'] != 0:
+            print(f"Etapa {script} falhou (código {medida['codigo_retorno']}); etapas seguintes não executadas")
+            break
+
+    return relatorio
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta do pipeline TOL.")
+    parser.add_argument('--participantes', type=int, default=100, help="Número de participantes (padrão: 100)")
+    parser.add_argument('--trials', type=int, default=12, help="Problemas por sessão (padrão: 12)")
+    parser.add_argument('--semente', type=int, default=42, help="Semente do gerador (padrão: 42)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Processos da etapa de processamento (padrão: número de CPUs)")
+    parser.add_argument('--pasta-trabalho', help="Pasta de trabalho (padrão: diretório temporário removido ao final)")
+    parser.add_argument('--saida', default='bench_pipeline.json', help="Arquivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    pasta_trabalho = args.pasta_trabalho or tempfile.mkdtemp(prefix='bench_pipeline_')
+    try:
+        relatorio = executar_benchmark(args.participantes, args.trials, args.semente, pasta_trabalho, args.jobs)
+    finally:
+        if not args.pasta_trabalho:
+            shutil.rmtree(pasta_trabalho, ignore_errors=True)
+
+    relatorio['pico_rss_total_kib'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    relatorio['python'] = platform.python_version()
+    relatorio['plataforma'] = platform.platform()
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em: {args.saida}")
+
+if __name__ == '__main__':
+    main()
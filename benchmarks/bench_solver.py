@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks do solver de movimentos mínimos (scripts/process_all_files.py).
+
+Gera, de forma determinística a partir de uma semente, pares válidos de estado
+inicial/objetivo para várias alturas e quantidades de bolas e mede:
+- string_para_estado e movimentos_possiveis
+- resoluções individuais a frio (tabelas de distâncias descartadas a cada puzzle)
+- resolução em lote (resolver_puzzles)
+- consultas ao cache persistente já preenchido
+
+O resultado (tempo, puzzles/s e pico de memória de cada benchmark) é gravado em
+um arquivo JSON que pode ser comparado entre commits. Roda offline, apenas com
+a biblioteca padrão e as dependências do próprio pipeline.
+
+Uso:
+    python benchmarks/bench_solver.py --puzzles 2000 --semente 42 --saida bench_solver.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'scripts'))
+
+import process_all_files as solver  # noqa: E402
+
+BOLAS = 'ABCDEFGH'
+
+def gerar_estado(rng: random.Random, bolas: str, altura_max: int, num_pinos: int = 3) -> str:
+    """
+    Distribui as bolas aleatoriamente entre os pinos, respeitando a altura máxima.
+
+    Args:
+        rng: Gerador de números aleatórios
+        bolas: Bolas a distribuir
+        altura_max: Altura máxima de cada pino
+        num_pinos: Número de pinos
+
+    Returns:
+        Estado no formato '|A|BC||'
+    """
+    pinos = [''] * num_pinos
+    for bola in rng.sample(bolas, len(bolas)):
+        livres = [i for i, pino in enumerate(pinos) if len(pino) < altura_max]
+        pinos[rng.choice(livres)] += bola
+    return '|' + '|'.join(pinos) + '|'
+
+def gerar_puzzles(quantidade: int, semente: int, alturas: Tuple[int, ...] = (2, 3, 4),
+                  num_bolas: Tuple[int, ...] = (3, 4, 5)) -> List[Tuple[str, str, int]]:
+    """
+    Gera puzzles válidos (estado inicial, estado objetivo, size) de forma determinística.
+
+    Args:
+        quantidade: Número de puzzles
+        semente: Semente do gerador aleatório
+        alturas: Alturas máximas sorteadas
+        num_bolas: Quantidades de bolas sorteadas (limitadas à capacidade dos pinos)
+
+    Returns:
+        Lista de puzzles
+    """
+    rng = random.Random(semente)
+    puzzles = []
+    for _ in range(quantidade):
+        altura = rng.choice(alturas)
+        bolas = BOLAS[:min(rng.choice(num_bolas), 3 * altura)]
+        puzzles.append((gerar_estado(rng, bolas, altura), gerar_estado(rng, bolas, altura), altura))
+    return puzzles
+
+def medir(nome: str, quantidade: int, funcao: Callable[[], None]) -> Dict:
+    """
+    Executa a função duas vezes: uma para medir o tempo de parede e outra, sob
+    tracemalloc, para medir o pico de memória (o rastreamento distorce o tempo).
+
+    Args:
+        nome: Nome do benchmark
+        quantidade: Número de puzzles processados pela função
+        funcao: Função a medir
+
+    Returns:
+        Dicionário com as medidas
+    """
+    inicio = time.perf_counter()
+    funcao()
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    resultado = {
+        'puzzles': quantidade,
+        'segundos': round(segundos, 6),
+        'puzzles_por_segundo': round(quantidade / segundos, 1) if segundos > 0 else None,
+        'pico_memoria_bytes': pico,
+    }
+    print(f"{nome:<24} {segundos:9.4f} s  {resultado['puzzles_por_segundo']:>12} puzzles/s  "
+          f"{pico / 1024:10.1f} KiB")
+    return resultado
+
+def commit_atual() -> str:
+    """Retorna o hash do commit atual, ou '' fora de um repositório git."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+def executar(quantidade: int, semente: int, quantidade_a_frio: int) -> Dict[str, Dict]:
+    """
+    Executa todos os benchmarks sobre o mesmo conjunto de puzzles.
+
+    Args:
+        quantidade: Número de puzzles gerados
+        semente: Semente do gerador
+        quantidade_a_frio: Número de puzzles resolvidos a frio (cada um reconstrói sua tabela)
+
+    Returns:
+        Dicionário com as medidas de cada benchmark
+    """
+    puzzles = gerar_puzzles(quantidade, semente)
+    distintos = set(puzzles)
+    resultados = {}
+
+    def converter_estados():
+        for inicio, objetivo, _ in puzzles:
+            solver.string_para_estado(inicio)
+            solver.string_para_estado(objetivo)
+
+    estados = [(solver.string_para_estado(inicio), altura) for inicio, _, altura in puzzles]
+
+    def gerar_movimentos():
+        for estado, altura in estados:
+            solver.movimentos_possiveis(estado, altura)
+
+    def resolver_a_frio():
+        for inicio, objetivo, altura in puzzles[:quantidade_a_frio]:
+            solver._tabelas_distancias.clear()
+            solver.resolver_puzzle(inicio, objetivo, altura)
+
+    def resolver_em_lote():
+        solver._tabelas_distancias.clear()
+        solver.resolver_puzzles(distintos)
+
+    resultados['string_para_estado'] = medir('string_para_estado', len(puzzles), converter_estados)
+    resultados['movimentos_possiveis'] = medir('movimentos_possiveis', len(puzzles), gerar_movimentos)
+    resultados['resolucao_individual'] = medir('resolucao_individual', min(quantidade_a_frio, len(puzzles)), resolver_a_frio)
+    resultados['resolucao_em_lote'] = medir('resolucao_em_lote', len(distintos), resolver_em_lote)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        cache = solver.CacheSolver(os.path.join(pasta, 'cache.sqlite'))
+        solver.resolver_puzzles(distintos, cache)
+        cache.salvar()
+        cache = solver.CacheSolver(cache.caminho)
+
+        def consultar_cache():
+            for inicio, objetivo, altura in puzzles:
+                solver.resolver_puzzle(inicio, objetivo, altura, cache)
+
+        resultados['acertos_cache'] = medir('acertos_cache', len(puzzles), consultar_cache)
+        resultados['acertos_cache']['taxa_acertos'] = round(cache.acertos / max(1, cache.acertos + cache.falhas), 4)
+
+    return resultados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do solver de movimentos mínimos.")
+    parser.add_argument('--puzzles', type=int, default=2000, help="Número de puzzles gerados (padrão: 2000)")
+    parser.add_argument('--puzzles-a-frio', type=int, default=100,
+                        help="Número de puzzles resolvidos a frio, reconstruindo a tabela (padrão: 100)")
+    parser.add_argument('--semente', type=int, default=42, help="Semente do gerador de puzzles (padrão: 42)")
+    parser.add_argument('--saida', default='bench_solver.json', help="Arquivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    relatorio = {
+        'commit': commit_atual(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'puzzles': args.puzzles,
+        'semente': args.semente,
+        'resultados': executar(args.puzzles, args.semente, args.puzzles_a_frio),
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em: {args.saida}")
+
+if __name__ == '__main__':
+    main()
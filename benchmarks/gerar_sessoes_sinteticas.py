@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Gerador de sessões sintéticas da Torre de Londres no formato bruto do PEBL.
+
+Cria, para cada participante, os arquivos T0_[ID]_Tol.csv, T1_[ID]_Tol.csv e
+T2_[ID]_Tol.csv com as mesmas colunas dos dados originais (sub, trial, size,
+current, end, step, reset, tries, score, abstime, trialtime, clicktime, done).
+Todos os participantes resolvem o mesmo conjunto fixo de problemas, como no
+teste real. Cada participante simulado escolhe um movimento ótimo com uma
+probabilidade que cresce de T0 para T2 e, caso contrário, um movimento
+aleatório; trials que excedem o limite de passos são reiniciados uma vez.
+
+Uso:
+    python benchmarks/gerar_sessoes_sinteticas.py --participantes 10000 --pasta dados_originais
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Tuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'scripts'))
+
+import process_all_files as solver  # noqa: E402
+
+COLUNAS = ['sub', 'trial', 'size', 'current', 'end', 'step', 'reset', 'tries',
+           'score', 'abstime', 'trialtime', 'clicktime', 'done']
+BOLAS = 'ABC'
+ALTURA_MAX = 3
+NUM_TESTES = 3
+MAX_PASSOS_TENTATIVA = 20
+
+def estado_para_string(estado: List[List[str]]) -> str:
+    """Converte um estado para o formato '|A|BC||' usado pelo PEBL."""
+    return '|' + '|'.join(''.join(pino) for pino in estado) + '|'
+
+@lru_cache(maxsize=None)
+def distancia_ate(estado: str, objetivo: str) -> int:
+    """Movimentos mínimos entre dois estados no formato do PEBL, memorizados."""
+    return solver.movimentos_minimos(solver.string_para_estado(estado), solver.string_para_estado(objetivo), ALTURA_MAX)
+
+def gerar_problemas(rng: random.Random, num_trials: int) -> List[Tuple[str, str]]:
+    """
+    Sorteia o conjunto fixo de problemas (estado inicial, objetivo) com 1 a 7 movimentos mínimos.
+
+    Args:
+        rng: Gerador de números aleatórios
+        num_trials: Número de problemas por sessão
+
+    Returns:
+        Lista de problemas
+    """
+    problemas = []
+    while len(problemas) < num_trials:
+        estados = []
+        for _ in range(2):
+            pinos = [[] for _ in range(solver.NUM_PINOS)]
+            for bola in rng.sample(BOLAS, len(BOLAS)):
+                livres = [i for i, pino in enumerate(pinos) if len(pino) < ALTURA_MAX]
+                pinos[rng.choice(livres)].append(bola)
+            estados.append(pinos)
+        if 1 <= solver.movimentos_minimos(estados[0], estados[1], ALTURA_MAX) <= 7:
+            problemas.append((estado_para_string(estados[0]), estado_para_string(estados[1])))
+    return problemas
+
+def simular_sessao(rng: random.Random, participante: int, problemas: List[Tuple[str, str]],
+                   habilidade: float) -> List[list]:
+    """
+    Simula uma sessão completa de um participante.
+
+    Args:
+        rng: Gerador de números aleatórios
+        participante: ID do participante (coluna sub)
+        problemas: Conjunto fixo de problemas
+        habilidade: Probabilidade de escolher um movimento ótimo
+
+    Returns:
+        Linhas da sessão, na ordem das COLUNAS
+    """
+    linhas = []
+    tempo_absoluto = 0
+    for trial, (inicio, fim) in enumerate(problemas):
+        for tentativa in (1, 2):
+            estado = solver.string_para_estado(inicio)
+            tempo_trial = 0
+            linhas.append([participante, trial, ALTURA_MAX, inicio, fim, 0, int(tentativa > 1),
+                           tentativa, 0, tempo_absoluto, 0, 0, 0])
+            concluido = False
+            for passo in range(1, MAX_PASSOS_TENTATIVA + 1):
+                proximos = solver.movimentos_possiveis(estado, ALTURA_MAX)
+                if rng.random() < habilidade:
+                    estado = min(proximos, key=lambda e: distancia_ate(estado_para_string(e), fim))
+                else:
+                    estado = rng.choice(proximos)
+                clique = int(rng.lognormvariate(7.0, 0.5))
+                tempo_trial += clique
+                tempo_absoluto += clique
+                atual = estado_para_string(estado)
+                concluido = atual == fim
+                linhas.append([participante, trial, ALTURA_MAX, atual, fim, passo, 0,
+                               tentativa, int(concluido), tempo_absoluto, tempo_trial, clique, int(concluido)])
+                if concluido:
+                    break
+            if concluido:
+                break
+    return linhas
+
+def gerar_sessoes(pasta: str, participantes: int, num_trials: int = 12, semente: int = 42,
+                  primeiro_id: int = 1000) -> int:
+    """
+    Grava os arquivos T0/T1/T2 de todos os participantes.
+
+    Args:
+        pasta: Pasta de destino (ex: dados_originais)
+        participantes: Número de participantes
+        num_trials: Número de problemas por sessão
+        semente: Semente do gerador
+        primeiro_id: ID do primeiro participante
+
+    Returns:
+        Número total de linhas gravadas
+    """
+    rng = random.Random(semente)
+    problemas = gerar_problemas(rng, num_trials)
+    Path(pasta).mkdir(parents=True, exist_ok=True)
+    total_linhas = 0
+    for participante in range(primeiro_id, primeiro_id + participantes):
+        habilidade_base = rng.uniform(0.3, 0.8)
+        for teste in range(NUM_TESTES):
+            habilidade = min(0.95, habilidade_base + 0.05 * teste)
+            linhas = simular_sessao(rng, participante, problemas, habilidade)
+            caminho = os.path.join(pasta, f"T{teste}_{participante}_Tol.csv")
+            with open(caminho, 'w', encoding='utf-8', newline='') as f:
+                escritor = csv.writer(f)
+                escritor.writerow(COLUNAS)
+                escritor.writerows(linhas)
+            total_linhas += len(linhas)
+    return total_linhas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera sessões sintéticas da Torre de Londres no formato do PEBL.")
+    parser.add_argument('--participantes', type=int, default=100, help="Número de participantes (padrão: 100)")
+    parser.add_argument('--trials', type=int, default=12, help="Problemas por sessão (padrão: 12)")
+    parser.add_argument('--semente', type=int, default=42, help="Semente do gerador (padrão: 42)")
+    parser.add_argument('--pasta', default='dados_originais', help="Pasta de destino (padrão: dados_originais)")
+    args = parser.parse_args(argv)
+
+    total_linhas = gerar_sessoes(args.pasta, args.participantes, args.trials, args.semente)
+    print(f"{args.participantes * NUM_TESTES} arquivos ({total_linhas} linhas) gravados em '{args.pasta}'")
+
+if __name__ == '__main__':
+    main()
@@ -14,11 +14,31 @@ Data: 2025
 
 import os
 import sys
+import argparse
+import contextlib
+import cProfile
+from datetime import datetime
+import functools
+import glob
+import hashlib
+import importlib.util
+import io
+import json
+import signal
+import sqlite3
 import subprocess
+import tempfile
+import tracemalloc
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import time
 
+try:
+    import resource
+except ImportError:  # Windows: sem medidas de CPU e memória dos processos filhos
+    resource = None
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,17 +49,296 @@ logging.basicConfig(
     ]
 )
 
-def run_script(script_name, description):
+SCRIPTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts')
+REQUIRED_SCRIPTS = [
+    "process_all_files.py",
+    "combine_user_data.py",
+    "analyze_combined_data.py",
+    "anova.py"
+]
+
+# Hash de cada script de REQUIRED_SCRIPTS no momento em que seu módulo foi importado (ver import_stage)
+LOADED_SCRIPT_HASHES = {}
+
+# Pastas e arquivos usados pelo modo incremental
+RAW_FOLDER = "dados_originais"
+PROCESSED_FOLDER = "01_dados_processados"
+COMBINED_FOLDER = "02_dados_combinados"
+ANALYSES_PATH = os.path.join("03_analises_combinadas", "todos_usuarios_analises.csv")
+ANOVA_OUTPUT = "resultados_anova_medidas_repetidas.xlsx"
+DATABASE_PATH = "participantes.sqlite"  # Banco SQLite dos participantes (--database)
+TABLE_FORMATS = ('csv', 'parquet')  # Formatos dos intermediários (--format); parquet requer pyarrow
+COMBINED_LAYOUTS = ('largo', 'longo')  # Layouts de 02_dados_combinados (--layout)
+MANIFEST_PATH = ".manifesto_pipeline.json"
+MANIFEST_VERSION = 1
+
+# Instrumentação
+REPORT_PATH = "pipeline_report.json"  # Relatório JSON gravado ao lado de pipeline_execution.log
+PROFILE_FOLDER = "perfis_pipeline"  # Perfis cProfile de cada etapa (--profile)
+
+# Acompanhamento das etapas executadas como subprocessos
+STALL_TIMEOUT = 120.0  # Segundos sem mensagens de progresso até a etapa ser considerada travada
+STALL_CPU_FRACTION = 0.05  # Fração de uma CPU usada no intervalo sem progresso que indica uma etapa lenta, não travada
+TIME_BUDGET_FACTOR = 3.0  # Múltiplo do tempo estimado da etapa além do qual ela é encerrada
+MIN_TIME_BUDGET = 60.0  # Menor orçamento de tempo de uma etapa, em segundos
+PROGRESS_LOG_INTERVAL = 10.0  # Segundos entre duas mensagens de progresso no log
+
+# Logs
+EVENTS_PATH = "pipeline_events.jsonl"  # Log de eventos em JSON lines (pipeline e etapas)
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+STAGE_NAMES = ('processamento', 'combinacao', 'analise', 'banco', 'anova', 'streaming')  # Etapas aceitas em --log-level
+OUTPUT_TAIL_LINES = 20  # Linhas finais da saída de cada etapa registradas no log (todas em DEBUG)
+
+# Modo watch
+WATCH_INTERVAL = 2.0   # Segundos entre duas verificações da pasta de dados originais
+WATCH_DEBOUNCE = 5.0   # Segundos sem novas alterações antes de processar uma rajada de arquivos
+
+def maxrss_kib(value):
+    """Converte ru_maxrss para KiB (o macOS informa bytes; o Linux, KiB)."""
+    return value // 1024 if sys.platform == 'darwin' else value
+
+def process_tree_cpu_seconds(pid):
+    """
+    Tempo de CPU (usuário + sistema) já usado por um processo em execução e por
+    todos os seus descendentes, lido de /proc. Ao contrário de os.wait4, não
+    espera o processo terminar.
+    
+    Args:
+        pid: PID do processo
+        
+    Returns:
+        Segundos de CPU, ou None se /proc não estiver disponível (ex: macOS)
+    """
+    try:
+        entries = [entry for entry in os.listdir('/proc') if entry.isdigit()]
+        ticks = os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, AttributeError):
+        return None
+    parents, cpu_ticks = {}, {}
+    for entry in entries:
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                # O nome do comando (entre parênteses) pode conter espaços
+                fields = f.read().rsplit(b')', 1)[1].split()
+        except (OSError, IndexError):
+            continue  # Processo encerrado durante a leitura
+        # Campos após o nome: estado, ppid, ..., utime, stime, cutime e cstime (filhos já recolhidos)
+        parents[int(entry)] = int(fields[1])
+        cpu_ticks[int(entry)] = sum(int(value) for value in fields[11:15])
+    if pid not in cpu_ticks:
+        return None
+    total, pending = 0, [pid]
+    children = {}
+    for child, parent in parents.items():
+        children.setdefault(parent, []).append(child)
+    while pending:
+        current = pending.pop()
+        total += cpu_ticks.get(current, 0)
+        pending.extend(children.get(current, []))
+    return total / ticks
+
+class ProgressMonitor:
+    """
+    Acompanha uma etapa executada como subprocesso pelo canal de progresso
+    (ver Progresso em scripts/eventos.py), registra periodicamente o andamento
+    e decide quando a etapa deve ser encerrada.
+    
+    A etapa é considerada travada quando passa stall_timeout segundos sem enviar
+    progresso nem pulsos (ver pulsar em scripts/eventos.py) e, se o tempo de CPU
+    pode ser medido, sem usar ao menos STALL_CPU_FRACTION de uma CPU nesse
+    intervalo: uma etapa ocupada, mas sem pulsos, é apenas lenta. Ela é
+    considerada lenta demais quando ultrapassa TIME_BUDGET_FACTOR vezes o tempo
+    estimado. A estimativa é a maior entre a da execução anterior, escalada pelo
+    tamanho da entrada, e a projeção pela vazão medida na fase atual; sem
+    nenhuma das duas, apenas a detecção de travamento se aplica.
+    """
+    
+    def __init__(self, path, description, expected_seconds=None, stall_timeout=STALL_TIMEOUT, cpu_seconds=None):
+        self.path = path
+        self.description = description
+        self.expected_seconds = expected_seconds
+        self.stall_timeout = stall_timeout
+        self.cpu_seconds = cpu_seconds
+        self.start = self.last_progress = self.last_activity = self.last_log = time.monotonic()
+        self.last_cpu = None
+        self.offset = 0
+        self.progress = None
+    
+    def read(self):
+        """Lê as mensagens completas acrescentadas ao canal desde a última leitura."""
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return
+        self.offset += end
+        for line in data[:end].splitlines():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            # Pulsos apenas indicam que a etapa continua ativa
+            if 'fase' in message:
+                self.progress = message
+                self.last_progress = time.monotonic()
+        self.last_activity = time.monotonic()
+        self.last_cpu = None
+    
+    def eta(self):
+        """Segundos restantes da fase atual pela vazão medida, ou None sem progresso."""
+        if not self.progress or not self.progress['concluidos']:
+            return None
+        progress = self.progress
+        return progress['segundos'] / progress['concluidos'] * max(0, progress['total'] - progress['concluidos'])
+    
+    def budget(self):
+        """Orçamento de tempo da etapa em segundos, ou None sem estimativa."""
+        estimates = [self.expected_seconds] if self.expected_seconds else []
+        eta = self.eta()
+        if eta is not None:
+            estimates.append(self.last_progress - self.start + eta)
+        if not estimates:
+            return None
+        return max(MIN_TIME_BUDGET, TIME_BUDGET_FACTOR * max(estimates))
+    
+    def check(self):
+        """
+        Lê o canal e registra o progresso a cada PROGRESS_LOG_INTERVAL segundos.
+        
+        Returns:
+            Motivo para encerrar a etapa, ou None se ela deve continuar
+        """
+        self.read()
+        now = time.monotonic()
+        if self.progress and now - self.last_log >= PROGRESS_LOG_INTERVAL:
+            self.last_log = now
+            self.log_progress()
+        if self.cpu_seconds and self.last_cpu is None and now - self.last_activity >= self.stall_timeout / 2:
+            cpu = self.cpu_seconds()
+            self.last_cpu = (now, cpu) if cpu is not None else None
+        if now - self.last_activity >= self.stall_timeout and not self.busy(now):
+            return f"travada (sem progresso há {now - self.last_activity:.0f} s)"
+        budget = self.budget()
+        if budget is not None and now - self.start > budget:
+            return f"tempo esgotado ({now - self.start:.0f} s, orçamento de {budget:.0f} s)"
+        return None
+    
+    def busy(self, now):
+        """
+        Verifica se a etapa sem progresso usou CPU desde a medida feita na metade
+        do intervalo de stall_timeout segundos (ver check); se sim, um novo
+        intervalo começa.
+        
+        Args:
+            now: Momento atual (time.monotonic)
+            
+        Returns:
+            True se a etapa está ocupada e deve continuar
+        """
+        if self.last_cpu is None:
+            return False
+        since, previous = self.last_cpu
+        cpu = self.cpu_seconds()
+        if cpu is None or cpu - previous < STALL_CPU_FRACTION * (now - since):
+            return False
+        logging.warning(f"{self.description}: sem progresso há {now - self.last_activity:.0f} s, mas usando CPU "
+                        f"({cpu - previous:.1f} s nos últimos {now - since:.0f} s); a etapa continua")
+        self.last_activity = now
+        self.last_cpu = None
+        return True
+    
+    def log_progress(self):
+        """Registra no log a última mensagem de progresso, com linhas/s e ETA da fase."""
+        progress = self.progress
+        seconds = max(progress['segundos'], 1e-9)
+        rate = progress['linhas'] / seconds
+        eta = self.eta()
+        logging.info("Progresso - %s: %s %d/%d %s (%.1f/s%s), ETA %s", self.description, progress['fase'],
+                     progress['concluidos'], progress['total'], progress['unidade'], progress['concluidos'] / seconds,
+                     f", {rate:.0f} linhas/s" if progress['linhas'] else "",
+                     f"{eta:.0f} s" if eta is not None else "desconhecido",
+                     extra={'evento': 'progresso', 'campos': {**progress, 'linhas_por_segundo': round(rate, 1)}})
+
+def wait_with_usage(process, monitor):
+    """
+    Espera o processo filho terminar e retorna os recursos usados apenas por ele.
+    
+    Args:
+        process: Processo criado com subprocess.Popen
+        monitor: ProgressMonitor consultado a cada verificação; se ele indicar um
+            motivo, o processo é encerrado
+        
+    Returns:
+        Tupla (código de retorno ou None se o processo foi encerrado, struct_rusage
+        ou None se a plataforma não oferece os.wait4, motivo do encerramento ou None)
+    """
+    while True:
+        if hasattr(os, 'wait4'):
+            # wait4 devolve os recursos deste filho (e dos netos que ele recolheu)
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                process.returncode = os.waitstatus_to_exitcode(status)
+                return process.returncode, usage, None
+        elif process.poll() is not None:
+            return process.returncode, None, None
+        
+        reason = monitor.check()
+        if reason:
+            process.kill()
+            if not hasattr(os, 'wait4'):
+                process.wait()
+                return None, None, reason
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return None, usage, reason
+        time.sleep(0.05)
+
+def log_output(label, output, level=logging.INFO):
+    """
+    Registra a saída de uma etapa: em DEBUG a saída completa; nos demais níveis
+    apenas as últimas OUTPUT_TAIL_LINES linhas, para que etapas com muitos
+    participantes não dupliquem toda a saída no log.
+    
+    Args:
+        label: Rótulo da mensagem (ex: Saída, Erro)
+        output: Texto da saída
+        level: Nível da mensagem quando a saída é resumida
+    """
+    if not output:
+        return
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("%s: %s", label, output)
+        return
+    lines = output.rstrip().splitlines()
+    if len(lines) > OUTPUT_TAIL_LINES:
+        logging.log(level, "%s (últimas %d de %d linhas):\n%s", label, OUTPUT_TAIL_LINES, len(lines),
+                    "\n".join(lines[-OUTPUT_TAIL_LINES:]))
+    else:
+        logging.log(level, "%s: %s", label, output)
+
+def run_script(script_name, description, measures=None, profile_path=None, reports_metrics=False, log_level='INFO',
+               expected_seconds=None, stall_timeout=STALL_TIMEOUT, script_args=()):
     """
     Executa um script Python e retorna True se bem-sucedido.
     
     Args:
         script_name: Nome do script a ser executado
         description: Descrição do que o script faz
+        measures: Dicionário preenchido com tempo de parede, CPU e pico de memória (opcional)
+        profile_path: Arquivo onde gravar o perfil cProfile da etapa (opcional)
+        reports_metrics: Se True, o script aceita --metricas: grava as medidas por
+            arquivo e os contadores do solver, que são incluídos em measures
+        log_level: Nível de log da etapa, passado com --nivel-log; todos os scripts
+            também recebem --eventos e acrescentam seus eventos a EVENTS_PATH
+        expected_seconds: Tempo estimado da etapa a partir da execução anterior (opcional)
+        stall_timeout: Segundos sem progresso até a etapa ser encerrada como travada
+        script_args: Argumentos adicionais passados ao script (ex: --formato parquet)
         
     Returns:
         bool: True se o script foi executado com sucesso
     """
+    measures = {} if measures is None else measures
     script_path = os.path.join('scripts', script_name)
     
     if not os.path.exists(script_path):
@@ -49,38 +348,664 @@ def run_script(script_name, description):
     logging.info(f"Executando: {description}")
     logging.info(f"Script: {script_name}")
     
+    command = [sys.executable]
+    if profile_path:
+        command += ['-m', 'cProfile', '-o', os.path.abspath(profile_path)]
+    command.append(script_path)
+    command += list(script_args)
+    command += ['--nivel-log', log_level, '--eventos', EVENTS_PATH]
+    
+    metrics_file = None
+    fd, progress_file = tempfile.mkstemp(suffix='.jsonl', prefix='progresso_')
+    os.close(fd)
+    start = time.perf_counter()
     try:
+        if reports_metrics:
+            fd, metrics_file = tempfile.mkstemp(suffix='.json', prefix='metricas_')
+            os.close(fd)
+            command += ['--metricas', metrics_file]
+        
         # Executa o script
-        result = subprocess.run(
-            [sys.executable, script_path],
-            cwd=os.path.dirname(os.path.abspath(__file__)),
-            capture_output=True,
-            text=True,
-            timeout=300  # Timeout de 5 minutos
-        )
-        
-        if result.returncode == 0:
+        with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(
+                command,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stdout=stdout_file,
+                stderr=stderr_file,
+                env={**os.environ, import_stage('eventos').VARIAVEL_PROGRESSO: progress_file}
+            )
+            monitor = ProgressMonitor(progress_file, description, expected_seconds, stall_timeout,
+                                      functools.partial(process_tree_cpu_seconds, process.pid))
+            returncode, usage, reason = wait_with_usage(process, monitor)
+            stdout_file.seek(0)
+            stderr_file.seek(0)
+            stdout = stdout_file.read().decode('utf-8', 'replace')
+            stderr = stderr_file.read().decode('utf-8', 'replace')
+        
+        measures['segundos'] = round(time.perf_counter() - start, 4)
+        if usage is not None:
+            measures['cpu_segundos'] = round(usage.ru_utime + usage.ru_stime, 4)
+            measures['pico_rss_kib'] = maxrss_kib(usage.ru_maxrss)
+        if profile_path:
+            measures['perfil'] = profile_path
+        if monitor.budget() is not None:
+            measures['orcamento_segundos'] = round(monitor.budget(), 1)
+        if reason:
+            measures['encerrada'] = reason
+        if metrics_file and os.path.getsize(metrics_file) > 0:
+            with open(metrics_file, encoding='utf-8') as f:
+                measures.update(json.load(f))
+        
+        if returncode is None:
+            logging.error(f"[ERRO] {description} - Encerrada: {reason}")
+            log_output("Erro", stderr, logging.ERROR)
+            return False
+        if returncode == 0:
             logging.info(f"[OK] {description} - Concluído com sucesso")
-            if result.stdout:
-                logging.info(f"Saída: {result.stdout}")
+            if logging.getLevelName(log_level) <= logging.INFO:
+                log_output("Saída", stdout)
             return True
         else:
-            logging.error(f"[ERRO] {description} - Falhou com código {result.returncode}")
-            if result.stderr:
-                logging.error(f"Erro: {result.stderr}")
+            logging.error(f"[ERRO] {description} - Falhou com código {returncode}")
+            log_output("Erro", stderr, logging.ERROR)
             return False
             
-    except subprocess.TimeoutExpired:
-        logging.error(f"[ERRO] {description} - Timeout (5 minutos)")
-        return False
     except Exception as e:
         logging.error(f"[ERRO] {description} - Erro inesperado: {e}")
         return False
+    finally:
+        os.remove(progress_file)
+        if metrics_file:
+            os.remove(metrics_file)
+
+def import_stage(module_name):
+    """
+    Importa o módulo de uma etapa a partir da pasta scripts.
+    
+    Na primeira importação de um script de REQUIRED_SCRIPTS, o hash do arquivo é
+    registrado em LOADED_SCRIPT_HASHES: é o hash do código em execução, que o
+    modo incremental grava no manifesto e o modo watch compara com o arquivo.
+    
+    Args:
+        module_name: Nome do módulo (ex: process_all_files)
+        
+    Returns:
+        Módulo importado (importado uma única vez por execução)
+    """
+    if SCRIPTS_FOLDER not in sys.path:
+        sys.path.insert(0, SCRIPTS_FOLDER)
+    script = f"{module_name}.py"
+    if script not in REQUIRED_SCRIPTS or script in LOADED_SCRIPT_HASHES:
+        return importlib.import_module(module_name)
+    digest = file_hash(os.path.join(SCRIPTS_FOLDER, script))
+    module = importlib.import_module(module_name)
+    LOADED_SCRIPT_HASHES[script] = digest
+    return module
+
+def stage_process(data, args):
+    """Etapa 1 em processo: devolve os DataFrames processados por nome de arquivo."""
+    process_all_files = import_stage('process_all_files')
+    output_folder = None if args.skip_intermediates else "01_dados_processados"
+    jobs = args.jobs if args.jobs is not None else process_all_files.num_cpus_disponiveis()
+    processed = process_all_files.processar_dados_originais("dados_originais", output_folder, jobs, manter_dados=True,
+                                                            formato=args.format)
+    if not processed:
+        raise RuntimeError("Nenhum arquivo processado")
+    return processed
+
+def stage_combine(processed, args):
+    """Etapa 2 em processo: devolve os DataFrames combinados por ID do usuário."""
+    combine_user_data = import_stage('combine_user_data')
+    write_wide = not args.skip_intermediates and args.layout == 'largo'
+    if not args.skip_intermediates:
+        Path("02_dados_combinados").mkdir(exist_ok=True)
+    combined = {}
+    for user_id, combined_df in combine_user_data.combine_all_users(processed):
+        combined[user_id] = combined_df
+        if write_wide:
+            combine_user_data.save_combined_file(user_id, combined_df, "02_dados_combinados", args.format)
+    if not combined:
+        raise RuntimeError("Nenhum usuário combinado")
+    if not args.skip_intermediates:
+        if args.layout == 'longo':
+            # As métricas continuam sendo calculadas em memória a partir dos DataFrames combinados
+            combine_user_data.save_long_store(dict(combine_user_data.stack_all_users(processed)),
+                                              "02_dados_combinados", args.format)
+        combine_user_data.remove_other_layout("02_dados_combinados", args.layout)
+    return combined
+
+def stage_analyze(combined, args):
+    """Etapa 3 em processo: devolve o DataFrame com as métricas de todos os usuários."""
+    analyze_combined_data = import_stage('analyze_combined_data')
+    df_results, excluded_users = analyze_combined_data.analyze_all_users(combined)
+    if df_results is None:
+        raise RuntimeError("Nenhum usuário completou todos os 3 testes!")
+    if not args.skip_intermediates:
+        output_file = analyze_combined_data.save_results(df_results, file_format=args.format)
+        print(f"Arquivo salvo: {output_file}")
+    analyze_combined_data.print_summary(df_results, excluded_users)
+    return df_results
+
+def stage_database(data, args):
+    """
+    Etapa do banco em processo: reconstrói o banco SQLite a partir dos
+    intermediários gravados e devolve os dados recebidos sem alteração.
+    """
+    banco_participantes = import_stage('banco_participantes')
+    counts = banco_participantes.criar_banco(DATABASE_PATH)
+    print(f"Banco salvo: {DATABASE_PATH} ({counts['movimentos']} movimentos, {counts['trials']} trials, "
+          f"{counts['metricas_sessao']} métricas de sessão)")
+    return data
+
+def stage_anova(df_results, args):
+    """Etapa 4 em processo: grava a planilha da ANOVA e devolve os resultados."""
+    anova = import_stage('anova')
+    resultados = anova.realizar_anova_medidas_repetidas(df_results)
+    anova.mostrar_resultados_principais(resultados)
+    return resultados
+
+def file_hash(path):
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo.
+    
+    Args:
+        path: Caminho do arquivo
+        
+    Returns:
+        Hash em hexadecimal
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def artifact_ok(path, expected_hash):
+    """Retorna True se o artefato existe e tem o hash registrado no manifesto."""
+    return expected_hash is not None and os.path.exists(path) and file_hash(path) == expected_hash
+
+def remove_artifact(path):
+    """Remove um artefato derivado desatualizado, se existir."""
+    if os.path.exists(path):
+        os.remove(path)
+
+def empty_manifest():
+    """Retorna um manifesto vazio, que faz o modo incremental reconstruir tudo."""
+    return {
+        'versao': MANIFEST_VERSION,
+        'scripts': {},      # script -> hash
+        'brutos': {},       # arquivo de dados_originais -> hash
+        'processados': {},  # arquivo de 01_dados_processados -> hash
+        'combinados': {},   # ID do usuário -> hash do arquivo de 02_dados_combinados
+        'metricas': {},     # ID do usuário -> métricas (None se excluído)
+        'analises': None,   # hash de todos_usuarios_analises.csv
+        'anova': None       # hash da planilha da ANOVA
+    }
+
+def load_manifest(path=MANIFEST_PATH):
+    """
+    Lê o manifesto da última execução incremental.
+    
+    Args:
+        path: Caminho do manifesto
+        
+    Returns:
+        Manifesto lido, ou um manifesto vazio se não existir ou for inválido
+    """
+    if not os.path.exists(path):
+        return empty_manifest()
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Manifesto ignorado ({path}): {e}")
+        return empty_manifest()
+    if manifest.get('versao') != MANIFEST_VERSION:
+        logging.warning(f"Manifesto ignorado ({path}): versão {manifest.get('versao')}")
+        return empty_manifest()
+    return manifest
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Grava o manifesto de forma atômica (arquivo temporário + os.replace)."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temp_path, path)
+
+def script_hashes():
+    """
+    Calcula os hashes dos scripts das etapas registrados no manifesto.
+    
+    Para os módulos já importados vale o hash registrado na importação, e não o
+    do arquivo atual: o manifesto só registra o código que de fato executou.
+    
+    Returns:
+        Dicionário {script: hash}
+    """
+    return {script: LOADED_SCRIPT_HASHES.get(script) or file_hash(os.path.join(SCRIPTS_FOLDER, script))
+            for script in REQUIRED_SCRIPTS}
+
+def changed_loaded_scripts():
+    """Retorna os scripts de etapas já importados cujo arquivo mudou ou sumiu desde a importação."""
+    changed = []
+    for script, digest in LOADED_SCRIPT_HASHES.items():
+        path = os.path.join(SCRIPTS_FOLDER, script)
+        if not os.path.exists(path) or file_hash(path) != digest:
+            changed.append(script)
+    return changed
+
+def invalidate_changed_scripts(manifest, solver_cache=None):
+    """
+    Descarta do manifesto os resultados que dependem de scripts alterados desde a
+    última execução: cada etapa invalida a si mesma e as seguintes. Se a etapa 1
+    mudou, o cache persistente do solver também é descartado.
+    
+    Args:
+        manifest: Manifesto a atualizar
+        solver_cache: Cache do solver em uso (modo watch); se None, apaga o arquivo do cache
+    """
+    hashes = script_hashes()
+    changed = [script for script in REQUIRED_SCRIPTS if manifest['scripts'].get(script) != hashes[script]]
+    if changed and manifest['scripts']:
+        logging.info(f"Scripts alterados desde a última execução: {changed}")
+    
+    first_changed = min((REQUIRED_SCRIPTS.index(script) for script in changed), default=len(REQUIRED_SCRIPTS))
+    if first_changed <= 0:
+        manifest['brutos'] = {}
+        manifest['processados'] = {}
+        if manifest['scripts']:
+            process_all_files = import_stage('process_all_files')
+            (solver_cache or process_all_files.CacheSolver(process_all_files.CAMINHO_CACHE_SOLVER)).limpar()
+    if first_changed <= 1:
+        manifest['combinados'] = {}
+    if first_changed <= 2:
+        manifest['metricas'] = {}
+        manifest['analises'] = None
+    if first_changed <= 3:
+        manifest['anova'] = None
+    manifest['scripts'] = hashes
+
+def stage_process_incremental(data, args):
+    """
+    Etapa 1 incremental: processa apenas os arquivos brutos novos ou alterados e
+    aqueles cuja saída em 01_dados_processados sumiu ou foi modificada. No modo
+    watch, data traz o cache do solver mantido em memória entre os ciclos.
+    """
+    process_all_files = import_stage('process_all_files')
+    combine_user_data = import_stage('combine_user_data')
+    solver_cache = data.get('solver_cache') if data else None
+    manifest = empty_manifest() if args.force else load_manifest()
+    invalidate_changed_scripts(manifest, solver_cache)
+    Path(PROCESSED_FOLDER).mkdir(exist_ok=True)
+    
+    raw_files = {os.path.basename(path): path for path in sorted(glob.glob(os.path.join(RAW_FOLDER, "*.csv")))}
+    raw_hashes = {name: file_hash(path) for name, path in raw_files.items()}
+    changed = [name for name, digest in raw_hashes.items()
+               if manifest['brutos'].get(name) != digest
+               or not artifact_ok(os.path.join(PROCESSED_FOLDER, name), manifest['processados'].get(name))]
+    removed = [name for name in manifest['brutos'] if name not in raw_files]
+    
+    # As saídas antigas são descartadas antes: uma falha não deixa um arquivo desatualizado para trás
+    for name in changed + removed:
+        manifest['brutos'].pop(name, None)
+        manifest['processados'].pop(name, None)
+        remove_artifact(os.path.join(PROCESSED_FOLDER, name))
+    
+    print(f"Arquivos brutos: {len(changed)} novos ou alterados, {len(removed)} removidos, "
+          f"{len(raw_files) - len(changed)} inalterados")
+    processed = {}
+    if changed:
+        jobs = args.jobs if args.jobs is not None else process_all_files.num_cpus_disponiveis()
+        processed = process_all_files.processar_arquivos([raw_files[name] for name in changed],
+                                                         PROCESSED_FOLDER, jobs, manter_dados=True,
+                                                         cache=solver_cache)
+    for name in processed:
+        manifest['brutos'][name] = raw_hashes[name]
+        manifest['processados'][name] = file_hash(os.path.join(PROCESSED_FOLDER, name))
+    
+    affected = {combine_user_data.extract_user_id(name) for name in changed + removed} - {None}
+    return {'manifest': manifest, 'raw_files': raw_files, 'processed': processed, 'affected': affected}
+
+def stage_combine_incremental(state, args):
+    """
+    Etapa 2 incremental: recombina apenas os usuários afetados e aqueles cujo
+    arquivo em 02_dados_combinados sumiu ou foi modificado.
+    """
+    combine_user_data = import_stage('combine_user_data')
+    manifest = state['manifest']
+    Path(COMBINED_FOLDER).mkdir(exist_ok=True)
+    
+    users = {}
+    for name in state['raw_files']:
+        user_id = combine_user_data.extract_user_id(name)
+        if user_id and combine_user_data.extract_test_number(name):
+            users.setdefault(user_id, []).append(name)
+    
+    def combined_path(user_id):
+        return os.path.join(COMBINED_FOLDER, f"{user_id}_combined.csv")
+    
+    to_combine = [user_id for user_id in sorted(users)
+                  if user_id in state['affected']
+                  or not artifact_ok(combined_path(user_id), manifest['combinados'].get(user_id))]
+    stale_users = [user_id for user_id in manifest['combinados'] if user_id not in users]
+    for user_id in to_combine + stale_users:
+        manifest['combinados'].pop(user_id, None)
+        manifest['metricas'].pop(user_id, None)
+        remove_artifact(combined_path(user_id))
+    
+    # Usa os DataFrames da etapa 1 quando disponíveis e os arquivos de 01_dados_processados nos demais casos
+    sources = {}
+    for user_id in to_combine:
+        for name in users[user_id]:
+            if name in state['processed']:
+                sources[name] = state['processed'][name]
+            elif os.path.exists(os.path.join(PROCESSED_FOLDER, name)):
+                sources[name] = os.path.join(PROCESSED_FOLDER, name)
+    
+    combined = {}
+    for user_id, combined_df in combine_user_data.combine_all_users(sources):
+        output_file = combine_user_data.save_combined_file(user_id, combined_df, COMBINED_FOLDER)
+        manifest['combinados'][user_id] = file_hash(output_file)
+        combined[user_id] = combined_df
+    
+    print(f"Usuários: {len(combined)} recombinados, {len(stale_users)} removidos, "
+          f"{len(users) - len(to_combine)} inalterados")
+    state['combined'] = combined
+    return state
+
+def to_json_value(value):
+    """Converte escalares do NumPy para tipos nativos, preservando int e float."""
+    return value.item() if hasattr(value, 'item') else value
+
+def stage_analyze_incremental(state, args):
+    """
+    Etapa 3 incremental: recalcula as métricas apenas dos usuários recombinados e
+    remonta todos_usuarios_analises.csv com as métricas guardadas dos demais.
+    """
+    analyze_combined_data = import_stage('analyze_combined_data')
+    manifest = state['manifest']
+    metrics = manifest['metricas']
+    
+    for user_id in sorted(manifest['combinados']):
+        if user_id in state['combined']:
+            result = analyze_combined_data.analyze_combined_dataframe(
+                analyze_combined_data.match_csv_dtypes(state['combined'][user_id]), user_id)
+        elif user_id not in metrics:
+            result = analyze_combined_data.analyze_combined_test_data(
+                os.path.join(COMBINED_FOLDER, f"{user_id}_combined.csv"))
+        else:
+            continue
+        metrics[user_id] = None if result is None else {key: to_json_value(value) for key, value in result.items()}
+    
+    all_results = [result for result in metrics.values() if result is not None]
+    excluded_users = sorted(user_id for user_id, result in metrics.items() if result is None)
+    if not all_results:
+        raise RuntimeError("Nenhum usuário completou todos os 3 testes!")
+    
+    df_results = analyze_combined_data.build_results_dataframe(all_results)
+    output_file = analyze_combined_data.save_results(df_results)
+    digest = file_hash(output_file)
+    if digest != manifest['analises']:
+        # O conjunto de participantes ou suas métricas mudaram: a ANOVA precisa ser refeita
+        manifest['anova'] = None
+    manifest['analises'] = digest
+    save_manifest(manifest)
+    
+    print(f"Arquivo salvo: {output_file}")
+    analyze_combined_data.print_summary(df_results, excluded_users)
+    state['results'] = df_results
+    return state
+
+def stage_anova_incremental(state, args):
+    """Etapa 4 incremental: refaz a ANOVA apenas se as métricas agregadas mudaram."""
+    manifest = state['manifest']
+    if artifact_ok(ANOVA_OUTPUT, manifest['anova']):
+        print("Métricas agregadas inalteradas; ANOVA não recalculada")
+        return state
+    
+    anova = import_stage('anova')
+    resultados = anova.realizar_anova_medidas_repetidas(state['results'], ANOVA_OUTPUT)
+    anova.mostrar_resultados_principais(resultados)
+    manifest['anova'] = file_hash(ANOVA_OUTPUT)
+    save_manifest(manifest)
+    return state
+
+# Soluções da primeira fase, recebidas por cada processo do pool do modo streaming
+_stream_solutions = None
+
+def init_stream_worker(solutions, log_level):
+    global _stream_solutions
+    _stream_solutions = solutions
+    logging.getLogger().setLevel(log_level)
 
-def check_prerequisites():
+def stream_participant(user_id, raw_paths, write_intermediates, file_format='csv', layout='largo'):
+    """
+    Processa, combina e analisa um participante em um processo do pool, coletando
+    os logs em vez de emiti-los.
+    
+    Args:
+        user_id: ID do participante, ou None para arquivos fora do padrão T[n]_[ID]
+            (que são apenas processados, como no modo em lote)
+        raw_paths: Caminhos dos arquivos brutos do participante
+        write_intermediates: Se True, grava os arquivos de 01_dados_processados e 02_dados_combinados
+        file_format: Formato dos arquivos intermediários ('csv' ou 'parquet')
+        layout: Layout de 02_dados_combinados; no layout longo o participante não
+            grava seu arquivo combinado e devolve suas linhas em formato longo,
+            gravadas pelo processo principal em uma única tabela
+        
+    Returns:
+        Tupla (True se o participante foi combinado, métricas ou None se algum
+        teste estiver faltando, registros de log gerados, instrumentação do
+        processamento dos arquivos, DataFrame longo ou None)
+    """
+    process_all_files = import_stage('process_all_files')
+    combine_user_data = import_stage('combine_user_data')
+    analyze_combined_data = import_stage('analyze_combined_data')
+    process_all_files.coletar_instrumentacao()
+    
+    root = logging.getLogger()
+    previous_handlers = root.handlers[:]
+    collector = process_all_files.ColetorLogs()
+    root.handlers = [collector]
+    try:
+        sources = {}
+        for path in raw_paths:
+            name = os.path.basename(path)
+            output_file = (os.path.join(PROCESSED_FOLDER, process_all_files.nome_no_formato(name, file_format))
+                           if write_intermediates else None)
+            try:
+                logging.debug("Processando arquivo: %s", name)
+                sources[name] = process_all_files.processar_arquivo(path, output_file, None, _stream_solutions)
+            except Exception as e:
+                logging.error(f"Erro ao processar arquivo {path}: {e}")
+        
+        combined = list(combine_user_data.combine_all_users(sources)) if user_id is not None else []
+        if not combined:
+            return False, None, collector.registros, process_all_files.coletar_instrumentacao(), None
+        _, combined_df = combined[0]
+        long_df = None
+        if write_intermediates and layout == 'longo':
+            _, long_df = next(combine_user_data.stack_all_users(sources))
+        elif write_intermediates:
+            combine_user_data.save_combined_file(user_id, combined_df, COMBINED_FOLDER, file_format)
+        result = analyze_combined_data.analyze_combined_dataframe(
+            analyze_combined_data.match_csv_dtypes(combined_df), user_id)
+        return True, result, collector.registros, process_all_files.coletar_instrumentacao(), long_df
+    finally:
+        root.handlers = previous_handlers
+
+def stage_stream(data, args):
+    """
+    Etapas 1 a 3 em streaming: depois de resolver os puzzles distintos de todos os
+    arquivos, cada participante é processado, combinado e analisado em uma única
+    tarefa do pool, assim que um processo fica livre. Apenas a ANOVA espera por
+    todos os participantes.
+    """
+    process_all_files = import_stage('process_all_files')
+    combine_user_data = import_stage('combine_user_data')
+    analyze_combined_data = import_stage('analyze_combined_data')
+    write_intermediates = not args.skip_intermediates
+    
+    raw_paths = sorted(glob.glob(os.path.join(RAW_FOLDER, "*.csv")))
+    if not raw_paths:
+        raise RuntimeError(f"Nenhum arquivo CSV encontrado na pasta '{RAW_FOLDER}'")
+    if write_intermediates:
+        Path(PROCESSED_FOLDER).mkdir(exist_ok=True)
+        Path(COMBINED_FOLDER).mkdir(exist_ok=True)
+    
+    # Agrupa os arquivos por participante; arquivos fora do padrão formam tarefas próprias
+    users = {}
+    loose_files = []
+    for path in raw_paths:
+        name = os.path.basename(path)
+        user_id = combine_user_data.extract_user_id(name)
+        if user_id and combine_user_data.extract_test_number(name):
+            users.setdefault(user_id, []).append(path)
+        else:
+            loose_files.append(path)
+    tasks = [(user_id, paths) for user_id, paths in users.items()] + [(None, [path]) for path in loose_files]
+    
+    # Os puzzles distintos são resolvidos uma única vez antes de distribuir os participantes
+    cache = process_all_files.CacheSolver(process_all_files.CAMINHO_CACHE_SOLVER)
+    puzzles = process_all_files.coletar_puzzles(raw_paths)
+    with process_all_files.Progresso('resolucao', len(puzzles), 'puzzles') as progress:
+        solutions = process_all_files.resolver_puzzles(puzzles, cache, progress)
+    logging.info(f"{len(solutions)} puzzles distintos resolvidos para {len(raw_paths)} arquivos")
+    try:
+        cache.salvar()
+    except (OSError, sqlite3.Error) as e:
+        logging.error(f"Erro ao salvar o cache do solver {cache.caminho}: {e}")
+    logging.info("Cache do solver: %d acertos, %d falhas", cache.acertos, cache.falhas,
+                 extra={'evento': 'cache_solver', 'campos': {'acertos': cache.acertos, 'falhas': cache.falhas}})
+    
+    jobs = args.jobs if args.jobs is not None else process_all_files.num_cpus_disponiveis()
+    jobs = max(1, min(jobs, len(tasks)))
+    logging.info(f"Processando {len(tasks)} participantes em streaming com {jobs} processos")
+    
+    metrics = {}
+    long_frames = {}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_stream_worker,
+                             initargs=(solutions, logging.getLogger().level)) as executor:
+        futures = [
+            (user_id, paths, executor.submit(stream_participant, user_id, paths, write_intermediates, args.format,
+                                                     args.layout))
+            for user_id, paths in tasks
+        ]
+        # Os logs são reemitidos na ordem dos participantes para que o log seja determinístico
+        progress = process_all_files.Progresso('streaming', len(futures), 'participantes')
+        for user_id, paths, future in progress.acompanhar(futures):
+            try:
+                was_combined, result, records, instrumentation, long_df = future.result()
+            except Exception as e:
+                logging.error(f"Erro ao processar {user_id or paths[0]}: {e}")
+                continue
+            process_all_files.reemitir_logs(records)
+            process_all_files.incorporar_instrumentacao(instrumentation)
+            if was_combined:
+                metrics[user_id] = result
+            if long_df is not None:
+                long_frames[user_id] = long_df
+    if write_intermediates:
+        if args.layout == 'longo':
+            combine_user_data.save_long_store(long_frames, COMBINED_FOLDER, args.format)
+        combine_user_data.remove_other_layout(COMBINED_FOLDER, args.layout)
+    
+    all_results = [result for result in metrics.values() if result is not None]
+    excluded_users = [user_id for user_id, result in metrics.items() if result is None]
+    if not all_results:
+        raise RuntimeError("Nenhum usuário completou todos os 3 testes!")
+    
+    df_results = analyze_combined_data.build_results_dataframe(all_results)
+    if write_intermediates:
+        output_file = analyze_combined_data.save_results(df_results, file_format=args.format)
+        print(f"Arquivo salvo: {output_file}")
+    analyze_combined_data.print_summary(df_results, excluded_users)
+    return df_results
+
+def cpu_time_with_children():
+    """Tempo de CPU do processo atual somado ao dos filhos já recolhidos (ex: processos do pool)."""
+    if resource is None:
+        return time.process_time()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+def run_in_process(stage, description, data, args, measures=None, profile_path=None, log_level='INFO'):
+    """
+    Executa uma etapa no processo atual, passando os dados da etapa anterior em memória.
+    
+    Args:
+        stage: Função da etapa (recebe os dados da etapa anterior e os argumentos)
+        description: Descrição do que a etapa faz
+        data: Dados devolvidos pela etapa anterior (None na primeira)
+        args: Argumentos da linha de comando
+        measures: Dicionário preenchido com tempo de parede, CPU, memória e, na
+            etapa de processamento, medidas por arquivo e contadores do solver (opcional)
+        profile_path: Arquivo onde gravar o perfil cProfile da etapa; também ativa
+            o tracemalloc para medir o pico de memória alocada pela etapa (opcional)
+        log_level: Nível de log usado durante a etapa
+        
+    Returns:
+        Tupla (True se a etapa foi executada com sucesso, dados devolvidos pela etapa)
+    """
+    measures = {} if measures is None else measures
+    logging.info(f"Executando: {description}")
+    logging.info(f"Etapa em processo: {stage.__name__}")
+    
+    # Zera a instrumentação do solver acumulada por etapas anteriores
+    process_all_files = sys.modules.get('process_all_files')
+    if process_all_files is not None:
+        process_all_files.coletar_instrumentacao()
+    
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler:
+        tracemalloc.start()
+        profiler.enable()
+    start, start_cpu = time.perf_counter(), cpu_time_with_children()
+    
+    # A saída padrão da etapa é capturada e registrada no log, como no modo com subprocessos
+    output = io.StringIO()
+    root = logging.getLogger()
+    previous_level = root.level
+    root.setLevel(log_level)
+    try:
+        with contextlib.redirect_stdout(output):
+            result = stage(data, args)
+    except Exception as e:
+        logging.error(f"[ERRO] {description} - Erro inesperado: {e}")
+        log_output("Saída", output.getvalue(), logging.ERROR)
+        return False, None
+    finally:
+        root.setLevel(previous_level)
+        measures['segundos'] = round(time.perf_counter() - start, 4)
+        measures['cpu_segundos'] = round(cpu_time_with_children() - start_cpu, 4)
+        if resource is not None:
+            # Picos desde o início da execução: o RSS máximo de um processo não pode ser zerado
+            measures['pico_rss_kib'] = maxrss_kib(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+            measures['pico_rss_filhos_kib'] = maxrss_kib(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            measures['perfil'] = profile_path
+            measures['pico_tracemalloc_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        process_all_files = sys.modules.get('process_all_files')
+        if process_all_files is not None:
+            instrumentation = process_all_files.coletar_instrumentacao()
+            if instrumentation['arquivos'] or instrumentation['contadores']:
+                measures.update(instrumentation)
+    
+    logging.info(f"[OK] {description} - Concluído com sucesso")
+    if logging.getLevelName(log_level) <= logging.INFO:
+        log_output("Saída", output.getvalue())
+    return True, result
+
+def check_prerequisites(require_data=True):
     """
     Verifica se os pré-requisitos estão atendidos.
     
+    Args:
+        require_data: Se False, a pasta de dados originais pode estar vazia (modo watch)
+    
     Returns:
         bool: True se todos os pré-requisitos estão OK
     """
@@ -94,7 +1019,7 @@ def check_prerequisites():
     
     # Verifica se há arquivos CSV na pasta de dados originais
     csv_files = list(dados_originais.glob("*.csv"))
-    if not csv_files:
+    if not csv_files and require_data:
         logging.error("Nenhum arquivo CSV encontrado na pasta 'dados_originais'!")
         return False
     
@@ -107,14 +1032,7 @@ def check_prerequisites():
         return False
     
     # Verifica se todos os scripts necessários existem
-    required_scripts = [
-        "process_all_files.py",
-        "combine_user_data.py", 
-        "analyze_combined_data.py",
-        "anova.py"
-    ]
-    
-    for script in required_scripts:
+    for script in REQUIRED_SCRIPTS:
         script_path = scripts_folder / script
         if not script_path.exists():
             logging.error(f"Script obrigatório não encontrado: {script}")
@@ -124,57 +1042,432 @@ def check_prerequisites():
     logging.info("[OK] Pré-requisitos atendidos")
     return True
 
+def input_size(path):
+    """Tamanho em bytes da entrada de uma etapa: um arquivo ou os CSV/Parquet de uma pasta (0 se não existir)."""
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path)
+                   if entry.is_file() and entry.name.endswith(('.csv', '.parquet')))
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def load_previous_report(mode, file_format='csv'):
+    """
+    Lê o relatório da execução anterior, usado para estimar o tempo de cada etapa.
+    
+    Args:
+        mode: Modo da execução atual (ver new_report)
+        file_format: Formato dos intermediários da execução atual; relatórios de
+            outro modo ou formato são ignorados
+        
+    Returns:
+        Relatório anterior, ou None se não existir, for inválido ou de outro modo ou formato
+    """
+    try:
+        with open(REPORT_PATH, encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(report, dict) or report.get('modo') != mode:
+        return None
+    return report if report.get('formato', 'csv') == file_format else None
+
+def expected_stage_seconds(previous_report, step_name, input_bytes):
+    """
+    Estima o tempo de uma etapa pela vazão (bytes/s) medida na execução anterior.
+    
+    Args:
+        previous_report: Relatório da execução anterior (ou None)
+        step_name: Nome da etapa
+        input_bytes: Tamanho atual da entrada da etapa
+        
+    Returns:
+        Segundos estimados, ou None se não houver uma medida anterior bem-sucedida
+    """
+    for measures in (previous_report or {}).get('etapas', []):
+        if measures.get('nome') == step_name and measures.get('sucesso') and measures.get('bytes_entrada'):
+            return measures['segundos'] * input_bytes / measures['bytes_entrada']
+    return None
+
+def run_steps(pipeline_steps, args, data=None, report=None, previous_report=None):
+    """
+    Executa as etapas em sequência, interrompendo na primeira falha.
+    
+    Args:
+        pipeline_steps: Lista de etapas
+        args: Argumentos da linha de comando
+        data: Dados passados à primeira etapa em processo (opcional)
+        report: Relatório (ver new_report) onde as medidas de cada etapa são registradas (opcional)
+        previous_report: Relatório da execução anterior, usado para estimar o tempo
+            das etapas executadas como subprocessos (opcional)
+        
+    Returns:
+        int: Número de etapas executadas com sucesso
+    """
+    successful_steps = 0
+    total_steps = len(pipeline_steps)
+    if args.profile:
+        Path(PROFILE_FOLDER).mkdir(exist_ok=True)
+    
+    for i, step in enumerate(pipeline_steps, 1):
+        logging.info(f"\n--- ETAPA {i}/{total_steps} ---")
+        measures = {'etapa': i, 'nome': step["name"], 'descricao': step["description"],
+                    'bytes_entrada': input_size(step["input"])}
+        log_level = args.stage_log_levels.get(step["name"], args.default_log_level)
+        
+        if args.in_process:
+            stage = step["incremental_stage"] if args.incremental else step["stage"]
+            profile_path = os.path.join(PROFILE_FOLDER, f"etapa{i}_{stage.__name__}.prof") if args.profile else None
+            success, data = run_in_process(stage, step["description"], data, args, measures, profile_path,
+                                           log_level)
+        else:
+            profile_path = (os.path.join(PROFILE_FOLDER, f"etapa{i}_{Path(step['script']).stem}.prof")
+                            if args.profile else None)
+            expected_seconds = expected_stage_seconds(previous_report, step["name"], measures['bytes_entrada'])
+            script_args = ['--formato', args.format] if step.get("writes_tables") else []
+            if step.get("reads_combined"):
+                script_args += ['--layout', args.layout]
+            if step.get("parallel") and args.jobs is not None:
+                script_args += ['--jobs', str(args.jobs)]
+            success = run_script(step["script"], step["description"], measures, profile_path,
+                                 step.get("reports_metrics", False), log_level, expected_seconds,
+                                 args.stall_timeout, script_args)
+        
+        measures['sucesso'] = success
+        if report is not None:
+            report['etapas'].append(measures)
+        if 'segundos' in measures:
+            cpu = measures.get('cpu_segundos')
+            rss = measures.get('pico_rss_kib')
+            summary = {key: value for key, value in measures.items() if not isinstance(value, (list, dict))}
+            logging.info(f"Etapa {i}: {measures['segundos']:.2f} s de parede"
+                         + (f", {cpu:.2f} s de CPU" if cpu is not None else "")
+                         + (f", pico de RSS {rss / 1024:.1f} MiB" if rss is not None else ""),
+                         extra={'evento': 'etapa_concluida', 'campos': summary})
+        
+        if success:
+            successful_steps += 1
+        else:
+            logging.error(f"Falha na etapa {i}. Interrompendo pipeline.")
+            break
+    
+    return successful_steps
+
+def new_report(args):
+    """
+    Cria o relatório de instrumentação de uma execução.
+    
+    Args:
+        args: Argumentos da linha de comando
+        
+    Returns:
+        Dicionário com o modo de execução, o formato dos intermediários e a lista (vazia) de etapas
+    """
+    if args.watch:
+        mode = 'watch'
+    elif args.stream:
+        mode = 'streaming'
+    elif args.incremental:
+        mode = 'incremental'
+    else:
+        mode = 'em processo' if args.in_process else 'subprocessos'
+    return {'inicio': datetime.now().isoformat(timespec='seconds'), 'modo': mode, 'formato': args.format,
+            'layout': args.layout, 'etapas': []}
+
+def write_report(report, execution_time, successful_steps, total_steps):
+    """
+    Grava o relatório JSON de instrumentação ao lado de pipeline_execution.log.
+    
+    Args:
+        report: Relatório preenchido por run_steps
+        execution_time: Tempo total de execução, em segundos
+        successful_steps: Número de etapas executadas com sucesso
+        total_steps: Número total de etapas
+    """
+    report['segundos_total'] = round(execution_time, 4)
+    report['sucesso'] = successful_steps == total_steps
+    try:
+        with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logging.info(f"Relatório de instrumentação salvo em: {REPORT_PATH}")
+    except OSError as e:
+        logging.error(f"Erro ao salvar o relatório {REPORT_PATH}: {e}")
+
+def snapshot_folder(folder):
+    """
+    Retorna o tamanho e a data de modificação de cada CSV da pasta, sem ler o conteúdo.
+    
+    Args:
+        folder: Pasta monitorada
+        
+    Returns:
+        Dicionário {nome do arquivo: (tamanho, mtime em ns)}
+    """
+    snapshot = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.endswith('.csv') and entry.is_file():
+                    info = entry.stat()
+                    snapshot[entry.name] = (info.st_size, info.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return snapshot
+
+def stop_watch(signum, frame):
+    """Encerra o modo watch ao receber SIGTERM, como no Ctrl+C."""
+    raise KeyboardInterrupt
+
+def watch(pipeline_steps, args):
+    """
+    Monitora a pasta de dados originais e executa o pipeline incremental a cada
+    rajada de arquivos novos, alterados ou removidos.
+    
+    A pasta é verificada a cada WATCH_INTERVAL segundos comparando tamanho e data
+    de modificação dos arquivos; uma rajada só é processada depois de
+    WATCH_DEBOUNCE segundos sem novas alterações, o que também evita ler arquivos
+    ainda em gravação. Os módulos das etapas, as tabelas de distâncias e o cache
+    do solver permanecem em memória entre os ciclos. Um ciclo interrompido não
+    deixa resultados inconsistentes: o manifesto só registra artefatos completos.
+    
+    Os módulos não são recarregados: se o script de uma etapa já importada é
+    alterado, o watch é encerrado com um erro antes do próximo ciclo, e o
+    manifesto continua registrando o hash do código que de fato executou.
+    
+    Args:
+        pipeline_steps: Etapas do pipeline
+        args: Argumentos da linha de comando
+        
+    Returns:
+        False se o watch foi encerrado por alteração em um script de etapa, True
+        se foi encerrado com Ctrl+C ou SIGTERM
+    """
+    signal.signal(signal.SIGTERM, stop_watch)
+    process_all_files = import_stage('process_all_files')
+    warm_state = {'solver_cache': process_all_files.CacheSolver(process_all_files.CAMINHO_CACHE_SOLVER)}
+    total_steps = len(pipeline_steps)
+    
+    logging.info(f"Modo watch: monitorando '{RAW_FOLDER}' a cada {WATCH_INTERVAL:.0f} s "
+                 f"(espera de {WATCH_DEBOUNCE:.0f} s após a última alteração). Ctrl+C ou SIGTERM para encerrar.")
+    processed_snapshot = None
+    seen_snapshot = snapshot_folder(RAW_FOLDER)
+    last_change = time.monotonic() - WATCH_DEBOUNCE
+    cycle = 0
+    try:
+        while True:
+            changed_scripts = changed_loaded_scripts()
+            if changed_scripts:
+                logging.error(f"Scripts de etapas alterados durante o modo watch: {changed_scripts}. "
+                              "O código já carregado não é recarregado: reinicie o --watch para usar a nova versão")
+                return False
+            current = snapshot_folder(RAW_FOLDER)
+            now = time.monotonic()
+            if current != seen_snapshot:
+                seen_snapshot = current
+                last_change = now
+            elif current != processed_snapshot and now - last_change >= WATCH_DEBOUNCE:
+                cycle += 1
+                start_time = time.time()
+                logging.info("\n" + "=" * 60)
+                logging.info(f"CICLO {cycle}: {len(current)} arquivos em '{RAW_FOLDER}'")
+                logging.info("=" * 60)
+                if current:
+                    report = new_report(args)
+                    report['ciclo'] = cycle
+                    successful_steps = run_steps(pipeline_steps, args, warm_state, report)
+                    status = "[OK]" if successful_steps == total_steps else "[ERRO]"
+                    logging.info(f"{status} Ciclo {cycle}: {successful_steps}/{total_steps} etapas "
+                                 f"em {time.time() - start_time:.2f} segundos")
+                    write_report(report, time.time() - start_time, successful_steps, total_steps)
+                else:
+                    logging.info("Nenhum arquivo CSV para processar")
+                processed_snapshot = current
+                # --force vale apenas para o primeiro ciclo
+                args.force = False
+            time.sleep(WATCH_INTERVAL)
+    except KeyboardInterrupt:
+        logging.info("Modo watch encerrado")
+    return True
+
 def main():
     """
     Função principal que executa todo o pipeline.
     """
+    parser = argparse.ArgumentParser(description="Executa todo o pipeline de processamento TOL.")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Executa as etapas no mesmo processo, passando os dados entre elas em memória")
+    parser.add_argument('--skip-intermediates', action='store_true',
+                        help="Com --in-process, não grava os CSVs intermediários "
+                             "(01_dados_processados, 02_dados_combinados e 03_analises_combinadas)")
+    parser.add_argument('--jobs', type=int,
+                        help="Número de processos (padrão: CPUs disponíveis) das etapas 1 e 2 "
+                             "(process_all_files.py e combine_user_data.py); com --in-process ou "
+                             "--incremental, apenas da etapa 1, e com --stream, dos participantes "
+                             "processados em paralelo")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Recalcula apenas os participantes afetados por arquivos novos, alterados ou "
+                             f"removidos, usando o manifesto de hashes {MANIFEST_PATH} (implica --in-process)")
+    parser.add_argument('--force', action='store_true',
+                        help="Com --incremental, ignora o manifesto e reconstrói tudo")
+    parser.add_argument('--watch', action='store_true',
+                        help="Monitora dados_originais e atualiza incrementalmente os participantes "
+                             "afetados a cada lote de arquivos novos ou alterados (implica --incremental)")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Grava um perfil cProfile de cada etapa em {PROFILE_FOLDER}/ (visualize com pstats)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Processa, combina e analisa cada participante em uma única tarefa de um pool "
+                             "de processos; apenas a ANOVA espera por todos (implica --in-process)")
+    parser.add_argument('--log-level', action='append', default=[], metavar='[ETAPA=]NIVEL',
+                        help="Nível de log das etapas (DEBUG, INFO, WARNING ou ERROR); com ETAPA= vale apenas "
+                             f"para essa etapa ({', '.join(STAGE_NAMES)}). Pode ser repetido (padrão: INFO)")
+    parser.add_argument('--stall-timeout', type=float, default=STALL_TIMEOUT, metavar='SEGUNDOS',
+                        help="Encerra uma etapa executada como subprocesso que passe este tempo sem informar "
+                             f"progresso (padrão: {STALL_TIMEOUT:.0f})")
+    parser.add_argument('--format', choices=TABLE_FORMATS, default='csv',
+                        help="Formato dos arquivos intermediários: csv ou parquet, colunar com esquema "
+                             "explícito (requer pyarrow; não aceito com --incremental/--watch). Padrão: csv")
+    parser.add_argument('--layout', choices=COMBINED_LAYOUTS, default='largo',
+                        help="Layout de 02_dados_combinados: largo, um arquivo por usuário com colunas T0_, T1_ e "
+                             "T2_ (padrão), ou longo, uma única tabela com a coluna sessao, particionada por "
+                             "participante (não aceito com --incremental/--watch)")
+    parser.add_argument('--database', action='store_true',
+                        help=f"Gera o banco SQLite {DATABASE_PATH}, indexado por participante, sessão e trial, "
+                             "com os movimentos, os trials e as métricas de cada sessão (não aceito com "
+                             "--skip-intermediates)")
+    args = parser.parse_args()
+    if args.stall_timeout <= 0:
+        parser.error("--stall-timeout deve ser positivo")
+    args.default_log_level = 'INFO'
+    args.stage_log_levels = {}
+    for value in args.log_level:
+        stage_name, _, level = value.rpartition('=')
+        level = level.upper()
+        if level not in LOG_LEVELS:
+            parser.error(f"nível de log inválido: {value}")
+        if stage_name:
+            if stage_name not in STAGE_NAMES:
+                parser.error(f"etapa desconhecida em --log-level: {stage_name}")
+            args.stage_log_levels[stage_name] = level
+        else:
+            args.default_log_level = level
+    if args.watch:
+        if args.stream:
+            parser.error("--watch e --stream não podem ser usados juntos")
+        args.incremental = True
+    if args.stream:
+        args.in_process = True
+        if args.incremental:
+            parser.error("--stream e --incremental não podem ser usados juntos")
+    if args.incremental:
+        args.in_process = True
+        if args.skip_intermediates:
+            parser.error("--incremental precisa dos arquivos intermediários e não aceita --skip-intermediates")
+    elif args.force:
+        parser.error("--force exige --incremental")
+    if args.skip_intermediates and not args.in_process:
+        parser.error("--skip-intermediates exige --in-process")
+    if args.format == 'parquet':
+        if args.incremental:
+            parser.error("--format parquet não pode ser usado com --incremental ou --watch")
+        if importlib.util.find_spec('pyarrow') is None:
+            parser.error("--format parquet requer o pacote pyarrow (pip install pyarrow)")
+    if args.layout == 'longo' and args.incremental:
+        parser.error("--layout longo não pode ser usado com --incremental ou --watch")
+    if args.database and args.skip_intermediates:
+        parser.error("--database é gerado a partir dos arquivos intermediários e não aceita --skip-intermediates")
+    
     start_time = time.time()
+    import_stage('eventos').configurar_log_eventos(EVENTS_PATH)
     
     logging.info("=" * 60)
     logging.info("INICIANDO PIPELINE DE PROCESSAMENTO TOL")
     logging.info("=" * 60)
     
     # Verifica pré-requisitos
-    if not check_prerequisites():
+    if args.watch:
+        Path(RAW_FOLDER).mkdir(exist_ok=True)
+    if not check_prerequisites(require_data=not args.watch):
         logging.error("Pré-requisitos não atendidos. Abortando execução.")
         sys.exit(1)
     
     # Define a sequência de execução dos scripts
     pipeline_steps = [
         {
+            "name": "processamento",
+            "input": RAW_FOLDER,
             "script": "process_all_files.py",
+            "reports_metrics": True,
+            "writes_tables": True,
+            "parallel": True,
+            "stage": stage_process,
+            "incremental_stage": stage_process_incremental,
             "description": "Processamento de dados originais e cálculo de pontuações"
         },
         {
+            "name": "combinacao",
+            "input": PROCESSED_FOLDER,
             "script": "combine_user_data.py", 
+            "writes_tables": True,
+            "reads_combined": True,
+            "parallel": True,
+            "stage": stage_combine,
+            "incremental_stage": stage_combine_incremental,
             "description": "Combinação de dados por usuário"
         },
         {
+            "name": "analise",
+            "input": COMBINED_FOLDER,
             "script": "analyze_combined_data.py",
+            "writes_tables": True,
+            "reads_combined": True,
+            "stage": stage_analyze,
+            "incremental_stage": stage_analyze_incremental,
             "description": "Análise de dados combinados"
         },
         {
+            "name": "anova",
+            "input": os.path.splitext(ANALYSES_PATH)[0] + '.' + args.format,
             "script": "anova.py",
+            "stage": stage_anova,
+            "incremental_stage": stage_anova_incremental,
             "description": "Análise estatística ANOVA de medidas repetidas"
         }
     ]
     
+    if args.stream:
+        # As etapas 1 a 3 são executadas juntas, participante por participante
+        pipeline_steps = [
+            {
+                "name": "streaming",
+                "input": RAW_FOLDER,
+                "stage": stage_stream,
+                "description": "Processamento, combinação e análise por participante (streaming)"
+            },
+            pipeline_steps[-1]
+        ]
+    
+    if args.database:
+        # O banco é lido dos intermediários já gravados e não altera os dados passados à ANOVA
+        pipeline_steps.insert(len(pipeline_steps) - 1, {
+            "name": "banco",
+            "input": PROCESSED_FOLDER,
+            "script": "banco_participantes.py",
+            "stage": stage_database,
+            "incremental_stage": stage_database,
+            "description": "Banco SQLite dos participantes"
+        })
+    
+    if args.watch:
+        sys.exit(0 if watch(pipeline_steps, args) else 1)
+    
     # Executa cada etapa do pipeline
-    successful_steps = 0
     total_steps = len(pipeline_steps)
-    
-    for i, step in enumerate(pipeline_steps, 1):
-        logging.info(f"\n--- ETAPA {i}/{total_steps} ---")
-        
-        if run_script(step["script"], step["description"]):
-            successful_steps += 1
-        else:
-            logging.error(f"Falha na etapa {i}. Interrompendo pipeline.")
-            break
+    report = new_report(args)
+    successful_steps = run_steps(pipeline_steps, args, report=report,
+                                 previous_report=load_previous_report(report['modo'], args.format))
     
     # Resumo final
     end_time = time.time()
     execution_time = end_time - start_time
+    write_report(report, execution_time, successful_steps, total_steps)
     
     logging.info("\n" + "=" * 60)
     logging.info("RESUMO DA EXECUÇÃO")
@@ -185,9 +1478,12 @@ def main():
     if successful_steps == total_steps:
         logging.info("[OK] PIPELINE CONCLUÍDO COM SUCESSO!")
         logging.info("\nArquivos gerados:")
-        logging.info("  - 01_dados_processados/ - Dados processados com pontuações")
-        logging.info("  - 02_dados_combinados/ - Dados combinados por usuário")
-        logging.info("  - 03_analises_combinadas/ - Análises dos dados combinados")
+        if not args.skip_intermediates:
+            logging.info("  - 01_dados_processados/ - Dados processados com pontuações")
+            logging.info("  - 02_dados_combinados/ - Dados combinados por usuário")
+            logging.info("  - 03_analises_combinadas/ - Análises dos dados combinados")
+        if args.database:
+            logging.info(f"  - {DATABASE_PATH} - Banco SQLite dos participantes")
         logging.info("  - resultados_anova_medidas_repetidas.xlsx - Análise estatística ANOVA")
         sys.exit(0)
     else:
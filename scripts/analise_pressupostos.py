@@ -1,18 +1,19 @@
+import argparse
 import pandas as pd
-import pingouin as pg
 import numpy as np
 from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-from scipy.stats import shapiro, normaltest
 import warnings
 warnings.filterwarnings('ignore')
 
+# pingouin, scipy e matplotlib são importados dentro das funções que os usam,
+# para que o módulo carregue rápido (ex: --help)
+
 def testar_normalidade_eficiencia(df):
     """
     Testa normalidade para eficiência em cada tempo (T0, T1, T2) usando Shapiro-Wilk
     """
+    from scipy.stats import shapiro
+    
     resultados = []
     
     # Colunas de eficiência
@@ -61,6 +62,8 @@ def detectar_outliers_eficiencia(df):
     """
     Detecta outliers na eficiência usando IQR e Z-score
     """
+    from scipy import stats
+    
     resultados = []
     
     # Colunas de eficiência
@@ -121,6 +124,8 @@ def criar_boxplot_eficiencia(df, output_folder='graficos'):
     """
     Cria boxplot para visualizar outliers na eficiência
     """
+    import matplotlib.pyplot as plt
+    
     # Criar pasta de gráficos se não existir
     Path(output_folder).mkdir(exist_ok=True)
     
@@ -188,6 +193,8 @@ def testar_esfericidade_eficiencia(df, id_column):
     """
     Testa esfericidade para eficiência usando Mauchly's test
     """
+    import pingouin as pg
+    
     try:
         # Preparar dados para pingouin (converter para formato longo)
         anova_data = []
@@ -271,6 +278,8 @@ def comparacoes_post_hoc_eficiencia(df, id_column):
     """
     Realiza comparações post-hoc para eficiência usando Bonferroni
     """
+    import pingouin as pg
+    
     try:
         # Preparar dados (converter para formato longo)
         anova_data = []
@@ -507,6 +516,8 @@ def anova_eficiencia(df, id_column):
     """
     Realiza ANOVA de medidas repetidas para eficiência
     """
+    import pingouin as pg
+    
     try:
         # Preparar dados (converter para formato longo)
         anova_data = []
@@ -732,10 +743,15 @@ def analise_eficiencia_completa(csv_path, output_path=None, criar_graficos=True)
     
     return output_path
 
-def main():
+def main(argv=None):
     """
     Função principal
     """
+    parser = argparse.ArgumentParser(
+        description="Análise de pressupostos da eficiência dos movimentos (normalidade, outliers, "
+                    "esfericidade, ANOVA e post-hoc) a partir de 03_analises_combinadas/todos_usuarios_analises.csv.")
+    parser.parse_args(argv)
+    
     csv_path = '03_analises_combinadas/todos_usuarios_analises.csv'
     
     if not Path(csv_path).exists():
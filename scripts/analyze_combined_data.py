@@ -1,15 +1,39 @@
+import argparse
+import logging
+import numpy as np
 import pandas as pd
 import os
-import glob
+
+from armazenamento import FORMATOS, arquivos_tabela, gravar_tabela, ler_tabela, nome_no_formato, verificar_formato
+from combine_user_data import LAYOUTS, read_long_store_table
+from eventos import NIVEIS_LOG, Progresso, configurar_log_eventos, pulsar
+
+TEST_TYPES = ('T0', 'T1', 'T2')
+METRIC_COLUMNS = ('step', 'trialtime', 'done', 'tries', 'movimentos_minimos')  # Colunas usadas nas métricas
+# Colunas cujas somas (Tempo_Total_ms, Movimentos_minimos) herdam o tipo, inteiro ou float, da coluna lida
+FLOAT_SENSITIVE_COLUMNS = ('trialtime', 'movimentos_minimos')
 
 def analyze_combined_test_data(file_path):
-    # Lê o arquivo CSV ignorando a primeira linha e usando a segunda como cabeçalho
-    df = pd.read_csv(file_path, skiprows=1)
+    # Lê o arquivo ignorando a linha de descrições do CSV (o Parquet as guarda nos metadados)
+    df = ler_tabela(file_path, linha_descricoes=True)
     
     # Extrai o ID da pessoa do nome do arquivo
     filename = os.path.basename(file_path)
     person_id = filename.split('_')[0]
     
+    return analyze_combined_dataframe(df, person_id)
+
+def analyze_combined_dataframe(df, person_id):
+    """
+    Calcula as métricas de T0, T1 e T2 de um participante a partir do DataFrame combinado.
+    
+    Args:
+        df: DataFrame combinado do participante (colunas com prefixo T0_, T1_, T2_)
+        person_id: ID do participante
+        
+    Returns:
+        Dicionário com as métricas, ou None se algum teste estiver faltando
+    """
     results = {'id': person_id}
     
     # Verifica se todas as colunas dos 3 testes estão presentes
@@ -107,54 +131,326 @@ def get_variable_descriptions():
     }
     return descriptions
 
-def main():
-    input_folder = '02_dados_combinados'
-    files = glob.glob(os.path.join(input_folder, '*_combined.csv'))
+def match_csv_dtypes(df):
+    """
+    Converte as colunas inteiras anuláveis (Int64) para os tipos que pd.read_csv
+    produziria ao reler o arquivo combinado: float64 quando há valores ausentes
+    e int64 caso contrário. Assim as métricas calculadas em memória são idênticas
+    às calculadas a partir dos arquivos de 02_dados_combinados.
     
-    all_results = []
-    excluded_users = []
+    Args:
+        df: DataFrame combinado
+        
+    Returns:
+        DataFrame com os tipos convertidos
+    """
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.Int64Dtype):
+            df[col] = df[col].astype('float64' if df[col].hasnans else 'int64')
+    return df
+
+def wide_to_long(df, person_id):
+    """
+    Empilha as colunas usadas nas métricas de cada teste do DataFrame combinado
+    de um participante, mantendo o alinhamento das sessões (inclusive as linhas
+    completadas com NaN).
     
-    for file_path in files:
-        result = analyze_combined_test_data(file_path)
-        if result is not None:
-            all_results.append(result)
-        else:
-            # Extrai o ID do usuário excluído
-            filename = os.path.basename(file_path)
-            person_id = filename.split('_')[0]
-            excluded_users.append(person_id)
-    
-    if all_results:
-        # Cria o DataFrame com todos os resultados
-        df_results = pd.DataFrame(all_results)
+    Args:
+        df: DataFrame combinado do participante (colunas com prefixo T0_, T1_, T2_)
+        person_id: ID do participante
         
-        # Ordena por ID
-        df_results = df_results.sort_values('id')
+    Returns:
+        Dicionário {coluna: array} com participante, sessao e METRIC_COLUMNS
+        (float64, NaN quando a coluna não existe), apenas com os testes presentes,
+        e com as colunas <coluna>_float, que indicam as colunas de
+        FLOAT_SENSITIVE_COLUMNS que o arquivo combinado tinha em float64; None se
+        nenhum teste estiver presente
+    """
+    prefixes = {session: test_type + '_' for session, test_type in enumerate(TEST_TYPES)
+                if any(col.startswith(test_type + '_') for col in df.columns)}
+    if not prefixes:
+        return None
+    rows = len(df)
+    columns = {
+        'participante': np.full(rows * len(prefixes), person_id, dtype=object),
+        'sessao': np.repeat(list(prefixes), rows),
+    }
+    for col in METRIC_COLUMNS:
+        values, read_as_float = [], []
+        for prefix in prefixes.values():
+            if prefix + col in df.columns:
+                session_values = pd.to_numeric(df[prefix + col], errors='coerce')
+                values.append(session_values.to_numpy(dtype='float64', na_value=np.nan))
+                read_as_float.append(np.full(rows, pd.api.types.is_float_dtype(session_values.dtype)))
+            else:
+                values.append(np.full(rows, np.nan))
+                read_as_float.append(np.zeros(rows, dtype=bool))
+        columns[col] = np.concatenate(values)
+        if col in FLOAT_SENSITIVE_COLUMNS:
+            columns[col + '_float'] = np.concatenate(read_as_float)
+    return columns
+
+def aggregate_sessions(long_df):
+    """
+    Soma, em uma única passagem groupby().agg, as quantidades de que as métricas
+    dependem, para todos os participantes e sessões.
+    
+    As sessões são alinhadas pela posição da linha à primeira sessão do
+    participante, como nos arquivos combinados: as linhas além do tamanho da
+    primeira sessão são descartadas e as sessões mais curtas são marcadas como
+    completadas com NaN.
+    
+    Args:
+        long_df: DataFrame longo com as colunas participante, sessao e
+            METRIC_COLUMNS (e, opcionalmente, as colunas <coluna>_float de wide_to_long)
         
-        # Salva o resultado em um único arquivo
-        output_folder = '03_analises_combinadas'
-        os.makedirs(output_folder, exist_ok=True)
-        output_file = os.path.join(output_folder, 'todos_usuarios_analises.csv')
+    Returns:
+        DataFrame indexado por (participante, sessao) com as colunas movimentos,
+        tempo, trials, tentativas e minimos, e com trialtime_float e
+        movimentos_minimos_float, que indicam se a coluna seria lida do arquivo
+        combinado como float64 (valores ausentes ou fracionários)
+    """
+    keys = ['participante', 'sessao']
+    data = long_df.reindex(columns=keys + list(METRIC_COLUMNS))
+    for col in METRIC_COLUMNS:
+        data[col] = pd.to_numeric(data[col], errors='coerce')
+    
+    done = data['done'] == 1
+    quantities = pd.DataFrame({
+        'participante': data['participante'],
+        'sessao': data['sessao'],
+        'movimentos': data['step'] > 0,
+        'tempo': data['trialtime'].where(done),
+        'trials': done,
+        'tentativas': data['tries'] > 1,
+        'minimos': data['movimentos_minimos'],
+    })
+    for col in FLOAT_SENSITIVE_COLUMNS:
+        read_as_float = data[col].isna() | (data[col] % 1 != 0)
+        if col + '_float' in long_df.columns:
+            read_as_float |= long_df[col + '_float'].fillna(False).astype(bool)
+        quantities[col + '_float'] = read_as_float
+    
+    sizes = quantities.groupby(keys, sort=False).size()
+    base_sizes = sizes.sort_index().groupby(level='participante').first()
+    quantities = quantities[quantities.groupby(keys, sort=False).cumcount()
+                            < quantities['participante'].map(base_sizes)]
+    
+    aggregates = quantities.groupby(keys, sort=False).agg({
+        'movimentos': 'sum', 'tempo': 'sum', 'trials': 'sum', 'tentativas': 'sum', 'minimos': 'sum',
+        **{col + '_float': 'any' for col in FLOAT_SENSITIVE_COLUMNS},
+    })
+    padded = pd.Series(sizes.to_numpy() < base_sizes.reindex(sizes.index.get_level_values('participante')).to_numpy(),
+                       index=sizes.index)
+    for col in FLOAT_SENSITIVE_COLUMNS:
+        aggregates[col + '_float'] |= padded
+    return aggregates
+
+def ratio(numerator, denominator):
+    """
+    Razão arredondada a 2 casas, ou 0 quando o denominador é 0.
+    
+    Returns:
+        Array float64, ou int64 (apenas zeros) se todos os denominadores forem 0,
+        como as colunas montadas a partir dos dicionários de analyze_combined_dataframe
+    """
+    valid = denominator > 0
+    if not valid.any():
+        return np.zeros(len(denominator), dtype='int64')
+    return np.where(valid, (numerator / denominator.where(valid)).round(2), 0.0)
+
+def analyze_long_frame(long_df, person_ids=None):
+    """
+    Calcula as métricas de T0, T1 e T2 de todos os participantes a partir de um
+    único DataFrame longo. O resultado é idêntico ao de analyze_combined_dataframe
+    aplicado a cada participante, inclusive nos tipos das colunas.
+    
+    Args:
+        long_df: DataFrame longo com as colunas participante, sessao e METRIC_COLUMNS
+        person_ids: IDs dos participantes, na ordem de análise (padrão: ordem em long_df)
+        
+    Returns:
+        Tupla (DataFrame com os resultados ordenado por ID, ou None se nenhum
+        usuário completou os 3 testes; lista de usuários excluídos)
+    """
+    if person_ids is None:
+        person_ids = list(pd.unique(long_df['participante']))
+    aggregates = aggregate_sessions(long_df)
+    pulsar()
+    sessions = aggregates.index.get_level_values('sessao')
+    
+    ids = pd.Index(person_ids, dtype=object)
+    present = [ids.isin(aggregates[sessions == session].index.get_level_values('participante'))
+               for session in range(len(TEST_TYPES))]
+    complete = np.logical_and.reduce(present)
+    excluded_users = list(ids[~complete])
+    for position in np.flatnonzero(~complete):
+        missing_tests = [test_type for session, test_type in enumerate(TEST_TYPES) if not present[session][position]]
+        print(f"Usuário {ids[position]} não tem todos os testes. Testes faltando: {missing_tests}")
+    
+    included = ids[complete]
+    if not len(included):
+        return None, excluded_users
+    
+    results = {'id': list(included)}
+    for session, test_type in enumerate(TEST_TYPES):
+        pulsar()
+        block = aggregates[sessions == session].droplevel('sessao').reindex(included)
+        total_movements = block['movimentos']
+        completed_trials = block['trials']
+        # As somas são inteiras, a menos que algum arquivo combinado tivesse a coluna em float64
+        total_time = block['tempo'].astype('float64' if block['trialtime_float'].any() else 'int64')
+        total_min_movements = block['minimos'].astype('float64' if block['movimentos_minimos_float'].any() else 'int64')
         
-        # Obtém as descrições das variáveis
-        descriptions = get_variable_descriptions()
+        results[f'Total_Movimentos_{test_type}'] = total_movements.to_numpy()
+        results[f'Tempo_Total_ms_{test_type}'] = total_time.to_numpy()
+        results[f'Movimentos_por_Trial_{test_type}'] = ratio(total_movements, completed_trials)
+        results[f'Tempo_Médio_por_Trial_{test_type}'] = ratio(total_time, completed_trials)
+        results[f'Tempo_por_Movimento_{test_type}'] = ratio(total_time, total_movements)
+        results[f'Trials_Completos_{test_type}'] = completed_trials.to_numpy()
+        results[f'Número_de_Tentativas_{test_type}'] = block['tentativas'].to_numpy()
+        results[f'Movimentos_totais_{test_type}'] = total_movements.to_numpy()
+        results[f'Movimentos_minimos_{test_type}'] = total_min_movements.to_numpy()
+        results[f'Movimentos_eficiencia_{test_type}'] = ratio(total_min_movements, total_movements)
+    
+    return build_results_dataframe(results), excluded_users
+
+def analyze_all_users(sources):
+    """
+    Analisa os dados combinados de todos os participantes.
+    
+    Os arquivos (ou DataFrames) são empilhados em um único DataFrame longo e as
+    métricas são calculadas de uma só vez por analyze_long_frame.
+    
+    Args:
+        sources: Dicionário {ID do participante: caminho do arquivo combinado ou DataFrame}
         
-        # Cria a linha de descrições
-        description_line = ','.join([descriptions.get(col, col) for col in df_results.columns])
+    Returns:
+        Tupla (DataFrame com os resultados ordenado por ID, ou None se nenhum
+        usuário completou os 3 testes; lista de usuários excluídos)
+    """
+    # Apenas as colunas usadas nas métricas são lidas dos arquivos
+    wanted_columns = [f'{test_type}_{col}' for test_type in TEST_TYPES for col in METRIC_COLUMNS]
+    long_parts = []
+    with Progresso('analise', len(sources), 'usuários') as progress:
+        for person_id, source in sources.items():
+            # Lê o arquivo ignorando a linha de descrições do CSV (o Parquet as guarda nos metadados)
+            df = source if isinstance(source, pd.DataFrame) else ler_tabela(source, linha_descricoes=True,
+                                                                             colunas=wanted_columns)
+            columns = wide_to_long(df, person_id)
+            if columns is not None:
+                long_parts.append(columns)
+            progress.avancar(linhas=len(df))
+    
+    # Um único DataFrame longo, montado de uma vez a partir dos arrays de todos os participantes
+    long_df = pd.DataFrame({col: np.concatenate([part[col] for part in long_parts]) for col in long_parts[0]}
+                           if long_parts else {col: [] for col in ['participante', 'sessao', *METRIC_COLUMNS]})
+    return analyze_long_frame(long_df, list(sources))
+
+def build_results_dataframe(all_results):
+    """
+    Cria o DataFrame com os resultados de todos os usuários, ordenado por ID.
+    
+    Args:
+        all_results: Lista de dicionários devolvidos por analyze_combined_dataframe,
+            ou dicionário de colunas montado por analyze_long_frame
         
-        # Salva o arquivo com descrições na primeira linha
-        with open(output_file, 'w', encoding='utf-8', newline='') as f:
-            f.write(description_line + '\n')
-            df_results.to_csv(f, index=False)
+    Returns:
+        DataFrame com os resultados
+    """
+    # Cria o DataFrame com todos os resultados
+    df_results = pd.DataFrame(all_results)
+    
+    # Ordena por ID
+    df_results = df_results.sort_values('id')
+    return df_results
+
+def save_results(df_results, output_folder='03_analises_combinadas', file_format='csv'):
+    """
+    Salva os resultados em um único arquivo, com as descrições das variáveis na
+    primeira linha (CSV) ou nos metadados do esquema (Parquet).
+    
+    Args:
+        df_results: DataFrame com os resultados
+        output_folder: Pasta de saída
+        file_format: Formato do arquivo ('csv' ou 'parquet')
         
-        print(f"Arquivo salvo: {output_file}")
-        print(f"Total de usuários processados: {len(all_results)}")
-        print(f"Variáveis analisadas: {len(df_results.columns) - 1}")  # -1 para excluir ID
+    Returns:
+        Caminho do arquivo salvo
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    output_file = os.path.join(output_folder, nome_no_formato('todos_usuarios_analises', file_format))
+    
+    # Obtém as descrições das variáveis
+    descriptions = get_variable_descriptions()
+    
+    # Salva o arquivo com as descrições
+    gravar_tabela(df_results, output_file, [descriptions.get(col, col) for col in df_results.columns])
+    
+    return output_file
+
+def print_summary(df_results, excluded_users):
+    """
+    Mostra o resumo da análise.
+    
+    Args:
+        df_results: DataFrame com os resultados
+        excluded_users: Usuários que não completaram todos os testes
+    """
+    print(f"Total de usuários processados: {len(df_results)}")
+    print(f"Variáveis analisadas: {len(df_results.columns) - 1}")  # -1 para excluir ID
+    
+    if excluded_users:
+        print(f"Usuários excluídos (não completaram todos os testes): {excluded_users}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Calcula as métricas de cada usuário de 02_dados_combinados e grava "
+                    "03_analises_combinadas/todos_usuarios_analises.csv.")
+    parser.add_argument('--formato', choices=FORMATOS, default='csv',
+                        help="Formato do arquivo de resultados (padrão: csv; parquet requer pyarrow)")
+    parser.add_argument('--layout', choices=LAYOUTS, default='largo',
+                        help="Layout dos dados combinados: largo (um arquivo por usuário, padrão) ou longo "
+                             "(tabela única particionada por participante)")
+    parser.add_argument('--nivel-log', choices=NIVEIS_LOG, default='INFO',
+                        help="Nível mínimo das mensagens de log (padrão: INFO)")
+    parser.add_argument('--eventos',
+                        help="Acrescenta a este arquivo o log de eventos em JSON lines")
+    args = parser.parse_args(argv)
+    try:
+        verificar_formato(args.formato)
+    except ImportError as e:
+        parser.error(str(e))
+    logging.getLogger().setLevel(args.nivel_log)
+    if args.eventos:
+        configurar_log_eventos(args.eventos)
+    
+    input_folder = '02_dados_combinados'
+    if args.layout == 'longo':
+        # Todos os participantes vêm de uma única tabela, lida de uma só vez
+        try:
+            long_df, person_ids = read_long_store_table(input_folder)
+        except FileNotFoundError as e:
+            print(f"ERRO: {e}")
+            return
+        with Progresso('analise', len(person_ids), 'usuários') as progress:
+            df_results, excluded_users = analyze_long_frame(long_df, person_ids)
+            progress.avancar(len(person_ids), linhas=len(long_df))
+    else:
+        files = arquivos_tabela(input_folder, '*_combined')
         
-        if excluded_users:
-            print(f"Usuários excluídos (não completaram todos os testes): {excluded_users}")
+        # Extrai o ID do usuário do nome do arquivo
+        sources = {os.path.basename(file_path).split('_')[0]: file_path for file_path in files}
+        df_results, excluded_users = analyze_all_users(sources)
+    
+    if df_results is not None:
+        # Salva o resultado em um único arquivo
+        output_file = save_results(df_results, file_format=args.formato)
+        print(f"Arquivo salvo: {output_file}")
+        print_summary(df_results, excluded_users)
     else:
         print("Nenhum usuário completou todos os 3 testes!")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -1,14 +1,24 @@
+import argparse
+import logging
 import pandas as pd
-import pingouin as pg
 import numpy as np
-from pathlib import Path
+
+from armazenamento import arquivos_tabela, ler_tabela
+from eventos import NIVEIS_LOG, Progresso, configurar_log_eventos
+
+# Configuração de logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
 
 def realizar_anova_medidas_repetidas(csv_path, output_path=None):
     """
     Realiza ANOVA de medidas repetidas para todas as variáveis em um arquivo CSV.
     
     Args:
-        csv_path (str): Caminho para o arquivo CSV com os dados
+        csv_path (str | pd.DataFrame): Caminho para o arquivo CSV ou Parquet com
+            os dados, ou o DataFrame já carregado (pipeline em processo)
         output_path (str): Caminho para salvar o arquivo Excel com resultados (opcional)
     
     Returns:
@@ -16,9 +26,12 @@ def realizar_anova_medidas_repetidas(csv_path, output_path=None):
     """
     
     # 1. Leitura do arquivo CSV
-    print("Lendo arquivo CSV...")
-    # Ler o arquivo pulando a primeira linha (cabeçalho descritivo)
-    df = pd.read_csv(csv_path, skiprows=1)
+    if isinstance(csv_path, pd.DataFrame):
+        df = csv_path
+    else:
+        print("Lendo arquivo de dados...")
+        # Ler o arquivo pulando a primeira linha do CSV (cabeçalho descritivo)
+        df = ler_tabela(str(csv_path), linha_descricoes=True)
     print(f"Dados carregados: {df.shape[0]} participantes, {df.shape[1]} colunas")
     
     # Identificar a coluna de ID
@@ -62,7 +75,8 @@ def realizar_anova_medidas_repetidas(csv_path, output_path=None):
     print("\nRealizando ANOVAs de medidas repetidas...")
     resultados = []
     
-    for variable_name, columns in variable_groups.items():
+    progress = Progresso('anova', len(variable_groups), 'variáveis')
+    for variable_name, columns in progress.acompanhar(variable_groups.items()):
         print(f"\nAnalisando: {variable_name}")
         
         # Verificar se temos as 3 colunas necessárias (T0, T1, T2)
@@ -105,6 +119,9 @@ def realizar_anova_medidas_repetidas(csv_path, output_path=None):
             print(f"  AVISO: Sem variabilidade nos dados para {variable_name}. Pulando...")
             continue
         
+        # pingouin (e o scipy que ele carrega) só é importado quando há uma ANOVA a calcular
+        import pingouin as pg
+        
         try:
             # Realizar ANOVA de medidas repetidas
             aov = pg.rm_anova(data=anova_df, dv='value', within='time', subject='participant')
@@ -194,22 +211,44 @@ def realizar_anova_medidas_repetidas(csv_path, output_path=None):
     
     return resultados_df
 
-def main():
+def main(argv=None):
     """
     Função principal para executar a análise
     """
-    # Caminho para o arquivo CSV
+    parser = argparse.ArgumentParser(
+        description="ANOVA de medidas repetidas (T0, T1, T2) de cada variável de "
+                    "03_analises_combinadas/todos_usuarios_analises.csv.")
+    parser.add_argument('--nivel-log', choices=NIVEIS_LOG, default='INFO',
+                        help="Nível mínimo das mensagens de log (padrão: INFO)")
+    parser.add_argument('--eventos',
+                        help="Acrescenta a este arquivo o log de eventos em JSON lines")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(args.nivel_log)
+    if args.eventos:
+        configurar_log_eventos(args.eventos)
+    
+    # Caminho para o arquivo de resultados (CSV ou Parquet, conforme o formato do pipeline)
     csv_path = '03_analises_combinadas/todos_usuarios_analises.csv'
+    found_files = arquivos_tabela('03_analises_combinadas', 'todos_usuarios_analises')
     
     # Verificar se o arquivo existe
-    if not Path(csv_path).exists():
+    if not found_files:
         print(f"ERRO: Arquivo não encontrado: {csv_path}")
         print("Por favor, verifique o caminho do arquivo CSV.")
         return
+    csv_path = found_files[0]
     
     # Executar análise
     resultados = realizar_anova_medidas_repetidas(csv_path)
+    mostrar_resultados_principais(resultados)
+
+def mostrar_resultados_principais(resultados):
+    """
+    Mostra as variáveis significativas e as de grande tamanho de efeito.
     
+    Args:
+        resultados (pd.DataFrame): Resultados de realizar_anova_medidas_repetidas
+    """
     # Mostrar resultados principais
     print("\n" + "="*80)
     print("RESULTADOS PRINCIPAIS")
@@ -0,0 +1,356 @@
+"""
+Leitura e gravação dos arquivos intermediários do pipeline TOL.
+
+Os intermediários (01_dados_processados, 02_dados_combinados e
+03_analises_combinadas) podem ser gravados em CSV, o formato padrão, ou em
+Parquet. O formato é definido pela extensão do arquivo:
+
+- CSV: as descrições curtas das colunas, quando existem, ficam em uma linha
+  acima do cabeçalho, que os leitores precisam pular.
+- Parquet: o arquivo tem um esquema explícito (colunas inteiras tipadas como
+  int64, textos como string) e as descrições ficam nos metadados de cada
+  coluna (chave 'descricao') e do esquema (chave 'descricoes', lista em JSON),
+  e não em uma linha de dados. Requer o pacote pyarrow, importado apenas
+  quando um arquivo Parquet é lido ou gravado.
+
+Ao ler um Parquet, as colunas recebem os mesmos tipos que pd.read_csv
+produziria ao reler o CSV correspondente (inteiros com valores ausentes como
+float64), de modo que as análises são idênticas nos dois formatos.
+
+Uma tabela particionada (gravar_particionada) reúne várias partes, por exemplo
+uma por participante, em um único arquivo acompanhado de um índice JSON
+(<nome>.indice.json). No CSV o índice guarda a posição em bytes de cada parte,
+no Parquet cada parte é um row group; em ambos, ler_particoes lê uma parte sem
+percorrer as demais, e ler_particionada lê a tabela inteira de uma vez.
+"""
+
+import glob
+import io
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from eventos import LeituraComPulso, pulsar
+
+FORMATOS = ('csv', 'parquet')
+EXTENSOES = {'csv': '.csv', 'parquet': '.parquet'}
+SUFIXO_INDICE = '.indice.json'  # Índice das partes de uma tabela particionada
+
+def _importar_pyarrow():
+    """Importa o pyarrow, com uma mensagem clara se ele não estiver instalado."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("O formato parquet requer o pacote pyarrow (pip install pyarrow)") from e
+    return pa, pq
+
+def verificar_formato(formato: str) -> None:
+    """
+    Verifica se o formato pode ser usado neste ambiente.
+
+    Args:
+        formato: 'csv' ou 'parquet'
+
+    Raises:
+        ValueError: Se o formato for desconhecido
+        ImportError: Se o formato for parquet e o pyarrow não estiver instalado
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato} (use {' ou '.join(FORMATOS)})")
+    if formato == 'parquet':
+        _importar_pyarrow()
+
+def nome_no_formato(nome_arquivo: str, formato: str) -> str:
+    """
+    Troca a extensão de um nome de arquivo pela do formato.
+
+    Args:
+        nome_arquivo: Nome ou caminho do arquivo (ex: T0_4567_Tol.csv)
+        formato: 'csv' ou 'parquet'
+
+    Returns:
+        Nome com a extensão do formato (ex: T0_4567_Tol.parquet)
+    """
+    return os.path.splitext(nome_arquivo)[0] + EXTENSOES[formato]
+
+def arquivos_tabela(pasta: str, padrao: str = '*') -> List[str]:
+    """
+    Lista os arquivos CSV e Parquet de uma pasta que seguem um padrão.
+
+    Args:
+        pasta: Pasta dos arquivos
+        padrao: Padrão glob do nome, sem a extensão (ex: '*_combined')
+
+    Returns:
+        Caminhos encontrados, ordenados
+    """
+    return sorted(caminho for extensao in EXTENSOES.values()
+                  for caminho in glob.glob(os.path.join(pasta, padrao + extensao)))
+
+def _esquema_arrow(df: pd.DataFrame, inteiros: bool, descricoes: Optional[List[str]]):
+    """
+    Monta o esquema Arrow explícito de um DataFrame.
+
+    Args:
+        df: DataFrame a gravar
+        inteiros: Se True, colunas float são gravadas como inteiros (como o
+            float_format='%.0f' dos CSVs)
+        descricoes: Descrição de cada coluna, na ordem das colunas (opcional)
+
+    Returns:
+        pyarrow.Schema
+    """
+    pa, _ = _importar_pyarrow()
+    campos = []
+    for i, coluna in enumerate(df.columns):
+        serie = df[coluna]
+        if pd.api.types.is_bool_dtype(serie):
+            tipo = pa.bool_()
+        elif pd.api.types.is_integer_dtype(serie) or (inteiros and pd.api.types.is_float_dtype(serie)):
+            tipo = pa.int64()
+        elif pd.api.types.is_float_dtype(serie):
+            tipo = pa.float64()
+        else:
+            tipo = pa.string()
+        metadados = {'descricao': descricoes[i]} if descricoes else None
+        campos.append(pa.field(str(coluna), tipo, nullable=True, metadata=metadados))
+    metadados = {'descricoes': json.dumps(descricoes, ensure_ascii=False)} if descricoes else None
+    return pa.schema(campos, metadata=metadados)
+
+def _tabela_arrow(df: pd.DataFrame, inteiros: bool, descricoes: Optional[List[str]]):
+    """
+    Converte um DataFrame em uma tabela Arrow com o esquema de _esquema_arrow.
+
+    Args:
+        df: DataFrame a gravar
+        inteiros: Se True, colunas float são gravadas como inteiros
+        descricoes: Descrição de cada coluna, na ordem das colunas (opcional)
+
+    Returns:
+        pyarrow.Table
+    """
+    pa, _ = _importar_pyarrow()
+    esquema = _esquema_arrow(df, inteiros, descricoes)
+    colunas = []
+    for coluna, campo in zip(df.columns, esquema):
+        serie = df[coluna]
+        if pa.types.is_int64(campo.type) and pd.api.types.is_float_dtype(serie):
+            serie = serie.round().astype('Int64')
+        elif pa.types.is_string(campo.type):
+            # Textos vazios viram nulos, como ao reler um CSV
+            serie = serie.astype(object).where(serie.notna(), None).map(
+                lambda valor: None if valor is None or valor == '' else str(valor))
+        colunas.append(pa.array(serie, type=campo.type, from_pandas=True))
+    return pa.Table.from_arrays(colunas, schema=esquema)
+
+def _remover_outro_formato(caminho: str) -> None:
+    """Remove a versão do arquivo no outro formato, deixada por uma execução anterior."""
+    for extensao in EXTENSOES.values():
+        outro = os.path.splitext(caminho)[0] + extensao
+        if outro != caminho and os.path.exists(outro):
+            os.remove(outro)
+
+def gravar_tabela(df: pd.DataFrame, caminho: str, descricoes: Optional[List[str]] = None,
+                  inteiros: bool = False) -> None:
+    """
+    Grava um DataFrame em CSV ou Parquet, conforme a extensão do caminho.
+
+    Uma versão do mesmo arquivo no outro formato, deixada por uma execução
+    anterior, é removida para que os leitores não misturem as duas.
+
+    Args:
+        df: DataFrame a gravar
+        caminho: Arquivo de saída (.csv ou .parquet)
+        descricoes: Descrição de cada coluna, na ordem das colunas (opcional)
+        inteiros: Se True, colunas numéricas são gravadas como inteiros
+    """
+    if caminho.endswith(EXTENSOES['parquet']):
+        _, pq = _importar_pyarrow()
+        # Sem os metadados do pandas: a leitura usa apenas o esquema explícito
+        pq.write_table(_tabela_arrow(df, inteiros, descricoes), caminho)
+    else:
+        with open(caminho, 'w', encoding='utf-8', newline='') as f:
+            if descricoes:
+                f.write(','.join(descricoes) + '\n')
+            # Salva o DataFrame garantindo que colunas numéricas sejam salvas como números
+            df.to_csv(f, index=False, float_format='%.0f' if inteiros else None)
+    _remover_outro_formato(caminho)
+
+def _tipos_como_csv(df: pd.DataFrame, textos: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    Ajusta os tipos de um DataFrame lido de Parquet aos que pd.read_csv produziria.
+
+    Args:
+        df: DataFrame convertido de uma tabela Arrow
+        textos: Colunas mantidas como texto, como o dtype=str do pd.read_csv
+
+    Returns:
+        O mesmo DataFrame, com os tipos ajustados
+    """
+    # Inteiros com valores ausentes já chegam como float64 e textos como object/str
+    for coluna in df.columns:
+        if coluna in textos:
+            df[coluna] = df[coluna].astype(str).where(df[coluna].notna(), np.nan)
+            continue
+        if not pd.api.types.is_string_dtype(df[coluna]):
+            continue
+        try:
+            # Textos numéricos (ex: IDs) são convertidos, como o pd.read_csv faria
+            df[coluna] = pd.to_numeric(df[coluna])
+        except (ValueError, TypeError):
+            if df[coluna].dtype == object:
+                df[coluna] = df[coluna].where(df[coluna].notna(), np.nan)
+    return df
+
+def ler_tabela(caminho: str, linha_descricoes: bool = False, colunas: Optional[Sequence[str]] = None,
+               textos: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    Lê um arquivo CSV ou Parquet gravado por gravar_tabela.
+
+    Args:
+        caminho: Arquivo (.csv ou .parquet)
+        linha_descricoes: Se True, o CSV tem uma linha de descrições acima do
+            cabeçalho (ignorado para Parquet, que as guarda nos metadados)
+        colunas: Colunas a ler (padrão: todas); as que não existem no arquivo são ignoradas
+        textos: Colunas lidas como texto, sem conversão numérica (ex: IDs com zeros à esquerda)
+
+    Returns:
+        DataFrame com os tipos que pd.read_csv produziria para o CSV equivalente
+    """
+    # Arquivos grandes são lidos em blocos (CSV) ou row groups (Parquet), enviando pulsos (ver eventos.pulsar)
+    if not caminho.endswith(EXTENSOES['parquet']):
+        selecionadas = None if colunas is None else set(colunas)
+        with open(caminho, 'rb') as arquivo:
+            return pd.read_csv(LeituraComPulso(arquivo), skiprows=1 if linha_descricoes else 0,
+                               usecols=None if selecionadas is None else (lambda coluna: coluna in selecionadas),
+                               dtype={coluna: str for coluna in textos} or None)
+
+    pa, pq = _importar_pyarrow()
+    arquivo = pq.ParquetFile(caminho)
+    if colunas is not None:
+        existentes = set(arquivo.schema_arrow.names)
+        colunas = [coluna for coluna in colunas if coluna in existentes]
+    if arquivo.num_row_groups <= 1:
+        return _tipos_como_csv(pq.read_table(caminho, columns=colunas).to_pandas(), textos)
+    grupos = []
+    for grupo in range(arquivo.num_row_groups):
+        pulsar()
+        grupos.append(arquivo.read_row_group(grupo, columns=colunas))
+    return _tipos_como_csv(pa.concat_tables(grupos).to_pandas(), textos)
+
+def caminho_indice(caminho: str) -> str:
+    """Caminho do índice de uma tabela particionada (igual para CSV e Parquet)."""
+    return os.path.splitext(caminho)[0] + SUFIXO_INDICE
+
+def gravar_particionada(partes: Dict[str, pd.DataFrame], caminho: str, descricoes: Optional[List[str]] = None,
+                        inteiros: bool = False) -> None:
+    """
+    Grava várias partes em uma única tabela, na ordem do dicionário, e o índice das partes.
+
+    O arquivo é uma tabela comum (pode ser lido inteiro com ler_tabela). O índice
+    registra, para cada parte, o número de linhas e sua posição no arquivo: o
+    intervalo de bytes no CSV ou o row group no Parquet.
+
+    Args:
+        partes: DataFrames com as mesmas colunas, por chave da parte (ex: ID do participante)
+        caminho: Arquivo de saída (.csv ou .parquet)
+        descricoes: Descrição de cada coluna, na ordem das colunas (opcional)
+        inteiros: Se True, colunas numéricas são gravadas como inteiros
+    """
+    df = pd.concat(partes.values(), ignore_index=True) if partes else pd.DataFrame()
+    indice = {'colunas': [str(coluna) for coluna in df.columns], 'partes': {}}
+    inicio = 0
+    if caminho.endswith(EXTENSOES['parquet']):
+        _, pq = _importar_pyarrow()
+        tabela = _tabela_arrow(df, inteiros, descricoes)
+        with pq.ParquetWriter(caminho, tabela.schema) as escritor:
+            # Cada parte não vazia é gravada em seu próprio row group
+            grupo = 0
+            for chave, parte in partes.items():
+                pulsar()
+                indice['partes'][str(chave)] = {'linhas': len(parte), 'row_group': grupo if len(parte) else None}
+                if len(parte):
+                    escritor.write_table(tabela.slice(inicio, len(parte)))
+                    grupo += 1
+                inicio += len(parte)
+    else:
+        float_format = '%.0f' if inteiros else None
+        with open(caminho, 'wb') as f:
+            if descricoes:
+                f.write((','.join(descricoes) + '\n').encode('utf-8'))
+            f.write(df.iloc[:0].to_csv(index=False).encode('utf-8'))
+            for chave, parte in partes.items():
+                pulsar()
+                texto = df.iloc[inicio:inicio + len(parte)].to_csv(index=False, header=False,
+                                                                  float_format=float_format)
+                posicao = f.tell()
+                f.write(texto.encode('utf-8'))
+                indice['partes'][str(chave)] = {'linhas': len(parte), 'inicio': posicao,
+                                                'bytes': f.tell() - posicao}
+                inicio += len(parte)
+    _remover_outro_formato(caminho)
+    with open(caminho_indice(caminho), 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False)
+
+def ler_particoes(caminho: str, chaves: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Lê as partes de uma tabela gravada por gravar_particionada, uma de cada vez.
+
+    O arquivo é aberto uma única vez; cada parte é lida diretamente da sua
+    posição no índice. Os tipos de cada parte são os que pd.read_csv produziria
+    para um arquivo contendo apenas aquela parte.
+
+    Args:
+        caminho: Arquivo da tabela (.csv ou .parquet)
+        chaves: Partes a ler, na ordem desejada (padrão: todas, na ordem de gravação)
+
+    Yields:
+        Tuplas (chave, DataFrame da parte); chaves ausentes do índice são ignoradas
+    """
+    with open(caminho_indice(caminho), encoding='utf-8') as f:
+        indice = json.load(f)
+    partes = indice['partes']
+    chaves = list(partes) if chaves is None else [chave for chave in chaves if chave in partes]
+    if caminho.endswith(EXTENSOES['parquet']):
+        _, pq = _importar_pyarrow()
+        arquivo = pq.ParquetFile(caminho)
+        for chave in chaves:
+            if partes[chave]['row_group'] is None:
+                yield chave, pd.DataFrame(columns=indice['colunas'])
+                continue
+            yield chave, _tipos_como_csv(arquivo.read_row_group(partes[chave]['row_group']).to_pandas())
+        return
+    with open(caminho, 'rb') as f:
+        for chave in chaves:
+            if not partes[chave]['linhas']:
+                yield chave, pd.DataFrame(columns=indice['colunas'])
+                continue
+            f.seek(partes[chave]['inicio'])
+            dados = io.BytesIO(f.read(partes[chave]['bytes']))
+            yield chave, pd.read_csv(dados, header=None, names=indice['colunas'])
+
+def ler_particionada(caminho: str, linha_descricoes: bool = False) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Lê de uma só vez todas as partes de uma tabela gravada por gravar_particionada.
+
+    Ao contrário de ler_particoes, os tipos são os da tabela inteira (uma coluna
+    inteira com valores ausentes em qualquer parte chega como float64).
+
+    Args:
+        caminho: Arquivo da tabela (.csv ou .parquet)
+        linha_descricoes: Se True, o CSV tem uma linha de descrições acima do cabeçalho
+
+    Returns:
+        Tupla (DataFrame com as partes na ordem de gravação, número de linhas de cada parte por chave)
+    """
+    with open(caminho_indice(caminho), encoding='utf-8') as f:
+        partes = json.load(f)['partes']
+    df = ler_tabela(caminho, linha_descricoes)
+    linhas = {chave: parte['linhas'] for chave, parte in partes.items()}
+    if sum(linhas.values()) != len(df):
+        raise ValueError(f"Índice de {caminho} não corresponde ao arquivo ({len(df)} linhas)")
+    return df, linhas
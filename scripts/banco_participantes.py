@@ -0,0 +1,280 @@
+"""
+Banco SQLite dos participantes, gerado a partir dos intermediários do pipeline TOL.
+
+O banco reúne em um único arquivo indexado os dados que hoje estão espalhados
+pelas pastas de saída, de modo que consultar um participante ou uma sessão não
+exige localizar e ler arquivos:
+
+- movimentos: cada linha dos arquivos de 01_dados_processados (colunas brutas
+  do PEBL, distância ao objetivo e tipo do movimento)
+- trials: uma linha por trial concluído (done = 1), com os movimentos mínimos,
+  a pontuação do trial e os caminhos ótimos calculados por processar_arquivo
+- metricas_sessao: as métricas de todos_usuarios_analises, uma linha por
+  participante e sessão
+
+As tabelas são indexadas por participante, sessão e trial. O banco é sempre
+reconstruído por inteiro em um arquivo temporário, que substitui o anterior
+apenas ao final.
+
+Exemplo:
+    sqlite3 participantes.sqlite "SELECT * FROM trials WHERE participante = '4567' AND sessao = 1"
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import arquivos_tabela, ler_tabela
+from combine_user_data import extract_test_number, extract_user_id
+from eventos import NIVEIS_LOG, Progresso, configurar_log_eventos
+
+CAMINHO_BANCO = "participantes.sqlite"
+LOTE_ARQUIVOS = 200  # Arquivos processados acumulados antes de cada inserção no banco
+
+# Colunas de cada linha de 01_dados_processados gravadas na tabela movimentos
+COLUNAS_MOVIMENTOS = ('sub', 'trial', 'size', 'current', 'end', 'step', 'reset', 'tries', 'score', 'abstime',
+                      'trialtime', 'clicktime', 'done', 'distancia_objetivo', 'tipo_movimento')
+
+# (coluna de todos_usuarios_analises sem o sufixo _T0/_T1/_T2, coluna de metricas_sessao)
+METRICAS_SESSAO = (
+    ('Total_Movimentos', 'total_movimentos'),
+    ('Tempo_Total_ms', 'tempo_total_ms'),
+    ('Movimentos_por_Trial', 'movimentos_por_trial'),
+    ('Tempo_Médio_por_Trial', 'tempo_medio_por_trial'),
+    ('Tempo_por_Movimento', 'tempo_por_movimento'),
+    ('Trials_Completos', 'trials_completos'),
+    ('Número_de_Tentativas', 'numero_de_tentativas'),
+    ('Movimentos_totais', 'movimentos_totais'),
+    ('Movimentos_minimos', 'movimentos_minimos'),
+    ('Movimentos_eficiencia', 'movimentos_eficiencia'),
+)
+
+ESQUEMA = """
+CREATE TABLE movimentos (
+    participante TEXT NOT NULL,
+    sessao INTEGER NOT NULL,
+    linha INTEGER NOT NULL,
+    sub TEXT, trial INTEGER, size INTEGER, current TEXT, "end" TEXT, step INTEGER, reset INTEGER,
+    tries INTEGER, score INTEGER, abstime INTEGER, trialtime INTEGER, clicktime INTEGER, done INTEGER,
+    distancia_objetivo INTEGER, tipo_movimento TEXT,
+    PRIMARY KEY (participante, sessao, linha)
+);
+CREATE TABLE trials (
+    participante TEXT NOT NULL,
+    sessao INTEGER NOT NULL,
+    linha INTEGER NOT NULL,
+    trial INTEGER, size INTEGER, objetivo TEXT, tentativas INTEGER, movimentos INTEGER,
+    movimentos_minimos INTEGER, pontuacao INTEGER, tempo_ms INTEGER,
+    caminhos_otimos INTEGER, primeiros_movimentos_otimos INTEGER,
+    PRIMARY KEY (participante, sessao, linha)
+);
+CREATE TABLE metricas_sessao (
+    participante TEXT NOT NULL,
+    sessao INTEGER NOT NULL,
+    {colunas_metricas},
+    PRIMARY KEY (participante, sessao)
+);
+CREATE INDEX idx_movimentos_trial ON movimentos (participante, sessao, trial);
+CREATE INDEX idx_trials_trial ON trials (participante, sessao, trial);
+CREATE INDEX idx_trials_sessao ON trials (sessao, trial);
+CREATE INDEX idx_metricas_sessao ON metricas_sessao (sessao);
+""".format(colunas_metricas=', '.join(f'{coluna} REAL' for _, coluna in METRICAS_SESSAO))
+
+def _linhas(df: pd.DataFrame) -> Iterator[tuple]:
+    """Percorre as linhas do DataFrame como tuplas de valores Python, com None no lugar de NaN."""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+def _inserir(conexao: sqlite3.Connection, tabela: str, partes: List[pd.DataFrame]) -> int:
+    """
+    Insere de uma só vez as linhas acumuladas de uma tabela.
+
+    Args:
+        conexao: Conexão com o banco
+        tabela: Nome da tabela
+        partes: DataFrames com as colunas da tabela, na ordem do esquema
+
+    Returns:
+        Número de linhas inseridas
+    """
+    if not partes:
+        return 0
+    df = pd.concat(partes, ignore_index=True)
+    marcadores = ', '.join('?' * len(df.columns))
+    conexao.executemany(f"INSERT INTO {tabela} VALUES ({marcadores})", _linhas(df))
+    return len(df)
+
+def tabela_movimentos(participante: str, sessao: int, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linhas da tabela movimentos de um arquivo processado.
+
+    Args:
+        participante: ID do participante
+        sessao: Número da sessão (0, 1 ou 2)
+        df: DataFrame de 01_dados_processados
+
+    Returns:
+        DataFrame com as colunas participante, sessao, linha e COLUNAS_MOVIMENTOS
+    """
+    movimentos = df.reindex(columns=list(COLUNAS_MOVIMENTOS))
+    movimentos.insert(0, 'linha', np.arange(len(df)))
+    movimentos.insert(0, 'sessao', sessao)
+    movimentos.insert(0, 'participante', participante)
+    return movimentos
+
+def tabela_trials(participante: str, sessao: int, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linhas da tabela trials de um arquivo processado: uma por linha com done = 1.
+
+    A pontuação do trial é o incremento de pontuacao_acumulada naquela linha.
+
+    Args:
+        participante: ID do participante
+        sessao: Número da sessão (0, 1 ou 2)
+        df: DataFrame de 01_dados_processados
+
+    Returns:
+        DataFrame com as colunas da tabela trials
+    """
+    pontuacoes = df['pontuacao_acumulada'].diff().fillna(df['pontuacao_acumulada'])
+    concluidos = (df['done'] == 1).to_numpy()
+    trials = df.loc[concluidos, ['trial', 'size', 'end', 'tries', 'step', 'movimentos_minimos']]
+    trials.columns = ['trial', 'size', 'objetivo', 'tentativas', 'movimentos', 'movimentos_minimos']
+    trials['pontuacao'] = pontuacoes[concluidos]
+    trials['tempo_ms'] = df['trialtime'][concluidos]
+    trials['caminhos_otimos'] = df['caminhos_otimos'][concluidos]
+    trials['primeiros_movimentos_otimos'] = df['primeiros_movimentos_otimos'][concluidos]
+    trials.insert(0, 'linha', np.flatnonzero(concluidos))
+    trials.insert(0, 'sessao', sessao)
+    trials.insert(0, 'participante', participante)
+    return trials
+
+def tabela_metricas(df_resultados: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linhas da tabela metricas_sessao a partir de todos_usuarios_analises (uma coluna por métrica e sessão).
+
+    Args:
+        df_resultados: DataFrame com a coluna id e as colunas <métrica>_T0, _T1 e _T2
+
+    Returns:
+        DataFrame com as colunas participante, sessao e as métricas de METRICAS_SESSAO
+    """
+    partes = []
+    for sessao in (0, 1, 2):
+        metricas = df_resultados.reindex(columns=[f'{metrica}_T{sessao}' for metrica, _ in METRICAS_SESSAO])
+        metricas.columns = [coluna for _, coluna in METRICAS_SESSAO]
+        metricas.insert(0, 'sessao', sessao)
+        metricas.insert(0, 'participante', df_resultados['id'].astype(str))
+        partes.append(metricas)
+    return pd.concat(partes, ignore_index=True)
+
+def arquivos_por_sessao(pasta_processados: str) -> List[Tuple[str, int, str]]:
+    """
+    Lista os arquivos processados com o participante e a sessão de cada um.
+
+    Args:
+        pasta_processados: Pasta 01_dados_processados
+
+    Returns:
+        Lista de tuplas (participante, sessão, caminho); arquivos fora do padrão
+        T[n]_[ID] são ignorados, assim como os que repetem o participante e a
+        sessão de um arquivo anterior (ex: T0_4567_Tol.csv e T0_4567_Tol_copia.csv)
+    """
+    arquivos = []
+    primeiros: Dict[Tuple[str, int], str] = {}
+    for caminho in arquivos_tabela(pasta_processados):
+        nome = os.path.basename(caminho)
+        participante, sessao = extract_user_id(nome), extract_test_number(nome)
+        if not (participante and sessao and sessao.isdigit()):
+            logging.warning(f"Arquivo {nome} ignorado: nome fora do padrão T[n]_[ID]")
+            continue
+        chave = (participante, int(sessao))
+        if chave in primeiros:
+            # As linhas dos dois arquivos teriam a mesma chave (participante, sessao, linha) no banco
+            logging.warning(f"Arquivo {nome} ignorado: participante {participante} e sessão {sessao} "
+                            f"já lidos de {os.path.basename(primeiros[chave])}")
+            continue
+        primeiros[chave] = caminho
+        arquivos.append((participante, int(sessao), caminho))
+    return arquivos
+
+def criar_banco(caminho: str, pasta_processados: str = "01_dados_processados",
+                pasta_analises: str = "03_analises_combinadas") -> Dict[str, int]:
+    """
+    Reconstrói o banco a partir dos arquivos processados e das análises.
+
+    Args:
+        caminho: Arquivo do banco
+        pasta_processados: Pasta dos arquivos processados (CSV ou Parquet)
+        pasta_analises: Pasta de todos_usuarios_analises (CSV ou Parquet)
+
+    Returns:
+        Número de linhas gravadas em cada tabela
+    """
+    arquivos = arquivos_por_sessao(pasta_processados)
+    analises = arquivos_tabela(pasta_analises, 'todos_usuarios_analises')
+    temporario = caminho + '.tmp'
+    if os.path.exists(temporario):
+        os.remove(temporario)
+
+    contagens = {'movimentos': 0, 'trials': 0, 'metricas_sessao': 0}
+    conexao = sqlite3.connect(temporario)
+    try:
+        # O arquivo temporário só substitui o banco ao final: não há o que proteger durante a carga
+        conexao.execute("PRAGMA journal_mode = OFF")
+        conexao.execute("PRAGMA synchronous = OFF")
+        conexao.executescript(ESQUEMA)
+        movimentos, trials = [], []
+        with Progresso('banco', len(arquivos)) as progresso:
+            for participante, sessao, arquivo in arquivos:
+                df = ler_tabela(arquivo)
+                movimentos.append(tabela_movimentos(participante, sessao, df))
+                trials.append(tabela_trials(participante, sessao, df))
+                # As linhas são inseridas em lotes de arquivos, com uma única conversão por lote
+                if len(movimentos) == LOTE_ARQUIVOS:
+                    contagens['movimentos'] += _inserir(conexao, 'movimentos', movimentos)
+                    contagens['trials'] += _inserir(conexao, 'trials', trials)
+                    movimentos, trials = [], []
+                progresso.avancar(linhas=len(df))
+            contagens['movimentos'] += _inserir(conexao, 'movimentos', movimentos)
+            contagens['trials'] += _inserir(conexao, 'trials', trials)
+        if analises:
+            # O id é lido como texto para manter zeros à esquerda (ex: 0777), como nos nomes dos arquivos
+            df_resultados = ler_tabela(analises[0], linha_descricoes=True, textos=['id'])
+            contagens['metricas_sessao'] = _inserir(conexao, 'metricas_sessao', [tabela_metricas(df_resultados)])
+        else:
+            logging.warning(f"todos_usuarios_analises não encontrado em {pasta_analises}: "
+                            "tabela metricas_sessao vazia")
+        conexao.commit()
+    finally:
+        conexao.close()
+    os.replace(temporario, caminho)
+    return contagens
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Gera o banco SQLite dos participantes a partir de 01_dados_processados e "
+                    "03_analises_combinadas.")
+    parser.add_argument('--saida', default=CAMINHO_BANCO, help=f"Arquivo do banco (padrão: {CAMINHO_BANCO})")
+    parser.add_argument('--nivel-log', choices=NIVEIS_LOG, default='INFO',
+                        help="Nível mínimo das mensagens de log (padrão: INFO)")
+    parser.add_argument('--eventos',
+                        help="Acrescenta a este arquivo o log de eventos em JSON lines")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(args.nivel_log)
+    if args.eventos:
+        configurar_log_eventos(args.eventos)
+
+    if not os.path.exists("01_dados_processados"):
+        logging.error("Pasta 01_dados_processados não encontrada!")
+        return
+    contagens = criar_banco(args.saida)
+    print(f"Banco salvo: {args.saida} ({contagens['movimentos']} movimentos, {contagens['trials']} trials, "
+          f"{contagens['metricas_sessao']} métricas de sessão)")
+
+if __name__ == '__main__':
+    main()
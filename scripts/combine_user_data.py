@@ -1,9 +1,32 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import os
-import glob
 from pathlib import Path
 import logging
 
+from armazenamento import (FORMATOS, arquivos_tabela, caminho_indice, gravar_particionada, gravar_tabela,
+                           ler_particionada, ler_particoes, ler_tabela, nome_no_formato, verificar_formato)
+from eventos import NIVEIS_LOG, Progresso, configurar_log_eventos
+from process_all_files import ColetorLogs, num_cpus_disponiveis, reemitir_logs
+
+# Esquema das colunas dos arquivos processados: as colunas brutas do PEBL e as
+# calculadas por process_all_files.py. As colunas de texto nunca são convertidas;
+# as inteiras (e as colunas float fora do esquema) viram Int64 quando todos os
+# valores presentes são inteiros.
+INTEGER_COLUMNS = (
+    'sub', 'trial', 'size', 'step', 'reset', 'tries', 'score', 'abstime', 'trialtime', 'clicktime', 'done',
+    'movimentos_minimos', 'pontuacao_acumulada', 'caminhos_otimos', 'primeiros_movimentos_otimos',
+    'distancia_objetivo',
+)
+TEXT_COLUMNS = ('current', 'end', 'tipo_movimento')
+
+LAYOUTS = ('largo', 'longo')
+READ_BATCH_SIZE = 16  # Usuários lidos e combinados por tarefa do pool (--jobs)
+READ_THREADS = 8  # Threads de leitura por tarefa: a etapa é limitada por I/O em armazenamento de rede
+LONG_STORE_NAME = 'participantes_longo'  # Tabela longa de todos os participantes (layout longo)
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -20,8 +43,8 @@ def extract_user_id(filename):
     Returns:
         ID do usuário (ex: 4567)
     """
-    # Remove a extensão .csv
-    name_without_ext = filename.replace('.csv', '')
+    # Remove a extensão (.csv ou .parquet)
+    name_without_ext = os.path.splitext(filename)[0]
     
     # Divide pelo '_' e pega a segunda parte (índice 1)
     parts = name_without_ext.split('_')
@@ -40,8 +63,8 @@ def extract_test_number(filename):
     Returns:
         Número do teste (ex: 0, 1, 2)
     """
-    # Remove a extensão .csv
-    name_without_ext = filename.replace('.csv', '')
+    # Remove a extensão (.csv ou .parquet)
+    name_without_ext = os.path.splitext(filename)[0]
     
     # Divide pelo '_' e pega a primeira parte (índice 0)
     parts = name_without_ext.split('_')
@@ -53,23 +76,35 @@ def extract_test_number(filename):
 
 def convert_numeric_columns_to_int(df):
     """
-    Converte colunas numéricas de float para int.
+    Converte para Int64 as colunas float cujos valores presentes são todos inteiros.
+    
+    As colunas de texto do esquema (TEXT_COLUMNS) são ignoradas e uma coluna
+    inteira do esquema (INTEGER_COLUMNS) com valores fracionários gera um aviso.
+    A verificação é feita de uma só vez sobre o bloco NumPy de todas as colunas
+    float, sem percorrer os valores em Python.
     
     Args:
-        df: DataFrame
+        df: DataFrame (não é alterado)
         
     Returns:
-        DataFrame com colunas numéricas convertidas para int
+        DataFrame com as colunas convertidas (o próprio df se nenhuma coluna foi convertida)
     """
-    for col in df.columns:
-        # Verifica se a coluna é numérica
-        if df[col].dtype in ['float64', 'float32']:
-            # Verifica se todos os valores são inteiros (ou NaN)
-            if df[col].dropna().apply(lambda x: x.is_integer() if pd.notna(x) else True).all():
-                df[col] = df[col].astype('Int64')  # Usa Int64 para suportar NaN
-                logging.info(f"  Coluna {col} convertida para int")
+    float_cols = [col for col in df.columns
+                  if col not in TEXT_COLUMNS and pd.api.types.is_float_dtype(df[col])]
+    if not float_cols:
+        return df
     
-    return df
+    # Um valor é aceito se for inteiro ou ausente (NaN % 1 é NaN, que falha na comparação)
+    block = df[float_cols].to_numpy(dtype='float64')
+    integral = ((np.mod(block, 1) == 0) | np.isnan(block)).all(axis=0)
+    int_cols = [col for col, is_integral in zip(float_cols, integral) if is_integral]
+    unexpected = [col for col, is_integral in zip(float_cols, integral) if not is_integral and col in INTEGER_COLUMNS]
+    if unexpected:
+        logging.warning(f"  Colunas inteiras com valores fracionários mantidas como float: {unexpected}")
+    if not int_cols:
+        return df
+    logging.debug(f"  Colunas convertidas para int: {int_cols}")
+    return df.astype({col: 'Int64' for col in int_cols})  # Usa Int64 para suportar NaN
 
 def add_prefix_to_columns(df, prefix):
     """
@@ -94,7 +129,7 @@ def combine_user_files(user_id, files_dict):
     
     Args:
         user_id: ID do usuário
-        files_dict: Dicionário com os arquivos organizados por teste
+        files_dict: Dicionário com os arquivos (caminhos ou DataFrames) organizados por teste
         
     Returns:
         DataFrame combinado
@@ -108,12 +143,17 @@ def combine_user_files(user_id, files_dict):
     for test_num in ['0', '1', '2']:
         if test_num in files_dict:
             file_path = files_dict[test_num]
-            logging.info(f"  Processando {file_path}")
             
-            # Lê o arquivo
-            df = pd.read_csv(file_path)
+            if isinstance(file_path, pd.DataFrame):
+                # Dados já carregados (pipeline em processo)
+                logging.info(f"  Processando T{test_num} em memória")
+                df = file_path
+            else:
+                logging.info(f"  Processando {file_path}")
+                # Lê o arquivo (CSV ou Parquet)
+                df = ler_tabela(file_path)
             
-            # Converte colunas numéricas para int
+            # Normaliza os tipos uma única vez, na leitura (devolve uma cópia se algo mudar)
             df = convert_numeric_columns_to_int(df)
             
             # Adiciona prefixo às colunas
@@ -133,17 +173,15 @@ def combine_user_files(user_id, files_dict):
     if len(dfs) == 1:
         combined_df = dfs[0]
     else:
-        # Usa o primeiro DataFrame como base e adiciona as colunas dos outros
-        combined_df = dfs[0].copy()
-        
-        for i, df in enumerate(dfs[1:], 1):
-            # Adiciona todas as colunas do DataFrame atual
-            for col in df.columns:
-                if col not in combined_df.columns:
-                    combined_df[col] = df[col]
-    
-    # Converte colunas numéricas finais para int
-    combined_df = convert_numeric_columns_to_int(combined_df)
+        # Usa o primeiro DataFrame como base e alinha os outros ao seu índice
+        base = dfs[0]
+        aligned = [base]
+        for df in dfs[1:]:
+            if len(df) < len(base):
+                # As linhas que faltam ficam ausentes: colunas int64 passam a Int64 em vez de float64
+                df = df.astype({col: 'Int64' for col in df.columns if df[col].dtype == 'int64'})
+            aligned.append(df.reindex(base.index))
+        combined_df = pd.concat(aligned, axis=1)
     
     logging.info(f"  Arquivo combinado criado com {len(combined_df.columns)} colunas")
     return combined_df
@@ -168,6 +206,12 @@ def get_column_descriptions(columns):
         'done': 'Sucesso',
         'movimentos_minimos': 'MinMov',
         'pontuacao_acumulada': 'Acum',
+        'caminhos_otimos': 'CamOtim',
+        'primeiros_movimentos_otimos': 'PrimOtim',
+        'distancia_objetivo': 'DistObj',
+        'tipo_movimento': 'TipoMov',
+        'participante': 'Participante',
+        'sessao': 'Sessão',
     }
     # Para colunas com prefixo (T0_, T1_, T2_, etc)
     def desc(col):
@@ -178,33 +222,19 @@ def get_column_descriptions(columns):
         return desc_map.get(col, col)
     return [desc(col) for col in columns]
 
-def main():
-    # Criar pasta para os arquivos combinados
-    output_folder = "02_dados_combinados"
-    Path(output_folder).mkdir(exist_ok=True)
-    
-    # Pasta com os arquivos processados
-    input_folder = "01_dados_processados"
-    
-    # Verificar se a pasta existe
-    if not os.path.exists(input_folder):
-        logging.error(f"Pasta {input_folder} não encontrada!")
-        return
-    
-    # Encontrar todos os arquivos CSV
-    csv_files = glob.glob(os.path.join(input_folder, "*.csv"))
-    
-    if not csv_files:
-        logging.error(f"Nenhum arquivo CSV encontrado em {input_folder}")
-        return
-    
-    logging.info(f"Encontrados {len(csv_files)} arquivos CSV")
+def group_files_by_user(sources):
+    """
+    Organiza os arquivos processados por usuário e por teste.
     
-    # Organizar arquivos por usuário
+    Args:
+        sources: Dicionário {nome do arquivo: caminho ou DataFrame}
+        
+    Returns:
+        Dicionário {ID do usuário: {número do teste: caminho ou DataFrame}}
+    """
     users_files = {}
     
-    for file_path in csv_files:
-        filename = os.path.basename(file_path)
+    for filename, source in sources.items():
         user_id = extract_user_id(filename)
         test_num = extract_test_number(filename)
         
@@ -212,11 +242,34 @@ def main():
             if user_id not in users_files:
                 users_files[user_id] = {}
             
-            users_files[user_id][test_num] = file_path
+            users_files[user_id][test_num] = source
             logging.info(f"Arquivo {filename} -> Usuário {user_id}, Teste T{test_num}")
     
     logging.info(f"Organizados {len(users_files)} usuários")
+    return users_files
+
+def combine_all_users(sources):
+    """
+    Combina os arquivos de todos os usuários, um usuário por vez.
     
+    Args:
+        sources: Dicionário {nome do arquivo: caminho ou DataFrame}
+        
+    Yields:
+        Tuplas (ID do usuário, DataFrame combinado)
+    """
+    yield from combine_grouped_users(group_files_by_user(sources))
+
+def combine_grouped_users(users_files):
+    """
+    Combina os arquivos de usuários já organizados por group_files_by_user.
+    
+    Args:
+        users_files: Dicionário {ID do usuário: {número do teste: caminho ou DataFrame}}
+        
+    Yields:
+        Tuplas (ID do usuário, DataFrame combinado)
+    """
     # Processar cada usuário
     for user_id, files_dict in users_files.items():
         logging.info(f"Processando usuário {user_id}")
@@ -229,21 +282,406 @@ def main():
         combined_df = combine_user_files(user_id, files_dict)
         
         if combined_df is not None:
-            # Salvar arquivo combinado
-            output_file = os.path.join(output_folder, f"{user_id}_combined.csv")
-            # Adicionar linha de descrição curta acima do cabeçalho
-            descriptions = get_column_descriptions(combined_df.columns)
-            with open(output_file, 'w', encoding='utf-8', newline='') as f:
-                f.write(','.join(descriptions) + '\n')
-                # Salva o DataFrame garantindo que colunas numéricas sejam salvas como números
-                combined_df.to_csv(f, index=False, float_format='%.0f')
-            logging.info(f"Arquivo salvo: {output_file}")
-            
             # Mostrar informações sobre as colunas
             logging.info(f"  Colunas: {list(combined_df.columns)}")
             logging.info(f"  Linhas: {len(combined_df)}")
+            yield user_id, combined_df
         else:
             logging.error(f"Erro ao combinar arquivos para usuário {user_id}")
+
+def save_combined_file(user_id, combined_df, output_folder, file_format='csv'):
+    """
+    Salva o arquivo combinado de um usuário com as descrições curtas das colunas
+    (em CSV, uma linha acima do cabeçalho; em Parquet, nos metadados do esquema).
+    
+    Args:
+        user_id: ID do usuário
+        combined_df: DataFrame combinado
+        output_folder: Pasta de saída
+        file_format: Formato do arquivo ('csv' ou 'parquet')
+        
+    Returns:
+        Caminho do arquivo salvo
+    """
+    output_file = os.path.join(output_folder, nome_no_formato(f"{user_id}_combined", file_format))
+    descriptions = get_column_descriptions(combined_df.columns)
+    # Colunas numéricas são salvas como números inteiros
+    gravar_tabela(combined_df, output_file, descriptions, inteiros=True)
+    logging.info(f"Arquivo salvo: {output_file}")
+    return output_file
+
+def build_long_frame(user_id, files_dict):
+    """
+    Empilha as sessões (T0, T1, T2) de um participante em formato longo.
+    
+    Ao contrário de combine_user_files, as sessões não são alinhadas pelo índice:
+    cada linha de cada sessão é mantida uma única vez, sem preenchimento com NaN.
+    
+    Args:
+        user_id: ID do usuário
+        files_dict: Dicionário com os arquivos (caminhos ou DataFrames) organizados por teste
+        
+    Returns:
+        DataFrame com as colunas participante e sessao (0, 1 ou 2) seguidas das
+        colunas processadas, ou None se nenhum teste foi encontrado
+    """
+    sessions = []
+    for test_num in ['0', '1', '2']:
+        if test_num not in files_dict:
+            logging.warning(f"  Arquivo para teste T{test_num} não encontrado para usuário {user_id}")
+            continue
+        source = files_dict[test_num]
+        df = source.copy() if isinstance(source, pd.DataFrame) else ler_tabela(source)
+        df.insert(0, 'sessao', int(test_num))
+        df.insert(0, 'participante', user_id)
+        sessions.append(df)
+    
+    if not sessions:
+        logging.error(f"Nenhum arquivo encontrado para usuário {user_id}")
+        return None
+    return pd.concat(sessions, ignore_index=True)
+
+def stack_all_users(sources):
+    """
+    Monta o formato longo de todos os usuários, um usuário por vez.
+    
+    Args:
+        sources: Dicionário {nome do arquivo: caminho ou DataFrame}
+        
+    Yields:
+        Tuplas (ID do usuário, DataFrame longo)
+    """
+    yield from stack_grouped_users(group_files_by_user(sources))
+
+def stack_grouped_users(users_files):
+    """
+    Monta o formato longo de usuários já organizados por group_files_by_user.
+    
+    Args:
+        users_files: Dicionário {ID do usuário: {número do teste: caminho ou DataFrame}}
+        
+    Yields:
+        Tuplas (ID do usuário, DataFrame longo)
+    """
+    for user_id, files_dict in users_files.items():
+        if len(files_dict) < 3:
+            logging.warning(f"Usuário {user_id} tem apenas {len(files_dict)} testes (esperado: 3)")
+        long_df = build_long_frame(user_id, files_dict)
+        if long_df is not None:
+            logging.info(f"Usuário {user_id}: {len(long_df)} linhas em {len(files_dict)} sessões")
+            yield user_id, long_df
+
+def save_long_store(long_frames, output_folder, file_format='csv'):
+    """
+    Grava o formato longo de todos os usuários em uma única tabela particionada por participante.
+    
+    A tabela (participantes_longo.csv ou .parquet) é acompanhada do índice
+    participantes_longo.indice.json, com a posição de cada participante no
+    arquivo, de modo que um participante pode ser lido sem percorrer os demais
+    (ver read_long_store).
+    
+    Args:
+        long_frames: Dicionário {ID do usuário: DataFrame longo}, na ordem de gravação
+        output_folder: Pasta de saída
+        file_format: Formato do arquivo ('csv' ou 'parquet')
+        
+    Returns:
+        Caminho do arquivo salvo
+    """
+    output_file = os.path.join(output_folder, nome_no_formato(LONG_STORE_NAME, file_format))
+    columns = next(iter(long_frames.values())).columns if long_frames else []
+    descriptions = get_column_descriptions(columns) if long_frames else None
+    # Colunas numéricas são salvas como números inteiros, como nos arquivos combinados
+    gravar_particionada(long_frames, output_file, descriptions, inteiros=True)
+    logging.info(f"Arquivo salvo: {output_file} ({len(long_frames)} participantes)")
+    return output_file
+
+def read_long_store(folder='02_dados_combinados', user_ids=None):
+    """
+    Lê a tabela longa gravada por save_long_store, um participante de cada vez.
+    
+    Args:
+        folder: Pasta da tabela
+        user_ids: IDs dos participantes a ler (padrão: todos, na ordem de gravação)
+        
+    Yields:
+        Tuplas (ID do usuário, DataFrame longo do participante); a coluna
+        participante recebe o ID do índice, como texto
+        
+    Raises:
+        FileNotFoundError: Se a tabela não existir na pasta
+    """
+    store_files = arquivos_tabela(folder, LONG_STORE_NAME)
+    if not store_files:
+        raise FileNotFoundError(f"Tabela {LONG_STORE_NAME} não encontrada em {folder}")
+    for user_id, long_df in ler_particoes(store_files[0], user_ids):
+        # Relida do arquivo, a coluna seria numérica e perderia zeros à esquerda dos IDs
+        long_df['participante'] = user_id
+        yield user_id, long_df
+
+def read_long_store_table(folder='02_dados_combinados'):
+    """
+    Lê a tabela longa gravada por save_long_store inteira, de uma só vez.
+    
+    Args:
+        folder: Pasta da tabela
+        
+    Returns:
+        Tupla (DataFrame longo de todos os participantes, lista dos IDs na ordem
+        de gravação); a coluna participante recebe os IDs do índice, como texto
+        
+    Raises:
+        FileNotFoundError: Se a tabela não existir na pasta
+    """
+    store_files = arquivos_tabela(folder, LONG_STORE_NAME)
+    if not store_files:
+        raise FileNotFoundError(f"Tabela {LONG_STORE_NAME} não encontrada em {folder}")
+    long_df, rows_by_user = ler_particionada(store_files[0], linha_descricoes=True)
+    # Relida do arquivo, a coluna seria numérica e perderia zeros à esquerda dos IDs
+    long_df['participante'] = np.repeat(list(rows_by_user), list(rows_by_user.values()))
+    return long_df, list(rows_by_user)
+
+def long_to_wide(long_df):
+    """
+    Reconstrói o DataFrame combinado de um participante (colunas com prefixo T0_,
+    T1_, T2_) a partir do formato longo.
+    
+    As sessões são alinhadas pela posição da linha à primeira sessão, como em
+    combine_user_files, e os tipos são os que pd.read_csv produziria ao reler o
+    arquivo combinado (float64 nas colunas com valores ausentes), de modo que as
+    métricas calculadas são idênticas às do layout largo.
+    
+    Args:
+        long_df: DataFrame longo de um participante
+        
+    Returns:
+        DataFrame combinado
+    """
+    wide = None
+    for session, session_df in long_df.groupby('sessao', sort=True):
+        session_df = session_df.drop(columns=['participante', 'sessao']).reset_index(drop=True)
+        session_df = add_prefix_to_columns(session_df, f"T{session}_")
+        wide = session_df if wide is None else pd.concat([wide, session_df.reindex(wide.index)], axis=1)
+    if wide is None:
+        return pd.DataFrame()
+    
+    for col in wide.columns:
+        values = wide[col]
+        if pd.api.types.is_float_dtype(values) and len(values) and not values.hasnans \
+                and np.all(np.mod(values.to_numpy(), 1) == 0):
+            wide[col] = values.astype('int64')
+    return wide
+
+def remove_other_layout(output_folder, layout):
+    """
+    Remove os arquivos do outro layout deixados por uma execução anterior.
+    
+    Args:
+        output_folder: Pasta dos dados combinados
+        layout: Layout gravado nesta execução ('largo' ou 'longo')
+    """
+    if layout == 'longo':
+        stale_files = arquivos_tabela(output_folder, '*_combined')
+    else:
+        stale_files = arquivos_tabela(output_folder, LONG_STORE_NAME)
+        stale_files += [caminho_indice(path) for path in stale_files]
+    for path in stale_files:
+        if os.path.exists(path):
+            os.remove(path)
+
+def _read_table_or_error(path):
+    """Lê uma tabela, devolvendo (DataFrame, None) ou, se a leitura falhar, (None, exceção)."""
+    try:
+        return ler_tabela(path), None
+    except Exception as e:
+        return None, e
+
+def read_batch(users_files, threads=READ_THREADS):
+    """
+    Lê com um pool de threads todos os arquivos de um lote de usuários.
+    
+    Um usuário com algum arquivo ilegível é registrado no log e deixado de fora,
+    sem afetar os demais usuários do lote.
+    
+    Args:
+        users_files: Dicionário {ID do usuário: {número do teste: caminho}}
+        threads: Número máximo de leituras simultâneas
+        
+    Returns:
+        O mesmo dicionário, com cada caminho substituído pelo DataFrame lido,
+        apenas com os usuários cujos arquivos foram todos lidos
+    """
+    paths = [path for files_dict in users_files.values() for path in files_dict.values()]
+    with ThreadPoolExecutor(max_workers=max(1, min(threads, len(paths)))) as executor:
+        results = iter(list(executor.map(_read_table_or_error, paths)))
+    batch = {}
+    for user_id, files_dict in users_files.items():
+        user_results = {test_num: next(results) for test_num in files_dict}
+        errors = [(files_dict[test_num], error) for test_num, (_, error) in user_results.items() if error]
+        for path, error in errors:
+            logging.error(f"Usuário {user_id} ignorado: erro ao ler {path}: {error}")
+        if not errors:
+            batch[user_id] = {test_num: df for test_num, (df, _) in user_results.items()}
+    return batch
+
+def combine_batch(users_files, output_folder, file_format='csv', layout='largo'):
+    """
+    Lê, combina e salva um lote de usuários.
+    
+    Os erros são isolados por usuário: um usuário que não pode ser lido,
+    combinado ou salvo é registrado no log e os demais seguem normalmente.
+    
+    Args:
+        users_files: Dicionário {ID do usuário: {número do teste: caminho}}
+        output_folder: Pasta de saída
+        file_format: Formato dos arquivos combinados ('csv' ou 'parquet')
+        layout: 'largo' (os arquivos são salvos aqui) ou 'longo' (os DataFrames
+            longos são devolvidos para serem gravados em uma única tabela)
+        
+    Returns:
+        Tupla (DataFrames longos por usuário, vazio no layout largo; total de linhas combinadas)
+    """
+    users_files = read_batch(users_files)
+    long_frames = {}
+    rows = 0
+    for user_id, files_dict in users_files.items():
+        try:
+            if layout == 'longo':
+                for _, long_df in stack_grouped_users({user_id: files_dict}):
+                    long_frames[user_id] = long_df
+                    rows += len(long_df)
+            else:
+                for _, combined_df in combine_grouped_users({user_id: files_dict}):
+                    save_combined_file(user_id, combined_df, output_folder, file_format)
+                    rows += len(combined_df)
+        except Exception as e:
+            long_frames.pop(user_id, None)
+            logging.error(f"Erro ao combinar o usuário {user_id}: {e}")
+    return long_frames, rows
+
+def _combine_batch_worker(users_files, output_folder, file_format, layout, log_level):
+    """
+    Executa combine_batch em um processo do pool, coletando os logs em vez de emiti-los.
+    
+    Returns:
+        Tupla (registros de log gerados, DataFrames longos por usuário, total de linhas combinadas)
+    """
+    root = logging.getLogger()
+    previous_handlers = root.handlers[:]
+    collector = ColetorLogs()
+    root.handlers = [collector]
+    root.setLevel(log_level)
+    try:
+        long_frames, rows = combine_batch(users_files, output_folder, file_format, layout)
+    finally:
+        root.handlers = previous_handlers
+    return collector.registros, long_frames, rows
+
+def combine_in_batches(users_files, output_folder, file_format='csv', layout='largo', jobs=1, progress=None):
+    """
+    Combina todos os usuários em lotes de READ_BATCH_SIZE, em um pool de processos se jobs > 1.
+    
+    Os lotes são processados em paralelo, mas os logs e os DataFrames longos são
+    recolhidos na ordem dos usuários, de modo que o log e os arquivos gravados
+    são os mesmos para qualquer número de processos.
+    Em série ou em paralelo, um usuário com erro é ignorado sem afetar os
+    demais do seu lote (ver combine_batch).
+    
+    Args:
+        users_files: Dicionário {ID do usuário: {número do teste: caminho}}
+        output_folder: Pasta de saída
+        file_format: Formato dos arquivos combinados ('csv' ou 'parquet')
+        layout: 'largo' ou 'longo' (ver combine_batch)
+        jobs: Número de processos
+        progress: Progresso avançado a cada lote concluído (opcional)
+        
+    Returns:
+        DataFrames longos por usuário, na ordem dos usuários (vazio no layout largo)
+    """
+    user_ids = list(users_files)
+    batches = [{user_id: users_files[user_id] for user_id in user_ids[i:i + READ_BATCH_SIZE]}
+               for i in range(0, len(user_ids), READ_BATCH_SIZE)]
+    long_frames = {}
+    jobs = max(1, min(jobs, len(batches)))
+    if jobs == 1:
+        for batch in batches:
+            batch_frames, rows = combine_batch(batch, output_folder, file_format, layout)
+            long_frames.update(batch_frames)
+            if progress:
+                progress.avancar(len(batch), rows)
+        return long_frames
+    
+    logging.info(f"Combinando {len(user_ids)} usuários em {len(batches)} lotes com {jobs} processos")
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_combine_batch_worker, batch, output_folder, file_format, layout,
+                                   logging.getLogger().level)
+                   for batch in batches]
+        for batch, future in zip(batches, futures):
+            try:
+                records, batch_frames, rows = future.result()
+            except Exception as e:
+                logging.error(f"Erro ao combinar os usuários {', '.join(batch)}: {e}")
+                rows = 0
+            else:
+                reemitir_logs(records)
+                long_frames.update(batch_frames)
+            if progress:
+                progress.avancar(len(batch), rows)
+    return long_frames
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Combina os arquivos T0, T1 e T2 de cada usuário de 01_dados_processados em 02_dados_combinados.")
+    parser.add_argument('--formato', choices=FORMATOS, default='csv',
+                        help="Formato dos arquivos combinados (padrão: csv; parquet requer pyarrow)")
+    parser.add_argument('--layout', choices=LAYOUTS, default='largo',
+                        help="largo: um arquivo por usuário com colunas T0_, T1_ e T2_ (padrão); "
+                             f"longo: uma única tabela {LONG_STORE_NAME} com a coluna sessao, "
+                             "particionada por participante")
+    parser.add_argument('--jobs', type=int, default=num_cpus_disponiveis(),
+                        help="Número de processos que combinam os usuários em lotes (padrão: CPUs disponíveis); "
+                             "run_pipeline.py repassa o seu --jobs")
+    parser.add_argument('--nivel-log', choices=NIVEIS_LOG, default='INFO',
+                        help="Nível mínimo das mensagens de log (padrão: INFO)")
+    parser.add_argument('--eventos',
+                        help="Acrescenta a este arquivo o log de eventos em JSON lines")
+    args = parser.parse_args(argv)
+    try:
+        verificar_formato(args.formato)
+    except ImportError as e:
+        parser.error(str(e))
+    logging.getLogger().setLevel(args.nivel_log)
+    if args.eventos:
+        configurar_log_eventos(args.eventos)
+    
+    # Criar pasta para os arquivos combinados
+    output_folder = "02_dados_combinados"
+    Path(output_folder).mkdir(exist_ok=True)
+    
+    # Pasta com os arquivos processados
+    input_folder = "01_dados_processados"
+    
+    # Verificar se a pasta existe
+    if not os.path.exists(input_folder):
+        logging.error(f"Pasta {input_folder} não encontrada!")
+        return
+    
+    # Encontrar todos os arquivos processados (CSV ou Parquet)
+    csv_files = arquivos_tabela(input_folder)
+    
+    if not csv_files:
+        logging.error(f"Nenhum arquivo CSV ou Parquet encontrado em {input_folder}")
+        return
+    
+    logging.info(f"Encontrados {len(csv_files)} arquivos processados")
+    
+    sources = {os.path.basename(file_path): file_path for file_path in csv_files}
+    users_files = group_files_by_user(sources)
+    with Progresso('combinacao', len(users_files), 'usuários') as progress:
+        long_frames = combine_in_batches(users_files, output_folder, args.formato, args.layout, args.jobs, progress)
+    if args.layout == 'longo':
+        save_long_store(long_frames, output_folder, args.formato)
+    remove_other_layout(output_folder, args.layout)
     
     logging.info("Processamento concluído!")
 
@@ -0,0 +1,206 @@
+"""
+Log estruturado de eventos do pipeline TOL.
+
+Cada registro de log é gravado como uma linha JSON (JSON lines) com o momento,
+o nível, o processo, o nome do evento e a mensagem já formatada. Os campos
+passados em extra=evento(...) são incluídos no registro, o que permite somar
+os contadores de cada arquivo sem interpretar as mensagens.
+
+O módulo também oferece o canal de progresso (ver Progresso) pelo qual as
+etapas executadas como subprocessos informam seu andamento ao run_pipeline.py,
+e os pulsos (ver pulsar) que operações longas sem itens concluídos enviam
+para não serem confundidas com uma etapa travada.
+
+Exemplo:
+    logging.info("Arquivo %s processado", nome, extra=evento('arquivo_processado', arquivo=nome, trials=12))
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, Union
+
+NIVEIS_LOG = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+VARIAVEL_PROGRESSO = 'TOL_ARQUIVO_PROGRESSO'  # Arquivo do canal de progresso, definido pelo run_pipeline.py
+INTERVALO_PROGRESSO = 1.0  # Segundos mínimos entre duas mensagens no canal de progresso
+INTERVALO_PROGRESSO_LOG = 10.0  # Segundos mínimos entre duas mensagens de progresso no log
+
+def evento(nome: str, **campos) -> Dict[str, Union[str, dict]]:
+    """
+    Monta o argumento extra de uma chamada de logging com o nome e os campos do evento.
+
+    Args:
+        nome: Nome do evento (ex: arquivo_processado)
+        **campos: Campos gravados no log de eventos (valores serializáveis em JSON)
+
+    Returns:
+        Dicionário para o argumento extra
+    """
+    return {'evento': nome, 'campos': campos}
+
+class FormatadorJSON(logging.Formatter):
+    """Formata cada registro de log como uma linha JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        registro = {
+            'momento': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'processo': record.process,
+            'evento': getattr(record, 'evento', 'log'),
+            'mensagem': record.getMessage(),
+        }
+        registro.update(getattr(record, 'campos', {}))
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+def configurar_log_eventos(caminho: str) -> logging.Handler:
+    """
+    Acrescenta ao logger raiz um handler que grava o log de eventos em JSON lines.
+
+    O arquivo é aberto em modo de acréscimo, de modo que o pipeline e os scripts
+    executados como subprocessos podem gravar no mesmo log.
+
+    Args:
+        caminho: Arquivo do log de eventos
+
+    Returns:
+        Handler criado (para removê-lo com logging.getLogger().removeHandler)
+    """
+    handler = logging.FileHandler(caminho, encoding='utf-8')
+    handler.setFormatter(FormatadorJSON())
+    logging.getLogger().addHandler(handler)
+    return handler
+
+_ultimo_pulso = 0.0  # Momento (time.monotonic) do último pulso enviado por este processo
+
+def pulsar() -> None:
+    """
+    Informa ao run_pipeline.py que a etapa continua trabalhando, mesmo sem itens concluídos.
+
+    Deve ser chamada dentro de operações longas (leitura e gravação de tabelas
+    grandes, buscas difíceis do solver). Custa uma leitura do relógio: no máximo
+    um pulso é enviado a cada INTERVALO_PROGRESSO segundos, e apenas quando o
+    canal de progresso está definido, inclusive antes de um Progresso ser
+    criado ou depois de ele ser fechado.
+    """
+    global _ultimo_pulso
+    agora = time.monotonic()
+    if agora - _ultimo_pulso < INTERVALO_PROGRESSO:
+        return
+    _ultimo_pulso = agora
+    caminho = os.environ.get(VARIAVEL_PROGRESSO)
+    if caminho:
+        with open(caminho, 'a', encoding='utf-8') as canal:
+            canal.write(json.dumps({'pulso': round(agora, 3)}) + '\n')
+
+class LeituraComPulso:
+    """
+    Envolve um arquivo aberto para leitura e chama pulsar a cada bloco lido, de
+    modo que a leitura de um arquivo grande por pd.read_csv envia pulsos.
+
+    Exemplo:
+        with open(caminho, 'rb') as arquivo:
+            df = pd.read_csv(LeituraComPulso(arquivo))
+    """
+
+    def __init__(self, arquivo: IO):
+        self._arquivo = arquivo
+
+    def read(self, tamanho: int = -1):
+        pulsar()
+        return self._arquivo.read(tamanho)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._arquivo)
+
+class Progresso:
+    """
+    Informa o andamento de uma fase de uma etapa: itens concluídos, total e linhas processadas.
+
+    Quando a variável de ambiente VARIAVEL_PROGRESSO aponta para um arquivo, as
+    atualizações são acrescentadas a ele como linhas JSON, que o run_pipeline.py
+    lê para exibir o progresso e detectar etapas travadas. Caso contrário, o
+    progresso é registrado no log. As atualizações são limitadas por tempo, de
+    modo que o custo por item é desprezível.
+
+    Exemplo:
+        with Progresso('processamento', len(arquivos)) as progresso:
+            for arquivo in arquivos:
+                ...
+                progresso.avancar(linhas=len(df))
+    """
+
+    def __init__(self, fase: str, total: int, unidade: str = 'arquivos'):
+        self.fase = fase
+        self.total = total
+        self.unidade = unidade
+        self.concluidos = 0
+        self.linhas = 0
+        self.inicio = self._ultimo_envio = time.monotonic()
+        caminho = os.environ.get(VARIAVEL_PROGRESSO)
+        self._canal = open(caminho, 'a', encoding='utf-8') if caminho else None
+        if self._canal:
+            self._enviar(self.inicio)
+
+    def __enter__(self) -> 'Progresso':
+        return self
+
+    def __exit__(self, *excecao) -> None:
+        self.fechar()
+
+    def avancar(self, itens: int = 1, linhas: int = 0) -> None:
+        """
+        Soma itens concluídos e linhas processadas e envia o progresso se o intervalo mínimo já passou.
+
+        Args:
+            itens: Itens concluídos desde a última chamada
+            linhas: Linhas processadas desde a última chamada
+        """
+        self.concluidos += itens
+        self.linhas += linhas
+        agora = time.monotonic()
+        intervalo = INTERVALO_PROGRESSO if self._canal else INTERVALO_PROGRESSO_LOG
+        if agora - self._ultimo_envio >= intervalo or (self._canal and self.concluidos >= self.total):
+            self._enviar(agora)
+
+    def acompanhar(self, itens: Iterable) -> Iterator:
+        """
+        Percorre os itens avançando o progresso depois de cada um (inclusive os
+        interrompidos com continue) e fecha o canal ao final.
+
+        Args:
+            itens: Itens da fase
+
+        Yields:
+            Cada item
+        """
+        try:
+            for item in itens:
+                yield item
+                self.avancar()
+        finally:
+            self.fechar()
+
+    def fechar(self) -> None:
+        """Fecha o canal de progresso."""
+        if self._canal:
+            self._canal.close()
+            self._canal = None
+
+    def _enviar(self, agora: float) -> None:
+        self._ultimo_envio = agora
+        dados = {
+            'fase': self.fase,
+            'concluidos': self.concluidos,
+            'total': self.total,
+            'unidade': self.unidade,
+            'linhas': self.linhas,
+            'segundos': round(agora - self.inicio, 3),
+        }
+        if self._canal:
+            self._canal.write(json.dumps(dados, ensure_ascii=False) + '\n')
+            self._canal.flush()
+        else:
+            logging.info("Progresso (%s): %d/%d %s, %d linhas", self.fase, self.concluidos, self.total,
+                         self.unidade, self.linhas, extra=evento('progresso', **dados))
@@ -1,11 +1,23 @@
 import pandas as pd
-from collections import deque
-import copy
+import numpy as np
+import argparse
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import heapq
 import logging
-from typing import List, Tuple, Set, Optional
+from itertools import permutations
+from math import factorial
+from typing import Dict, List, Tuple, Set, Optional, Sequence, Union
 import os
 import glob
+import json
+import time
 from pathlib import Path
+import sqlite3
+
+from armazenamento import FORMATOS, gravar_tabela, nome_no_formato, verificar_formato
+from eventos import NIVEIS_LOG, LeituraComPulso, Progresso, configurar_log_eventos, evento, pulsar
 
 # Configuração de logging
 logging.basicConfig(
@@ -17,6 +29,23 @@ logging.basicConfig(
 NUM_PINOS = 3
 PONTUACAO_INICIAL = 10
 PONTUACAO_MINIMA = 0
+MAX_MOVIMENTOS = 1000  # Limite máximo de movimentos para evitar loops infinitos
+BACKENDS_SOLVER = ('auto', 'tabela', 'bidirecional', 'astar')
+BACKEND_SOLVER = 'auto'  # Backend usado por movimentos_minimos quando nenhum é informado
+LIMITE_ESTADOS_TABELA = 50000  # Maior espaço de estados enumerado em uma tabela de distâncias
+LIMITE_CAMINHOS_OTIMOS = 2**63 - 1  # Contagens de caminhos maiores são truncadas (colunas int64)
+LIMITE_ESTADOS_BIDIRECIONAL = 2000000  # Acima disso a busca usa A*
+EXPANSOES_POR_PULSO = 4096  # Expansões do A* entre duas chamadas a pulsar (ver eventos.pulsar)
+CAMINHO_CACHE_SOLVER = ".cache_solver.sqlite"  # Na raiz da saída, fora das pastas intermediárias
+CAPACIDADE_CACHE_SOLVER = 100000  # Número máximo de puzzles mantidos no cache persistente
+VERSAO_CACHE_SOLVER = 1  # Incrementar sempre que o significado dos movimentos guardados mudar
+INTERVALO_AMOSTRA_DEBUG = 100  # Em DEBUG, detalha um a cada N trials resolvidos de cada arquivo
+MAX_LINHAS_ERRO_LOG = 10  # Linhas com erro listadas na mensagem de cada arquivo
+
+# Instrumentação do processo atual: contadores do solver (expansões de busca,
+# reaproveitamento de tabelas e do cache) e medidas de cada arquivo processado
+CONTADORES: Counter = Counter()
+MEDIDAS_ARQUIVOS: List[Dict[str, Union[str, int, float]]] = []
 
 class EstadoInvalidoError(Exception):
     """Exceção lançada quando um estado é inválido."""
@@ -58,25 +87,48 @@ def estado_para_tupla(estado: List[List[str]]) -> Tuple[Tuple[str, ...], ...]:
     """
     return tuple(tuple(pino) for pino in estado)
 
-def movimentos_possiveis(estado: List[List[str]], altura_max: int) -> List[List[List[str]]]:
+def capacidades_pinos(altura_max: Union[int, Sequence[int]], num_pinos: int) -> Tuple[int, ...]:
+    """
+    Converte a altura máxima em uma tupla com a capacidade de cada pino.
+
+    Args:
+        altura_max: Altura máxima comum a todos os pinos, ou uma altura por pino
+        num_pinos: Número de pinos do estado
+
+    Returns:
+        Tupla com a capacidade de cada pino
+
+    Raises:
+        EstadoInvalidoError: Se o número de capacidades não corresponder ao número de pinos
+    """
+    if isinstance(altura_max, (list, tuple)):
+        if len(altura_max) != num_pinos:
+            raise EstadoInvalidoError(
+                f"Foram informadas {len(altura_max)} capacidades para {num_pinos} pinos"
+            )
+        return tuple(int(altura) for altura in altura_max)
+    return (int(altura_max),) * num_pinos
+
+def movimentos_possiveis(estado: List[List[str]], altura_max: Union[int, Sequence[int]]) -> List[List[List[str]]]:
     """
     Gera todos os próximos estados válidos a partir do estado atual.
     
     Args:
         estado: Estado atual dos pinos
-        altura_max: Altura máxima permitida para cada pino
+        altura_max: Altura máxima permitida para cada pino (ou uma por pino)
         
     Returns:
         Lista de estados possíveis após um movimento
     """
+    capacidades = capacidades_pinos(altura_max, len(estado))
     estados = []
     for i in range(len(estado)):
         if not estado[i]:  # Pula pinos vazios
             continue
         bola = estado[i][-1]
         for j in range(len(estado)):
-            if i != j and len(estado[j]) < altura_max:
-                novo_estado = copy.deepcopy(estado)
+            if i != j and len(estado[j]) < capacidades[j]:
+                novo_estado = [list(pino) for pino in estado]
                 novo_estado[i].pop()
                 novo_estado[j].append(bola)
                 estados.append(novo_estado)
@@ -110,15 +162,389 @@ def normalizar_estados(estado_inicial: List[List[str]], estado_final: List[List[
 
     return estado_inicial, estado_final
 
-def movimentos_minimos(estado_inicial: List[List[str]], estado_objetivo: List[List[str]], altura_max: int) -> int:
+def distribuicoes_pinos(total_bolas: int, capacidades: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+    """
+    Lista todas as formas de distribuir as bolas entre os pinos respeitando as capacidades.
+
+    Args:
+        total_bolas: Número total de bolas
+        capacidades: Capacidade de cada pino
+
+    Returns:
+        Lista de tuplas com a quantidade de bolas em cada pino
+    """
+    if not capacidades:
+        return [()] if total_bolas == 0 else []
+    distribuicoes = []
+    for primeiro in range(min(total_bolas, capacidades[0]) + 1):
+        for resto in distribuicoes_pinos(total_bolas - primeiro, capacidades[1:]):
+            distribuicoes.append((primeiro,) + resto)
+    return distribuicoes
+
+def contar_estados(bolas: Sequence[str], capacidades: Tuple[int, ...]) -> int:
+    """
+    Conta os estados de uma configuração sem enumerá-los.
+
+    Args:
+        bolas: Bolas presentes no puzzle
+        capacidades: Capacidade de cada pino
+
+    Returns:
+        Número de estados (permutações distintas das bolas x distribuições entre os pinos)
+    """
+    permutacoes = factorial(len(bolas))
+    for repeticoes in Counter(bolas).values():
+        permutacoes //= factorial(repeticoes)
+
+    # formas[n] = número de distribuições de n bolas entre os pinos já considerados
+    formas = [1] + [0] * len(bolas)
+    for capacidade in capacidades:
+        formas = [sum(formas[n - k] for k in range(min(n, capacidade) + 1)) for n in range(len(bolas) + 1)]
+    return permutacoes * formas[len(bolas)]
+
+def empacotar_estado(estado: List[List[str]]) -> str:
+    """
+    Empacota um estado em uma string compacta, usada como chave de busca.
+
+    Cada bola é um único caractere, então o separador '|' entre os pinos
+    torna a representação inequívoca (ex: [['A'], ['B', 'C'], []] -> 'A|BC|').
+
+    Args:
+        estado: Estado dos pinos (listas ou tuplas)
+
+    Returns:
+        String com o conteúdo dos pinos separado por '|'
+    """
+    return '|'.join([''.join(pino) for pino in estado])
+
+def _sucessores(pinos: Tuple[str, ...], capacidades: Tuple[int, ...]) -> List[Tuple[str, ...]]:
+    """
+    Gera os estados alcançáveis com um movimento, com cada pino representado por uma string.
+
+    Args:
+        pinos: Conteúdo de cada pino (ex: ('A', 'BC', ''))
+        capacidades: Capacidade de cada pino
+
+    Returns:
+        Lista de estados vizinhos no mesmo formato
+    """
+    sucessores = []
+    for i, pino in enumerate(pinos):
+        if not pino:
+            continue
+        restante = pino[:-1]
+        bola = pino[-1]
+        for j, capacidade in enumerate(capacidades):
+            if i != j and len(pinos[j]) < capacidade:
+                proximo = list(pinos)
+                proximo[i] = restante
+                proximo[j] = pinos[j] + bola
+                sucessores.append(tuple(proximo))
+    return sucessores
+
+class TabelaDistancias:
+    """
+    Tabela de distâncias mínimas entre todos os estados de uma configuração
+    (multiconjunto de bolas e capacidade de cada pino).
+
+    Os estados são enumerados uma única vez na construção e codificados como
+    inteiros (seu índice na enumeração). As transições ficam em um grafo no
+    formato CSR: os vizinhos do estado i são destinos[inicio[i]:inicio[i + 1]].
+    Cada linha da matriz de distâncias é obtida por uma BFS sobre esse grafo na
+    primeira consulta e mantida em memória, de modo que as consultas seguintes
+    são O(1). Todo movimento pode ser desfeito, então o grafo é não direcionado
+    e as consultas usam a linha do estado objetivo: todas as distâncias até um
+    mesmo objetivo saem de uma única BFS.
+    """
+
+    def __init__(self, bolas: Tuple[str, ...], capacidades: Tuple[int, ...]):
+        self.bolas = bolas
+        self.capacidades = capacidades
+
+        # Enumera todos os estados: cada permutação distinta das bolas, fatiada
+        # por cada distribuição válida de alturas entre os pinos
+        self.estados: List[Tuple[Tuple[str, ...], ...]] = []
+        for ordem in sorted(set(permutations(bolas))):
+            for alturas in distribuicoes_pinos(len(bolas), capacidades):
+                estado = []
+                inicio = 0
+                for altura in alturas:
+                    estado.append(tuple(ordem[inicio:inicio + altura]))
+                    inicio += altura
+                self.estados.append(tuple(estado))
+        self.indices: Dict[str, int] = {
+            empacotar_estado(estado): indice for indice, estado in enumerate(self.estados)
+        }
+
+        # Grafo de transições no formato CSR, construído sem cópias profundas
+        self.inicio = array('i', [0])
+        self.destinos = array('i')
+        for estado in self.estados:
+            pinos = tuple(''.join(pino) for pino in estado)
+            for proximo in _sucessores(pinos, capacidades):
+                self.destinos.append(self.indices['|'.join(proximo)])
+            self.inicio.append(len(self.destinos))
+
+        self._linhas: Dict[int, array] = {}
+        self._caminhos: Dict[int, List[int]] = {}
+
+    def linha(self, origem: int) -> array:
+        """
+        Retorna as distâncias do estado de origem para todos os estados (-1 se inalcançável).
+
+        Args:
+            origem: Índice do estado de origem
+
+        Returns:
+            Array de distâncias indexado pelo índice do estado
+        """
+        distancias = self._linhas.get(origem)
+        if distancias is not None:
+            CONTADORES['linhas_reaproveitadas'] += 1
+        else:
+            inicio = self.inicio
+            destinos = self.destinos
+            distancias = array('h', [-1]) * len(self.estados)
+            distancias[origem] = 0
+            fila = [origem]
+            cabeca = 0
+            while cabeca < len(fila):
+                atual = fila[cabeca]
+                cabeca += 1
+                passos = distancias[atual] + 1
+                for k in range(inicio[atual], inicio[atual + 1]):
+                    prox = destinos[k]
+                    if distancias[prox] == -1:
+                        distancias[prox] = passos
+                        fila.append(prox)
+            self._linhas[origem] = distancias
+            CONTADORES['linhas_bfs'] += 1
+            CONTADORES['expansoes_bfs'] += len(fila)
+        return distancias
+
+    def caminhos(self, destino: int) -> List[int]:
+        """
+        Conta os caminhos mínimos de cada estado até o destino.
+
+        Programação dinâmica sobre as camadas da BFS a partir do destino: o número
+        de caminhos de um estado na camada d é a soma dos caminhos dos seus
+        vizinhos na camada d - 1.
+
+        Args:
+            destino: Índice do estado de destino
+
+        Returns:
+            Lista com o número de caminhos mínimos de cada estado (0 se inalcançável)
+        """
+        caminhos = self._caminhos.get(destino)
+        if caminhos is None:
+            distancias = self.linha(destino)
+            caminhos = [0] * len(self.estados)
+            caminhos[destino] = 1
+            camadas = sorted((indice for indice, d in enumerate(distancias) if d > 0), key=distancias.__getitem__)
+            for atual in camadas:
+                anterior = distancias[atual] - 1
+                caminhos[atual] = sum(
+                    caminhos[self.destinos[k]]
+                    for k in range(self.inicio[atual], self.inicio[atual + 1])
+                    if distancias[self.destinos[k]] == anterior
+                )
+            self._caminhos[destino] = caminhos
+        return caminhos
+
+    def primeiros_movimentos(self, origem: int, destino: int) -> int:
+        """
+        Conta os movimentos a partir da origem que iniciam algum caminho mínimo até o destino.
+
+        Args:
+            origem: Índice do estado de origem
+            destino: Índice do estado de destino
+
+        Returns:
+            Número de primeiros movimentos ótimos
+        """
+        distancias = self.linha(destino)
+        if distancias[origem] <= 0:
+            return 0
+        return sum(
+            1 for k in range(self.inicio[origem], self.inicio[origem + 1])
+            if distancias[self.destinos[k]] == distancias[origem] - 1
+        )
+
+    def distancia(self, estado_inicial: str, estado_objetivo: str) -> int:
+        """
+        Consulta a distância mínima entre dois estados desta configuração.
+
+        Args:
+            estado_inicial: Estado inicial empacotado (ver empacotar_estado)
+            estado_objetivo: Estado objetivo empacotado (ver empacotar_estado)
+
+        Returns:
+            Número mínimo de movimentos, ou -1 se algum estado não pertence à tabela
+            ou se o objetivo é inalcançável
+        """
+        origem = self.indices.get(estado_inicial)
+        destino = self.indices.get(estado_objetivo)
+        if origem is None or destino is None:
+            return -1
+        return self.linha(destino)[origem]
+
+# Tabelas já construídas, indexadas por (bolas ordenadas, capacidades dos pinos)
+_tabelas_distancias: Dict[Tuple[Tuple[str, ...], Tuple[int, ...]], TabelaDistancias] = {}
+
+def obter_tabela_distancias(bolas: Tuple[str, ...], capacidades: Tuple[int, ...]) -> TabelaDistancias:
+    """
+    Retorna a tabela de distâncias da configuração, construindo-a na primeira chamada.
+
+    Args:
+        bolas: Bolas presentes no puzzle (em qualquer ordem)
+        capacidades: Capacidade de cada pino
+
+    Returns:
+        Tabela de distâncias da configuração
+    """
+    chave = (tuple(sorted(bolas)), capacidades)
+    tabela = _tabelas_distancias.get(chave)
+    if tabela is None:
+        tabela = TabelaDistancias(chave[0], capacidades)
+        _tabelas_distancias[chave] = tabela
+        CONTADORES['tabelas_construidas'] += 1
+        logging.debug(f"Tabela de distâncias criada para {chave}: {len(tabela.estados)} estados")
+    return tabela
+
+def _busca_bidirecional(inicial: Tuple[str, ...], objetivo: Tuple[str, ...], capacidades: Tuple[int, ...]) -> int:
+    """
+    BFS bidirecional: expande, uma camada inteira por vez, a menor das duas
+    fronteiras (a partir do início e do objetivo) até que elas se encontrem.
+
+    Args:
+        inicial: Estado inicial (uma string por pino)
+        objetivo: Estado objetivo (uma string por pino)
+        capacidades: Capacidade de cada pino
+
+    Returns:
+        Número mínimo de movimentos, ou -1 se for impossível
+    """
+    if inicial == objetivo:
+        return 0
+    visitados = ({inicial: 0}, {objetivo: 0})
+    fronteiras = ([inicial], [objetivo])
+    profundidade = 0
+    while fronteiras[0] and fronteiras[1]:
+        lado = 0 if len(fronteiras[0]) <= len(fronteiras[1]) else 1
+        proprios, outros = visitados[lado], visitados[1 - lado]
+        CONTADORES['expansoes_bidirecional'] += len(fronteiras[lado])
+        pulsar()
+        melhor = -1
+        nova_fronteira = []
+        for estado in fronteiras[lado]:
+            passos = proprios[estado] + 1
+            for proximo in _sucessores(estado, capacidades):
+                if proximo in proprios:
+                    continue
+                proprios[proximo] = passos
+                nova_fronteira.append(proximo)
+                if proximo in outros and (melhor == -1 or passos + outros[proximo] < melhor):
+                    melhor = passos + outros[proximo]
+        if melhor != -1:
+            return melhor
+        profundidade += 1
+        if profundidade > MAX_MOVIMENTOS:
+            logging.warning("Limite máximo de movimentos atingido")
+            return -1
+        fronteiras = (nova_fronteira, fronteiras[1]) if lado == 0 else (fronteiras[0], nova_fronteira)
+    return -1
+
+def _bolas_fora_do_lugar(pinos: Tuple[str, ...], objetivo: Tuple[str, ...]) -> int:
+    """
+    Heurística admissível para o A*: número de posições do objetivo que ainda
+    não têm a bola certa. Cada uma exige pelo menos um movimento terminando
+    nela, e um movimento altera no máximo uma posição, então a heurística
+    também é consistente.
+    """
+    fora = 0
+    for pino, alvo in zip(pinos, objetivo):
+        for altura, bola in enumerate(alvo):
+            if altura >= len(pino) or pino[altura] != bola:
+                fora += 1
+    return fora
+
+def _busca_astar(inicial: Tuple[str, ...], objetivo: Tuple[str, ...], capacidades: Tuple[int, ...]) -> int:
+    """
+    Busca A* guiada pela heurística de bolas fora do lugar.
+
+    Args:
+        inicial: Estado inicial (uma string por pino)
+        objetivo: Estado objetivo (uma string por pino)
+        capacidades: Capacidade de cada pino
+
+    Returns:
+        Número mínimo de movimentos, ou -1 se for impossível
+    """
+    custos = {inicial: 0}
+    abertos = [(_bolas_fora_do_lugar(inicial, objetivo), 0, inicial)]
+    expandidos = 0
+    try:
+        while abertos:
+            _, negativo_passos, estado = heapq.heappop(abertos)
+            passos = -negativo_passos
+            if estado == objetivo:
+                return passos
+            if passos > custos[estado]:
+                continue  # Entrada obsoleta: o estado já foi alcançado por um caminho menor
+            if passos >= MAX_MOVIMENTOS:
+                logging.warning("Limite máximo de movimentos atingido")
+                return -1
+            expandidos += 1
+            if not expandidos % EXPANSOES_POR_PULSO:
+                pulsar()
+            for proximo in _sucessores(estado, capacidades):
+                if passos + 1 < custos.get(proximo, MAX_MOVIMENTOS + 1):
+                    custos[proximo] = passos + 1
+                    heapq.heappush(abertos, (passos + 1 + _bolas_fora_do_lugar(proximo, objetivo), -(passos + 1), proximo))
+        return -1
+    finally:
+        CONTADORES['expansoes_astar'] += expandidos
+
+def escolher_backend(num_estados: int) -> str:
+    """
+    Escolhe o backend de busca pelo tamanho do espaço de estados.
+
+    Espaços pequenos (como o da Torre de Londres padrão) são enumerados em uma
+    tabela de distâncias reaproveitada entre puzzles; espaços maiores usam BFS
+    bidirecional e, acima de LIMITE_ESTADOS_BIDIRECIONAL, A*, que explora apenas
+    a região guiada pela heurística.
+
+    Args:
+        num_estados: Número de estados da configuração (ver contar_estados)
+
+    Returns:
+        Nome do backend: 'tabela', 'bidirecional' ou 'astar'
+    """
+    if num_estados <= LIMITE_ESTADOS_TABELA:
+        return 'tabela'
+    if num_estados <= LIMITE_ESTADOS_BIDIRECIONAL:
+        return 'bidirecional'
+    return 'astar'
+
+def movimentos_minimos(estado_inicial: List[List[str]], estado_objetivo: List[List[str]],
+                       altura_max: Union[int, Sequence[int]], backend: Optional[str] = None) -> int:
     """
     Calcula a quantidade mínima de movimentos necessários para atingir o estado objetivo.
-    
+
+    Com o backend 'tabela' a resposta é consultada na tabela de distâncias da
+    configuração do puzzle, construída uma única vez e compartilhada por todos
+    os puzzles com as mesmas bolas e capacidades. Os backends 'bidirecional' e
+    'astar' fazem uma busca por puzzle e servem para variantes com espaços de
+    estados grandes demais para serem enumerados. Com 'auto' o backend é
+    escolhido pelo tamanho do espaço de estados (ver escolher_backend).
+
     Args:
         estado_inicial: Estado inicial dos pinos
         estado_objetivo: Estado objetivo dos pinos
-        altura_max: Altura máxima permitida para cada pino
-        
+        altura_max: Altura máxima permitida para cada pino, ou uma altura por pino
+        backend: 'auto', 'tabela', 'bidirecional' ou 'astar' (padrão: BACKEND_SOLVER)
+
     Returns:
         Número mínimo de movimentos necessários, ou -1 se for impossível
     """
@@ -129,48 +555,374 @@ def movimentos_minimos(estado_inicial: List[List[str]], estado_objetivo: List[Li
         return -1
 
     # Verifica se algum pino excede a altura máxima
-    for pino in estado_inicial:
-        if len(pino) > altura_max:
+    capacidades = capacidades_pinos(altura_max, len(estado_inicial))
+    for pino, capacidade in zip(estado_inicial, capacidades):
+        if len(pino) > capacidade:
             return -1
     
-    for pino in estado_objetivo:
-        if len(pino) > altura_max:
+    for pino, capacidade in zip(estado_objetivo, capacidades):
+        if len(pino) > capacidade:
             return -1
 
     # Verifica se o estado inicial e final são iguais
-    if estado_para_tupla(estado_inicial) == estado_para_tupla(estado_objetivo):
+    inicial = empacotar_estado(estado_inicial)
+    objetivo = empacotar_estado(estado_objetivo)
+    if inicial == objetivo:
         return 0
 
-    visitados = {}  # Dicionário para armazenar estados e seus passos
-    fila = deque([(estado_inicial, 0)])
-    max_movimentos = 1000  # Limite máximo de movimentos para evitar loops infinitos
+    # Estados com pinos ou bolas diferentes nunca se encontram
+    bolas = [bola for pino in estado_inicial for bola in pino]
+    if len(estado_inicial) != len(estado_objetivo) or Counter(bolas) != Counter(bola for pino in estado_objetivo for bola in pino):
+        return -1
 
-    while fila:
-        estado_atual, passos = fila.popleft()
-        estado_tupla = estado_para_tupla(estado_atual)
-        
-        if passos > max_movimentos:
-            logging.warning("Limite máximo de movimentos atingido")
-            return -1
-            
-        if estado_tupla in visitados and visitados[estado_tupla] <= passos:
-            continue
-            
-        visitados[estado_tupla] = passos
+    backend = backend or BACKEND_SOLVER
+    if backend == 'auto':
+        backend = escolher_backend(contar_estados(bolas, capacidades))
+    CONTADORES[f'buscas_{backend}'] += 1
+
+    if backend == 'tabela':
+        tabela = obter_tabela_distancias(tuple(bolas), capacidades)
+        passos = tabela.distancia(inicial, objetivo)
+    elif backend == 'bidirecional':
+        passos = _busca_bidirecional(tuple(inicial.split('|')), tuple(objetivo.split('|')), capacidades)
+    elif backend == 'astar':
+        passos = _busca_astar(tuple(inicial.split('|')), tuple(objetivo.split('|')), capacidades)
+    else:
+        raise ValueError(f"Backend de busca desconhecido: {backend}")
 
-        if estado_tupla == estado_para_tupla(estado_objetivo):
-            return passos
+    if passos > MAX_MOVIMENTOS:
+        logging.warning("Limite máximo de movimentos atingido")
+        return -1
+
+    return passos
+
+def caminhos_otimos(estado_inicial: List[List[str]], estado_objetivo: List[List[str]],
+                    altura_max: Union[int, Sequence[int]]) -> Tuple[int, int]:
+    """
+    Conta as sequências de movimentos mínimas distintas e os primeiros movimentos ótimos.
+
+    A contagem precisa do grafo completo da configuração, então só é feita para
+    espaços de estados de até LIMITE_ESTADOS_TABELA estados.
+
+    Args:
+        estado_inicial: Estado inicial dos pinos
+        estado_objetivo: Estado objetivo dos pinos
+        altura_max: Altura máxima permitida para cada pino, ou uma altura por pino
+
+    Returns:
+        Tupla (número de caminhos mínimos, número de primeiros movimentos ótimos);
+        (-1, -1) se o objetivo for inalcançável ou o espaço de estados for grande
+        demais, como em movimentos_minimos. O número de caminhos é limitado a
+        LIMITE_CAMINHOS_OTIMOS
+    """
+    capacidades = capacidades_pinos(altura_max, len(estado_inicial))
+    if any(len(pino) > capacidade for pino, capacidade in zip(estado_inicial, capacidades)) or \
+            any(len(pino) > capacidade for pino, capacidade in zip(estado_objetivo, capacidades)):
+        return -1, -1
+
+    inicial = empacotar_estado(estado_inicial)
+    objetivo = empacotar_estado(estado_objetivo)
+    if inicial == objetivo:
+        return 1, 0
+
+    bolas = tuple(bola for pino in estado_inicial for bola in pino)
+    if contar_estados(bolas, capacidades) > LIMITE_ESTADOS_TABELA:
+        logging.warning(f"Espaço de estados grande demais para contar caminhos ótimos: {inicial} -> {objetivo}")
+        return -1, -1
+    tabela = obter_tabela_distancias(bolas, capacidades)
+    origem = tabela.indices.get(inicial)
+    destino = tabela.indices.get(objetivo)
+    if origem is None or destino is None:
+        return -1, -1
+    num_caminhos = tabela.caminhos(destino)[origem]
+    if num_caminhos == 0:
+        return -1, -1
+    if num_caminhos > LIMITE_CAMINHOS_OTIMOS:
+        logging.warning(f"Número de caminhos ótimos truncado em {LIMITE_CAMINHOS_OTIMOS}: {inicial} -> {objetivo}")
+        num_caminhos = LIMITE_CAMINHOS_OTIMOS
+    return num_caminhos, tabela.primeiros_movimentos(origem, destino)
+
+class CacheSolver:
+    """
+    Cache persistente de movimentos mínimos, compartilhado entre execuções do pipeline.
+
+    As entradas são indexadas por (estado inicial, estado objetivo, size) e guardadas
+    em um arquivo SQLite junto com VERSAO_CACHE_SOLVER; arquivos de outra versão são
+    ignorados. O arquivo só é lido na primeira consulta. Ao salvar, ele é regravado de
+    forma atômica (arquivo temporário + os.replace) apenas se houver puzzles novos;
+    execuções só com acertos atualizam a ordem de uso no próprio arquivo. Quando a
+    capacidade é excedida, as entradas usadas há mais tempo são descartadas (LRU).
+    """
+
+    def __init__(self, caminho: str, capacidade: int = CAPACIDADE_CACHE_SOLVER):
+        self.caminho = caminho
+        self.capacidade = capacidade
+        self.acertos = 0
+        self.falhas = 0
+        self._entradas: Optional[OrderedDict] = None
+        self._alterado = False
+        self._usados: OrderedDict = OrderedDict()
+
+    def _carregar(self) -> OrderedDict:
+        """Lê o arquivo do cache na primeira utilização, do menos para o mais recente."""
+        if self._entradas is None:
+            self._entradas = OrderedDict()
+            if os.path.exists(self.caminho):
+                try:
+                    conexao = sqlite3.connect(self.caminho)
+                    try:
+                        versao = conexao.execute(
+                            "SELECT valor FROM metadados WHERE chave = 'versao'"
+                        ).fetchone()
+                        linhas = []
+                        if versao is not None and versao[0] == str(VERSAO_CACHE_SOLVER):
+                            linhas = conexao.execute(
+                                "SELECT inicio, objetivo, tamanho, movimentos FROM solucoes ORDER BY uso"
+                            ).fetchall()
+                    finally:
+                        conexao.close()
+                    if versao is None or versao[0] != str(VERSAO_CACHE_SOLVER):
+                        logging.warning(f"Cache do solver ignorado ({self.caminho}): versão "
+                                        f"{versao[0] if versao else 'ausente'}, esperada {VERSAO_CACHE_SOLVER}")
+                    for inicio, objetivo, tamanho, movimentos in linhas:
+                        self._entradas[(inicio, objetivo, tamanho)] = movimentos
+                    if linhas:
+                        logging.info(f"Cache do solver carregado: {len(self._entradas)} puzzles")
+                except sqlite3.Error as e:
+                    logging.warning(f"Cache do solver ignorado ({self.caminho}): {e}")
+        return self._entradas
+
+    def obter(self, inicio: str, objetivo: str, tamanho: int) -> Optional[int]:
+        """
+        Consulta um puzzle no cache.
+
+        Args:
+            inicio: String do estado inicial
+            objetivo: String do estado objetivo
+            tamanho: Altura máxima dos pinos (coluna size)
+
+        Returns:
+            Movimentos mínimos guardados, ou None se o puzzle não está no cache
+        """
+        entradas = self._carregar()
+        chave = (inicio, objetivo, tamanho)
+        movimentos = entradas.get(chave)
+        if movimentos is None:
+            self.falhas += 1
+            CONTADORES['falhas_cache_solver'] += 1
+            return None
+        entradas.move_to_end(chave)
+        self._usados[chave] = None
+        self._usados.move_to_end(chave)
+        self.acertos += 1
+        CONTADORES['acertos_cache_solver'] += 1
+        return movimentos
+
+    def guardar(self, inicio: str, objetivo: str, tamanho: int, movimentos: int) -> None:
+        """
+        Guarda a solução de um puzzle, descartando as entradas mais antigas se necessário.
+
+        Args:
+            inicio: String do estado inicial
+            objetivo: String do estado objetivo
+            tamanho: Altura máxima dos pinos (coluna size)
+            movimentos: Movimentos mínimos calculados
+        """
+        entradas = self._carregar()
+        chave = (inicio, objetivo, tamanho)
+        entradas[chave] = movimentos
+        entradas.move_to_end(chave)
+        while len(entradas) > self.capacidade:
+            entradas.popitem(last=False)
+        self._alterado = True
+
+    def salvar(self) -> None:
+        """
+        Regrava o arquivo do cache de forma atômica se houve puzzles novos; se houve
+        apenas acertos, atualiza a ordem de uso das entradas no próprio arquivo.
+        """
+        if self._entradas is None:
+            return
+        if not self._alterado:
+            if self._usados and os.path.exists(self.caminho):
+                self._atualizar_uso()
+            return
+        Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+        caminho_temporario = f"{self.caminho}.tmp"
+        if os.path.exists(caminho_temporario):
+            os.remove(caminho_temporario)
+        conexao = sqlite3.connect(caminho_temporario)
+        try:
+            conexao.execute("CREATE TABLE metadados (chave TEXT PRIMARY KEY, valor TEXT)")
+            conexao.execute("INSERT INTO metadados VALUES ('versao', ?)", (str(VERSAO_CACHE_SOLVER),))
+            conexao.execute(
+                "CREATE TABLE solucoes (inicio TEXT, objetivo TEXT, tamanho INTEGER, "
+                "movimentos INTEGER, uso INTEGER, PRIMARY KEY (inicio, objetivo, tamanho))"
+            )
+            conexao.executemany(
+                "INSERT INTO solucoes VALUES (?, ?, ?, ?, ?)",
+                ((inicio, objetivo, tamanho, movimentos, uso)
+                 for uso, ((inicio, objetivo, tamanho), movimentos) in enumerate(self._entradas.items()))
+            )
+            conexao.commit()
+        finally:
+            conexao.close()
+        os.replace(caminho_temporario, self.caminho)
+        self._alterado = False
+        self._usados.clear()
+
+    def _atualizar_uso(self) -> None:
+        """Marca as entradas consultadas como as mais recentes, sem regravar o arquivo."""
+        conexao = sqlite3.connect(self.caminho)
+        try:
+            (maior_uso,) = conexao.execute("SELECT COALESCE(MAX(uso), -1) FROM solucoes").fetchone()
+            conexao.executemany(
+                "UPDATE solucoes SET uso = ? WHERE inicio = ? AND objetivo = ? AND tamanho = ?",
+                ((maior_uso + 1 + ordem, inicio, objetivo, tamanho)
+                 for ordem, (inicio, objetivo, tamanho) in enumerate(self._usados))
+            )
+            conexao.commit()
+        finally:
+            conexao.close()
+        self._usados.clear()
+
+    def limpar(self) -> None:
+        """Descarta todas as entradas, em memória e no arquivo."""
+        self._entradas = OrderedDict()
+        self._usados.clear()
+        self._alterado = False
+        for caminho in (self.caminho, f"{self.caminho}.tmp"):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+def resolver_puzzle(inicio: str, objetivo: str, tamanho: int, cache: Optional[CacheSolver] = None) -> int:
+    """
+    Calcula os movimentos mínimos de um puzzle a partir das strings de estado,
+    consultando o cache persistente antes de resolver.
+
+    Args:
+        inicio: String do estado inicial (ex: '|A|B|C|')
+        objetivo: String do estado objetivo
+        tamanho: Altura máxima permitida para cada pino
+        cache: Cache persistente opcional
+
+    Returns:
+        Número mínimo de movimentos necessários, ou -1 se for impossível
 
-        for prox in movimentos_possiveis(estado_atual, altura_max):
-            # Verifica se o próximo estado excede a altura máxima
-            if any(len(pino) > altura_max for pino in prox):
+    Raises:
+        EstadoInvalidoError: Se alguma das strings de estado for inválida
+    """
+    tamanho = int(tamanho)
+    if cache is not None:
+        movimentos = cache.obter(inicio, objetivo, tamanho)
+        if movimentos is not None:
+            return movimentos
+
+    movimentos = movimentos_minimos(string_para_estado(inicio), string_para_estado(objetivo), tamanho)
+
+    if cache is not None:
+        cache.guardar(inicio, objetivo, tamanho, movimentos)
+    return movimentos
+
+def _estado_valido(s) -> bool:
+    """Indica se string_para_estado aceita o valor (string não vazia começando com '|')."""
+    return isinstance(s, str) and s.startswith('|')
+
+def segmentar_trials(df: pd.DataFrame) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """
+    Associa a cada linha o estado inicial e o objetivo do trial a que pertence.
+
+    Os trials começam nas linhas com step == 0. O estado inicial e o objetivo
+    dessas linhas são propagados (forward fill) para as linhas seguintes; uma
+    linha step == 0 com estado inválido não inicia um novo trial e mantém os
+    estados anteriores, como no processamento linha a linha.
+
+    Args:
+        df: DataFrame com as colunas step, current e end
+
+    Returns:
+        Tupla (estado inicial por linha, estado objetivo por linha, máscara das
+        linhas step == 0 com estado inválido); linhas anteriores ao primeiro
+        trial válido ficam com NaN
+    """
+    inicio_trial = df['step'] == 0
+    atual_valido = df['current'][inicio_trial].map(_estado_valido).reindex(df.index, fill_value=False)
+    fim_valido = df['end'][inicio_trial].map(_estado_valido).reindex(df.index, fill_value=False)
+
+    atualiza_inicio = inicio_trial & atual_valido
+    atualiza_fim = atualiza_inicio & fim_valido
+    estados_iniciais = df['current'].where(atualiza_inicio).ffill()
+    estados_finais = df['end'].where(atualiza_fim).ffill()
+    return estados_iniciais, estados_finais, inicio_trial & ~atualiza_fim
+
+def extrair_puzzles(df: pd.DataFrame) -> Set[Tuple[str, str, int]]:
+    """
+    Extrai os puzzles resolvidos em um DataFrame de dados brutos.
+
+    O estado inicial e o objetivo de cada trial vêm da linha com step == 0 e o
+    size vem da linha com done == 1, como em processar_arquivo.
+
+    Args:
+        df: DataFrame com as colunas step, current, end, size e done
+
+    Returns:
+        Conjunto de tuplas (estado inicial, estado objetivo, size)
+    """
+    estados_iniciais, estados_finais, _ = segmentar_trials(df)
+    resolvidas = (df['done'] == 1) & estados_iniciais.notna() & estados_finais.notna() & df['size'].notna()
+    return set(zip(estados_iniciais[resolvidas], estados_finais[resolvidas],
+                   df['size'][resolvidas].astype(int)))
+
+def coletar_puzzles(arquivos: List[str]) -> Set[Tuple[str, str, int]]:
+    """
+    Percorre todos os arquivos e reúne os puzzles distintos (primeira fase).
+
+    Args:
+        arquivos: Caminhos dos arquivos CSV de dados brutos
+
+    Returns:
+        Conjunto de tuplas (estado inicial, estado objetivo, size) sem repetição
+    """
+    puzzles = set()
+    with Progresso('coleta', len(arquivos)) as progresso:
+        for arquivo in arquivos:
+            try:
+                with open(arquivo, 'rb') as entrada:
+                    df = pd.read_csv(LeituraComPulso(entrada), sep=',',
+                                     usecols=['step', 'current', 'end', 'size', 'done'])
+            except Exception as e:
+                logging.warning(f"Arquivo {os.path.basename(arquivo)} ignorado na coleta de puzzles: {e}")
+                progresso.avancar()
                 continue
-                
-            prox_tupla = estado_para_tupla(prox)
-            if prox_tupla not in visitados or visitados[prox_tupla] > passos + 1:
-                fila.append((prox, passos + 1))
+            puzzles.update(extrair_puzzles(df))
+            progresso.avancar(linhas=len(df))
+    return puzzles
 
-    return -1
+def resolver_puzzles(puzzles: Set[Tuple[str, str, int]], cache: Optional[CacheSolver] = None,
+                     progresso: Optional[Progresso] = None) -> Dict[Tuple[str, str, int], int]:
+    """
+    Resolve cada puzzle distinto uma única vez (segunda fase).
+
+    Puzzles com estados inválidos ficam de fora do resultado; processar_arquivo
+    registra o erro ao encontrá-los.
+
+    Args:
+        puzzles: Conjunto de tuplas (estado inicial, estado objetivo, size)
+        cache: Cache persistente opcional
+        progresso: Progresso avançado a cada puzzle (opcional)
+
+    Returns:
+        Dicionário de cada puzzle para seus movimentos mínimos
+    """
+    solucoes = {}
+    for inicio, objetivo, tamanho in sorted(puzzles):
+        if progresso:
+            progresso.avancar()
+        try:
+            solucoes[(inicio, objetivo, tamanho)] = resolver_puzzle(inicio, objetivo, tamanho, cache)
+        except EstadoInvalidoError:
+            continue
+    return solucoes
 
 def calcular_pontuacao(row: pd.Series, min_movs: int) -> int:
     """
@@ -191,93 +943,489 @@ def calcular_pontuacao(row: pd.Series, min_movs: int) -> int:
 
     return pontuacao
 
-def processar_arquivo(caminho_entrada: str, caminho_saida: str) -> None:
+# Contagens de caminhos já calculadas, indexadas por (estado inicial, estado objetivo, size)
+_contagens_caminhos: Dict[Tuple[str, str, int], Tuple[int, int]] = {}
+
+def contar_caminhos_puzzle(inicio: str, objetivo: str, tamanho: int) -> Tuple[int, int]:
+    """
+    Versão de caminhos_otimos a partir das strings de estado, guardada por puzzle.
+
+    Args:
+        inicio: String do estado inicial
+        objetivo: String do estado objetivo
+        tamanho: Altura máxima permitida para cada pino
+
+    Returns:
+        Tupla (número de caminhos mínimos, número de primeiros movimentos ótimos),
+        ou (-1, -1) se não puderem ser calculados
+    """
+    chave = (inicio, objetivo, int(tamanho))
+    contagem = _contagens_caminhos.get(chave)
+    if contagem is None:
+        pulsar()
+        contagem = caminhos_otimos(string_para_estado(inicio), string_para_estado(objetivo), int(tamanho))
+        _contagens_caminhos[chave] = contagem
+    return contagem
+
+def calcular_distancias_objetivo(estados: pd.Series, objetivos: pd.Series, tamanhos: pd.Series) -> np.ndarray:
+    """
+    Calcula a distância mínima de cada linha até o objetivo do seu trial.
+
+    Cada combinação distinta (estado, objetivo, size) é resolvida uma única vez.
+
+    Args:
+        estados: Coluna current
+        objetivos: Estado objetivo do trial de cada linha (ver segmentar_trials)
+        tamanhos: Coluna size
+
+    Returns:
+        Distância de cada linha até o objetivo, ou -1 quando não pode ser calculada
+    """
+    distancias = np.full(len(estados), -1, dtype='int64')
+    validas = (estados.map(_estado_valido) & objetivos.notna() & tamanhos.notna()).to_numpy()
+    chaves = list(zip(estados[validas], objetivos[validas], tamanhos[validas].astype(int)))
+    resultados = {}
+    for estado, objetivo, tamanho in set(chaves):
+        pulsar()
+        resultados[(estado, objetivo, tamanho)] = movimentos_minimos(string_para_estado(estado),
+                                                                     string_para_estado(objetivo), tamanho)
+    distancias[validas] = [resultados[chave] for chave in chaves]
+    return distancias
+
+def classificar_movimentos(distancias: np.ndarray, passos: np.ndarray) -> np.ndarray:
+    """
+    Classifica cada movimento pela variação da distância até o objetivo.
+
+    Um movimento é 'otimo' se aproxima do objetivo, 'neutro' se mantém a
+    distância e 'regressivo' se afasta. Linhas com step == 0 ou sem distância
+    conhecida (na própria linha ou na anterior) ficam vazias.
+
+    Args:
+        distancias: Distância de cada linha até o objetivo (ver calcular_distancias_objetivo)
+        passos: Coluna step
+
+    Returns:
+        Classificação de cada linha
+    """
+    anteriores = np.concatenate(([-1], distancias[:-1]))
+    variacao = anteriores - distancias
+    tipos = np.select([variacao > 0, variacao == 0], ['otimo', 'neutro'], 'regressivo')
+    validos = (passos != 0) & (distancias != -1) & (anteriores != -1)
+    return np.where(validos, tipos, '')
+
+def calcular_pontuacoes(passos: np.ndarray, minimos: np.ndarray, concluidos: np.ndarray) -> np.ndarray:
+    """
+    Versão vetorizada de calcular_pontuacao para todas as linhas de um arquivo.
+
+    Args:
+        passos: Coluna step
+        minimos: Movimentos mínimos de cada linha (-1 se impossível)
+        concluidos: Máscara das linhas com done == 1
+
+    Returns:
+        Pontuação de cada linha
+    """
+    pontuacoes = np.maximum(PONTUACAO_MINIMA, PONTUACAO_INICIAL - (passos - minimos))
+    return np.where(concluidos & (minimos != -1), pontuacoes, 0)
+
+def processar_arquivo(caminho_entrada: str, caminho_saida: Optional[str], cache: Optional[CacheSolver] = None,
+                      solucoes: Optional[Dict[Tuple[str, str, int], int]] = None) -> pd.DataFrame:
     """
     Processa o arquivo de entrada e gera o arquivo de saída com as pontuações.
     
     Args:
         caminho_entrada: Caminho do arquivo de entrada
-        caminho_saida: Caminho do arquivo de saída
+        caminho_saida: Caminho do arquivo de saída, ou None para não gravar
+        cache: Cache persistente de soluções (opcional)
+        solucoes: Puzzles já resolvidos por resolver_puzzles (opcional); os que
+            não estiverem presentes são resolvidos na hora
+
+    Returns:
+        DataFrame processado
     """
+    inicio, inicio_cpu = time.perf_counter(), time.process_time()
     try:
-        df = pd.read_csv(caminho_entrada, sep=',')
+        with open(caminho_entrada, 'rb') as entrada:
+            df = pd.read_csv(LeituraComPulso(entrada), sep=',')
     except Exception as e:
         logging.error(f"Erro ao ler arquivo de entrada {caminho_entrada}: {e}")
         raise
 
-    col_minimos = []
-    col_pontuacao = []
-    estado_inicial = None
-    estado_final = None
+    nome_arquivo = os.path.basename(caminho_entrada)
+    estados_iniciais, estados_finais, inicio_invalido = segmentar_trials(df)
+    concluidos = (df['done'] == 1).to_numpy()
+    minimos = np.zeros(len(df), dtype='int64')
+    erros = inicio_invalido.to_numpy().copy()
+
+    # Linhas concluídas sem um trial válido (ou sem size) não podem ser resolvidas
+    resolvidas = concluidos & ~erros
+    sem_puzzle = resolvidas & (estados_iniciais.isna() | estados_finais.isna() | df['size'].isna()).to_numpy()
+    erros |= sem_puzzle
+    resolvidas &= ~sem_puzzle
+
+    # Consulta em lote: os puzzles ainda não resolvidos são resolvidos uma única vez
+    chaves = list(zip(estados_iniciais[resolvidas], estados_finais[resolvidas],
+                      df['size'][resolvidas].astype(int)))
+    if solucoes is None:
+        solucoes = {}
+    faltantes = set(chaves).difference(solucoes)
+    if faltantes:
+        solucoes = {**solucoes, **resolver_puzzles(faltantes, cache)}
+    minimos[resolvidas] = [solucoes.get(chave, -1) for chave in chaves]
+    erros[resolvidas] = [chave not in solucoes for chave in chaves]
+    minimos[erros] = -1
+    resolvidas &= ~erros
+    chaves = [chave for chave in chaves if chave in solucoes]
+
+    if erros.any():
+        linhas_erro = [int(idx) for idx in df.index[erros]]
+        logging.error("Arquivo %s: %d linhas com estado inválido (linhas %s%s)", nome_arquivo, len(linhas_erro),
+                      ', '.join(map(str, linhas_erro[:MAX_LINHAS_ERRO_LOG])),
+                      ', ...' if len(linhas_erro) > MAX_LINHAS_ERRO_LOG else '',
+                      extra=evento('linhas_invalidas', arquivo=nome_arquivo, total=len(linhas_erro),
+                                   linhas=linhas_erro[:MAX_LINHAS_ERRO_LOG]))
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        # Apenas uma amostra dos trials resolvidos é detalhada
+        amostra = zip(chaves[::INTERVALO_AMOSTRA_DEBUG], minimos[resolvidas][::INTERVALO_AMOSTRA_DEBUG])
+        for (inicial, final, tamanho), min_movs in amostra:
+            logging.debug("Arquivo %s - %s -> %s (size %d): %d movimentos mínimos",
+                          nome_arquivo, inicial, final, tamanho, min_movs)
 
-    for idx, row in df.iterrows():
+    # Número de caminhos mínimos e de primeiros movimentos ótimos de cada trial
+    caminhos = np.zeros(len(df), dtype='int64')
+    primeiros = np.zeros(len(df), dtype='int64')
+    contagens = [contar_caminhos_puzzle(*chave) for chave in chaves]
+    caminhos[resolvidas] = [num_caminhos for num_caminhos, _ in contagens]
+    primeiros[resolvidas] = [num_primeiros for _, num_primeiros in contagens]
+    caminhos[erros] = -1
+    primeiros[erros] = -1
+
+    pontuacoes = calcular_pontuacoes(df['step'].to_numpy(), minimos, concluidos & ~erros)
+    df['movimentos_minimos'] = minimos
+    df['pontuacao_acumulada'] = np.cumsum(pontuacoes)
+    df['caminhos_otimos'] = caminhos
+    df['primeiros_movimentos_otimos'] = primeiros
+
+    # Distância de cada linha até o objetivo e classificação de cada movimento; as linhas
+    # de um trial cujo step == 0 é inválido herdariam o objetivo do trial anterior e ficam sem distância
+    inicios = (df['step'] == 0).to_numpy()
+    inicio_invalido_trial = np.concatenate(([False], inicio_invalido.to_numpy()[inicios]))[np.cumsum(inicios)]
+    distancias = calcular_distancias_objetivo(df['current'], estados_finais.where(~inicio_invalido_trial),
+                                              df['size'])
+    df['distancia_objetivo'] = distancias
+    df['tipo_movimento'] = classificar_movimentos(distancias, df['step'].to_numpy())
+
+    if caminho_saida is not None:
         try:
-            if row['step'] == 0:
-                estado_inicial = string_para_estado(row['current'])
-                estado_final = string_para_estado(row['end'])
-                logging.info(f"Arquivo {os.path.basename(caminho_entrada)} - Estado inicial: {estado_inicial}")
-                logging.info(f"Arquivo {os.path.basename(caminho_entrada)} - Estado final: {estado_final}")
-
-            if row['done'] == 1:
-                min_movs = movimentos_minimos(estado_inicial, estado_final, altura_max=row['size'])
-                logging.info(f"Arquivo {os.path.basename(caminho_entrada)} - Movimentos mínimos: {min_movs}")
-                pontuacao = calcular_pontuacao(row, min_movs)
-            else:
-                min_movs = 0
-                pontuacao = 0
-
-            col_minimos.append(min_movs)
-            col_pontuacao.append(pontuacao)
-            
+            # Colunas numéricas são gravadas como inteiros, em CSV ou Parquet conforme a extensão
+            gravar_tabela(df, caminho_saida, inteiros=True)
         except Exception as e:
-            logging.error(f"Erro ao processar linha {idx} do arquivo {caminho_entrada}: {e}")
-            col_minimos.append(-1)
-            col_pontuacao.append(0)
+            logging.error(f"Erro ao salvar arquivo de saída {caminho_saida}: {e}")
+            raise
+    registrar_medida_arquivo(nome_arquivo, df, inicio, inicio_cpu, int((df['step'] == 0).sum()),
+                             int(resolvidas.sum()), int(erros.sum()))
+    return df
+
+def registrar_medida_arquivo(nome_arquivo: str, df: pd.DataFrame, inicio: float, inicio_cpu: float,
+                             trials: int, resolvidos: int, falhas: int) -> None:
+    """
+    Registra em MEDIDAS_ARQUIVOS os contadores e o tempo de parede e de CPU gastos
+    com um arquivo e emite um único evento de log com o resumo do arquivo.
+
+    Args:
+        nome_arquivo: Nome do arquivo
+        df: DataFrame processado
+        inicio: Valor de time.perf_counter() no início do processamento
+        inicio_cpu: Valor de time.process_time() no início do processamento
+        trials: Número de trials (linhas com step == 0)
+        resolvidos: Número de trials concluídos com movimentos mínimos calculados
+        falhas: Número de linhas com erro
+    """
+    medida = {
+        'arquivo': nome_arquivo,
+        'linhas': len(df),
+        'trials': trials,
+        'resolvidos': resolvidos,
+        'falhas': falhas,
+        'segundos': round(time.perf_counter() - inicio, 6),
+        'cpu_segundos': round(time.process_time() - inicio_cpu, 6),
+    }
+    MEDIDAS_ARQUIVOS.append(medida)
+    logging.info("Arquivo %s processado: %d trials, %d resolvidos, %d linhas com erro (%.3f s)",
+                 nome_arquivo, trials, resolvidos, falhas, medida['segundos'],
+                 extra=evento('arquivo_processado', **medida))
+
+def coletar_instrumentacao(reiniciar: bool = True) -> Dict[str, Union[list, dict]]:
+    """
+    Retorna as medidas por arquivo e os contadores do solver acumulados no processo atual.
+
+    Args:
+        reiniciar: Se True, zera as medidas e os contadores depois de coletá-los
+
+    Returns:
+        Dicionário com as chaves 'arquivos' e 'contadores'
+    """
+    instrumentacao = {'arquivos': list(MEDIDAS_ARQUIVOS), 'contadores': dict(CONTADORES)}
+    if reiniciar:
+        MEDIDAS_ARQUIVOS.clear()
+        CONTADORES.clear()
+    return instrumentacao
+
+def incorporar_instrumentacao(instrumentacao: Dict[str, Union[list, dict]]) -> None:
+    """Soma ao processo atual a instrumentação coletada em um processo do pool."""
+    MEDIDAS_ARQUIVOS.extend(instrumentacao['arquivos'])
+    CONTADORES.update(instrumentacao['contadores'])
+
+def num_cpus_disponiveis() -> int:
+    """Retorna o número de CPUs disponíveis para o processo atual."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+class ColetorLogs(logging.Handler):
+    """Handler que guarda os registros de log de um processo do pool."""
+
+    def __init__(self):
+        super().__init__()
+        self.registros: List[logging.LogRecord] = []
 
-    df['movimentos_minimos'] = col_minimos
-    df['pontuacao_acumulada'] = pd.Series(col_pontuacao).cumsum()
+    def emit(self, record: logging.LogRecord) -> None:
+        # A mensagem é formatada aqui para que o registro possa ser enviado ao processo principal
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.registros.append(record)
 
+def reemitir_logs(registros: List[logging.LogRecord]) -> None:
+    """Reemite no processo atual os registros coletados por ColetorLogs em um processo do pool."""
+    raiz = logging.getLogger()
+    for registro in registros:
+        raiz.handle(registro)
+
+# Soluções da primeira fase, recebidas por cada processo do pool na inicialização
+_solucoes_worker: Optional[Dict[Tuple[str, str, int], int]] = None
+
+def _inicializar_worker(solucoes: Dict[Tuple[str, str, int], int], backend: str, nivel_log: int) -> None:
+    global _solucoes_worker, BACKEND_SOLVER
+    _solucoes_worker = solucoes
+    BACKEND_SOLVER = backend
+    logging.getLogger().setLevel(nivel_log)
+
+def _processar_arquivo_worker(caminho_entrada: str, caminho_saida: Optional[str], manter_dados: bool
+                              ) -> Tuple[bool, List[logging.LogRecord], Optional[pd.DataFrame], Dict]:
+    """
+    Processa um arquivo em um processo do pool, coletando os logs em vez de emiti-los.
+
+    Args:
+        caminho_entrada: Caminho do arquivo de entrada
+        caminho_saida: Caminho do arquivo de saída, ou None para não gravar
+        manter_dados: Se True, devolve o DataFrame processado ao processo principal
+
+    Returns:
+        Tupla (sucesso, registros de log gerados, DataFrame ou None, instrumentação
+        do processamento)
+    """
+    coletar_instrumentacao()
+    raiz = logging.getLogger()
+    handlers_anteriores = raiz.handlers[:]
+    coletor = ColetorLogs()
+    raiz.handlers = [coletor]
+    df = None
     try:
-        # Salva o DataFrame garantindo que colunas numéricas sejam salvas como números
-        df.to_csv(caminho_saida, index=False, float_format='%.0f')
-        logging.info(f"Arquivo {os.path.basename(caminho_saida)} processado com sucesso!")
+        logging.debug("Processando arquivo: %s", os.path.basename(caminho_entrada))
+        df = processar_arquivo(caminho_entrada, caminho_saida, None, _solucoes_worker)
+        sucesso = True
     except Exception as e:
-        logging.error(f"Erro ao salvar arquivo de saída {caminho_saida}: {e}")
-        raise
+        logging.error(f"Erro ao processar arquivo {caminho_entrada}: {e}")
+        sucesso = False
+    finally:
+        raiz.handlers = handlers_anteriores
+    return sucesso, coletor.registros, df if manter_dados else None, coletar_instrumentacao()
+
+def processar_em_paralelo(arquivos: List[str], pasta_resultados: Optional[str],
+                          solucoes: Dict[Tuple[str, str, int], int], jobs: int,
+                          manter_dados: bool = False, progresso: Optional[Progresso] = None,
+                          formato: str = 'csv') -> Dict[str, pd.DataFrame]:
+    """
+    Processa os arquivos em um pool de processos.
 
-def main():
+    Cada arquivo é isolado: uma falha é registrada e não interrompe os demais.
+    Os logs de cada processo são reemitidos na ordem dos arquivos, e não na
+    ordem de conclusão, para que o log seja determinístico.
+
+    Args:
+        arquivos: Caminhos dos arquivos de entrada, já ordenados
+        pasta_resultados: Pasta onde os arquivos processados são gravados, ou None para não gravar
+        solucoes: Puzzles resolvidos na primeira fase
+        jobs: Número de processos
+        manter_dados: Se True, os DataFrames processados são devolvidos
+        progresso: Progresso avançado a cada arquivo concluído (opcional)
+        formato: Formato dos arquivos processados ('csv' ou 'parquet')
+
+    Returns:
+        DataFrames processados por nome de arquivo (vazio se manter_dados for False)
+    """
+    dados = {}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_inicializar_worker,
+                             initargs=(solucoes, BACKEND_SOLVER, logging.getLogger().level)) as executor:
+        futuros = [
+            executor.submit(_processar_arquivo_worker, arquivo,
+                            os.path.join(pasta_resultados, nome_no_formato(os.path.basename(arquivo), formato))
+                            if pasta_resultados else None,
+                            manter_dados)
+            for arquivo in arquivos
+        ]
+        for arquivo, futuro in zip(arquivos, futuros):
+            try:
+                sucesso, registros, df, instrumentacao = futuro.result()
+            except Exception as e:
+                logging.error(f"Erro ao processar arquivo {arquivo}: {e}")
+                if progresso:
+                    progresso.avancar()
+                continue
+            reemitir_logs(registros)
+            incorporar_instrumentacao(instrumentacao)
+            if progresso:
+                progresso.avancar(linhas=sum(medida['linhas'] for medida in instrumentacao['arquivos']))
+            if sucesso and df is not None:
+                dados[os.path.basename(arquivo)] = df
+    return dados
+
+def processar_dados_originais(pasta_dados_originais: str = "dados_originais",
+                              pasta_resultados: Optional[str] = "01_dados_processados",
+                              jobs: int = 1, manter_dados: bool = False,
+                              formato: str = 'csv') -> Dict[str, pd.DataFrame]:
+    """
+    Processa todos os arquivos CSV de uma pasta.
+
+    Args:
+        pasta_dados_originais: Pasta com os arquivos brutos do PEBL
+        pasta_resultados: Pasta onde os arquivos processados são gravados, ou None para não gravar
+        jobs: Número de processos da segunda fase
+        manter_dados: Se True, os DataFrames processados são devolvidos
+        formato: Formato dos arquivos processados ('csv' ou 'parquet')
+
+    Returns:
+        DataFrames processados por nome de arquivo, na ordem dos arquivos
+        (vazio se manter_dados for False)
+    """
+    if pasta_resultados:
+        Path(pasta_resultados).mkdir(exist_ok=True)
+    
+    # Encontrar todos os arquivos CSV na pasta de dados originais
+    arquivos_csv = sorted(glob.glob(os.path.join(pasta_dados_originais, "*.csv")))
+    
+    if not arquivos_csv:
+        logging.warning(f"Nenhum arquivo CSV encontrado na pasta '{pasta_dados_originais}'!")
+        return {}
+    
+    logging.info(f"Encontrados {len(arquivos_csv)} arquivos CSV para processar na pasta '{pasta_dados_originais}'")
+    return processar_arquivos(arquivos_csv, pasta_resultados, jobs, manter_dados, formato=formato)
+
+def processar_arquivos(arquivos_csv: List[str], pasta_resultados: Optional[str] = "01_dados_processados",
+                       jobs: int = 1, manter_dados: bool = False,
+                       cache: Optional[CacheSolver] = None, formato: str = 'csv') -> Dict[str, pd.DataFrame]:
+    """
+    Processa uma lista de arquivos CSV brutos: resolve os puzzles distintos uma
+    única vez e depois calcula as colunas de cada arquivo.
+
+    Args:
+        arquivos_csv: Caminhos dos arquivos, já ordenados
+        pasta_resultados: Pasta onde os arquivos processados são gravados, ou None para não gravar
+        jobs: Número de processos da segunda fase
+        manter_dados: Se True, os DataFrames processados são devolvidos
+        cache: Cache de soluções já carregado, mantido entre chamadas (opcional);
+            por padrão o cache persistente é aberto a cada chamada
+        formato: Formato dos arquivos processados ('csv' ou 'parquet')
+
+    Returns:
+        DataFrames processados por nome de arquivo (vazio se manter_dados for False)
+    """
+    # Cache de soluções compartilhado entre arquivos e execuções
+    if cache is None:
+        cache = CacheSolver(CAMINHO_CACHE_SOLVER)
+    
+    # Fase 1: reúne os puzzles distintos de todos os arquivos e resolve cada um uma única vez
+    puzzles = coletar_puzzles(arquivos_csv)
+    with Progresso('resolucao', len(puzzles), 'puzzles') as progresso:
+        solucoes = resolver_puzzles(puzzles, cache, progresso)
+    logging.info(f"{len(solucoes)} puzzles distintos resolvidos para {len(arquivos_csv)} arquivos")
+    
+    # Fase 2: processar cada arquivo usando as soluções já calculadas
+    dados = {}
+    jobs = max(1, min(jobs, len(arquivos_csv)))
+    with Progresso('processamento', len(arquivos_csv)) as progresso:
+        if jobs > 1:
+            logging.info(f"Processando arquivos com {jobs} processos")
+            dados = processar_em_paralelo(arquivos_csv, pasta_resultados, solucoes, jobs, manter_dados,
+                                          progresso, formato)
+        else:
+            for arquivo in arquivos_csv:
+                try:
+                    nome_arquivo = os.path.basename(arquivo)
+                    # Manter o nome original do arquivo, com a extensão do formato
+                    caminho_saida = (os.path.join(pasta_resultados, nome_no_formato(nome_arquivo, formato))
+                                     if pasta_resultados else None)
+                    
+                    logging.debug("Processando arquivo: %s", nome_arquivo)
+                    df = processar_arquivo(arquivo, caminho_saida, cache, solucoes)
+                    progresso.avancar(linhas=len(df))
+                    if manter_dados:
+                        dados[nome_arquivo] = df
+                    
+                except Exception as e:
+                    logging.error(f"Erro ao processar arquivo {arquivo}: {e}")
+                    progresso.avancar()
+                    continue
+    
+    try:
+        cache.salvar()
+    except (OSError, sqlite3.Error) as e:
+        logging.error(f"Erro ao salvar o cache do solver {cache.caminho}: {e}")
+    
+    logging.info("Cache do solver: %d acertos, %d falhas", cache.acertos, cache.falhas,
+                 extra=evento('cache_solver', acertos=cache.acertos, falhas=cache.falhas))
+    return dados
+
+def main(argv: Optional[List[str]] = None):
     """Função principal que processa todos os arquivos CSV."""
+    global BACKEND_SOLVER
+    parser = argparse.ArgumentParser(description="Processa os dados originais e calcula as pontuações.")
+    parser.add_argument('--jobs', type=int, default=num_cpus_disponiveis(),
+                        help="Número de processos para processar os arquivos (padrão: CPUs disponíveis); "
+                             "run_pipeline.py repassa o seu --jobs")
+    parser.add_argument('--solver', choices=BACKENDS_SOLVER, default=BACKEND_SOLVER,
+                        help="Backend de busca dos movimentos mínimos (padrão: escolhido pelo tamanho do espaço de estados)")
+    parser.add_argument('--metricas',
+                        help="Grava neste arquivo JSON as medidas de cada arquivo e os contadores do solver")
+    parser.add_argument('--nivel-log', choices=NIVEIS_LOG, default='INFO',
+                        help="Nível mínimo das mensagens de log (padrão: INFO)")
+    parser.add_argument('--eventos',
+                        help="Acrescenta a este arquivo o log de eventos em JSON lines")
+    parser.add_argument('--formato', choices=FORMATOS, default='csv',
+                        help="Formato dos arquivos processados (padrão: csv; parquet requer pyarrow)")
+    args = parser.parse_args(argv)
+    try:
+        verificar_formato(args.formato)
+    except ImportError as e:
+        parser.error(str(e))
+    BACKEND_SOLVER = args.solver
+    logging.getLogger().setLevel(args.nivel_log)
+    if args.eventos:
+        configurar_log_eventos(args.eventos)
     
     # Criar pasta de resultados se não existir
     pasta_resultados = "01_dados_processados"
-    Path(pasta_resultados).mkdir(exist_ok=True)
     
     # pasta de dados originais
     pasta_dados_originais = "dados_originais"
     Path(pasta_dados_originais).mkdir(exist_ok=True)
     
-    # Encontrar todos os arquivos CSV na pasta de dados originais
-    arquivos_csv = glob.glob(os.path.join(pasta_dados_originais, "*.csv"))
+    processar_dados_originais(pasta_dados_originais, pasta_resultados, args.jobs, formato=args.formato)
     
-    if not arquivos_csv:
-        logging.warning(f"Nenhum arquivo CSV encontrado na pasta '{pasta_dados_originais}'!")
-        return
-    
-    logging.info(f"Encontrados {len(arquivos_csv)} arquivos CSV para processar na pasta '{pasta_dados_originais}'")
-    
-    # Processar cada arquivo
-    for arquivo in arquivos_csv:
-        try:
-            nome_arquivo = os.path.basename(arquivo)
-            # Manter o nome original do arquivo
-            caminho_saida = os.path.join(pasta_resultados, nome_arquivo)
-            
-            logging.info(f"Processando arquivo: {nome_arquivo}")
-            processar_arquivo(arquivo, caminho_saida)
-            
-        except Exception as e:
-            logging.error(f"Erro ao processar arquivo {arquivo}: {e}")
-            continue
+    if args.metricas:
+        with open(args.metricas, 'w', encoding='utf-8') as f:
+            json.dump(coletar_instrumentacao(), f, indent=2, ensure_ascii=False)
     
     logging.info(f"Processamento concluído! Resultados salvos na pasta '{pasta_resultados}'")
 
@@ -0,0 +1,34 @@
+"""Configuração dos testes: caminhos de importação dos scripts e do run_pipeline e fixtures compartilhados."""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+PASTA_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_SCRIPTS = os.path.join(PASTA_RAIZ, 'scripts')
+for pasta in (PASTA_SCRIPTS, PASTA_RAIZ):
+    if pasta not in sys.path:
+        sys.path.insert(0, pasta)
+
+# Importado depois do ajuste do sys.path
+import armazenamento
+
+@pytest.fixture(params=armazenamento.FORMATOS)
+def formato(request):
+    """Formato das tabelas (CSV e Parquet); o Parquet é pulado sem o pyarrow."""
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    return request.param
+
+@pytest.fixture(scope='session')
+def run_pipeline(tmp_path_factory):
+    """Módulo run_pipeline, importado em uma pasta temporária."""
+    # O módulo cria pipeline_execution.log na pasta atual ao ser importado
+    anterior = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('pipeline'))
+    try:
+        return importlib.import_module('run_pipeline')
+    finally:
+        os.chdir(anterior)
@@ -0,0 +1,107 @@
+"""Testes de ida e volta das tabelas CSV/Parquet (armazenamento) e da tabela longa dos participantes."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import armazenamento
+import combine_user_data
+
+def tabela_exemplo():
+    return pd.DataFrame({
+        'id': ['0777', '1000', '0042'],
+        'step': [0, 1, 2],
+        'trialtime': [0.0, 1730.0, np.nan],
+        'current': ['|A|B|C|', '||AB|C|', None],
+        'done': [0, 0, 1],
+    })
+
+def test_ida_e_volta_igual_ao_csv(formato, tmp_path):
+    # Em qualquer formato, a tabela relida tem os tipos que pd.read_csv produziria
+    df = tabela_exemplo()
+    caminho = str(tmp_path / armazenamento.nome_no_formato('tabela.csv', formato))
+    armazenamento.gravar_tabela(df, caminho, descricoes=['ID', 'Passo', 'Tempo', 'Estado', 'Fim'])
+    relido = armazenamento.ler_tabela(caminho, linha_descricoes=True)
+
+    referencia = tmp_path / 'referencia.csv'
+    df.to_csv(referencia, index=False)
+    pd.testing.assert_frame_equal(relido, pd.read_csv(referencia))
+
+def test_colunas_selecionadas(formato, tmp_path):
+    caminho = str(tmp_path / armazenamento.nome_no_formato('tabela.csv', formato))
+    armazenamento.gravar_tabela(tabela_exemplo(), caminho)
+    relido = armazenamento.ler_tabela(caminho, colunas=['done', 'step', 'inexistente'])
+    assert sorted(relido.columns) == ['done', 'step']
+
+def test_inteiros(formato, tmp_path):
+    caminho = str(tmp_path / armazenamento.nome_no_formato('tabela.csv', formato))
+    armazenamento.gravar_tabela(pd.DataFrame({'a': [1.0, 2.0], 'b': [1.0, np.nan]}), caminho, inteiros=True)
+    relido = armazenamento.ler_tabela(caminho)
+    assert relido['a'].dtype == 'int64'
+    assert relido['b'].isna().tolist() == [False, True]
+
+def test_outro_formato_e_removido(tmp_path):
+    pytest.importorskip('pyarrow')
+    df = tabela_exemplo()
+    armazenamento.gravar_tabela(df, str(tmp_path / 'tabela.csv'))
+    armazenamento.gravar_tabela(df, str(tmp_path / 'tabela.parquet'))
+    assert armazenamento.arquivos_tabela(str(tmp_path), 'tabela') == [str(tmp_path / 'tabela.parquet')]
+
+def partes_exemplo():
+    return {
+        '0777': pd.DataFrame({'sessao': [0, 0, 1], 'step': [0, 1, 0], 'tempo': [0.0, 5.0, np.nan]}),
+        '1000': pd.DataFrame({'sessao': [0], 'step': [0], 'tempo': [1.0]}),
+        '0042': pd.DataFrame({'sessao': pd.Series([], dtype='int64'), 'step': pd.Series([], dtype='int64'),
+                              'tempo': pd.Series([], dtype='float64')}),
+    }
+
+def test_particionada(formato, tmp_path):
+    partes = partes_exemplo()
+    caminho = str(tmp_path / armazenamento.nome_no_formato('partes.csv', formato))
+    armazenamento.gravar_particionada(partes, caminho, descricoes=['Sessão', 'Passo', 'Tempo'])
+
+    # Cada parte, lida isoladamente e na ordem pedida; chaves ausentes são ignoradas
+    lidas = dict(armazenamento.ler_particoes(caminho, ['1000', '0777', '9999']))
+    assert list(lidas) == ['1000', '0777']
+    assert lidas['0777']['step'].tolist() == [0, 1, 0]
+    assert lidas['0777']['tempo'].isna().tolist() == [False, False, True]
+    assert lidas['1000']['tempo'].tolist() == [1.0]
+    assert len(dict(armazenamento.ler_particoes(caminho))['0042']) == 0
+
+    # A tabela inteira, com o número de linhas de cada parte na ordem de gravação
+    df, linhas = armazenamento.ler_particionada(caminho, linha_descricoes=True)
+    assert linhas == {'0777': 3, '1000': 1, '0042': 0}
+    assert df['step'].tolist() == [0, 1, 0, 0]
+
+def test_indice_inconsistente(tmp_path):
+    caminho = str(tmp_path / 'partes.csv')
+    armazenamento.gravar_particionada(partes_exemplo(), caminho)
+    with open(armazenamento.caminho_indice(caminho), encoding='utf-8') as f:
+        indice = json.load(f)
+    indice['partes']['1000']['linhas'] = 2
+    with open(armazenamento.caminho_indice(caminho), 'w', encoding='utf-8') as f:
+        json.dump(indice, f)
+    with pytest.raises(ValueError):
+        armazenamento.ler_particionada(caminho)
+
+def test_tabela_longa_preserva_ids_com_zeros(formato, tmp_path):
+    sessao = pd.DataFrame({'trial': [0, 0], 'step': [0, 1], 'done': [0, 1]})
+    frames = {user_id: combine_user_data.build_long_frame(user_id, {'0': sessao, '1': sessao, '2': sessao})
+              for user_id in ['0777', '1000']}
+    pasta = str(tmp_path)
+    combine_user_data.save_long_store(frames, pasta, formato)
+
+    long_df, ids = combine_user_data.read_long_store_table(pasta)
+    assert ids == ['0777', '1000']
+    assert long_df['participante'].tolist() == ['0777'] * 6 + ['1000'] * 6
+    assert long_df['sessao'].tolist() == [0, 0, 1, 1, 2, 2] * 2
+
+    por_participante = dict(combine_user_data.read_long_store(pasta, ['1000', '0777']))
+    assert list(por_participante) == ['1000', '0777']
+    assert set(por_participante['0777']['participante']) == {'0777'}
+
+def test_tabela_longa_ausente(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        combine_user_data.read_long_store_table(str(tmp_path))
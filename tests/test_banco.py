@@ -0,0 +1,91 @@
+"""Testes do banco SQLite dos participantes (banco_participantes)."""
+
+import os
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import armazenamento
+import banco_participantes as banco
+import process_all_files as paf
+
+CABECALHO = "sub,trial,size,current,end,step,reset,tries,score,abstime,trialtime,clicktime,done"
+
+def escrever_processado(pasta, participante, sessao, formato):
+    """Processa um arquivo bruto com um trial de dois movimentos e grava em pasta."""
+    bruto = pasta.parent / f"T{sessao}_{participante}_Tol.csv"
+    bruto.write_text("\n".join([CABECALHO] + [
+        f"{participante},0,3,{atual},||A|CB|,{passo},0,1,0,0,{passo * 1000},0,{int(passo == 2)}"
+        for passo, atual in enumerate(['|A|B|C|', '||AB|C|', '||A|CB|'])
+    ]) + "\n")
+    saida = str(pasta / armazenamento.nome_no_formato(bruto.name, formato))
+    paf.processar_arquivo(str(bruto), saida)
+    return saida
+
+def escrever_analises(pasta, ids, formato):
+    colunas = {'id': ids}
+    for sessao in (0, 1, 2):
+        colunas[f'Total_Movimentos_T{sessao}'] = [2] * len(ids)
+    df = pd.DataFrame(colunas)
+    caminho = str(pasta / armazenamento.nome_no_formato('todos_usuarios_analises.csv', formato))
+    armazenamento.gravar_tabela(df, caminho, descricoes=list(df.columns))
+
+@pytest.fixture
+def pastas(tmp_path):
+    processados, analises = tmp_path / '01_dados_processados', tmp_path / '03_analises_combinadas'
+    processados.mkdir()
+    analises.mkdir()
+    return processados, analises
+
+def consultar(caminho, sql):
+    conexao = sqlite3.connect(caminho)
+    try:
+        return conexao.execute(sql).fetchall()
+    finally:
+        conexao.close()
+
+def test_id_com_zeros_a_esquerda_une_as_tres_tabelas(formato, pastas, tmp_path):
+    processados, analises = pastas
+    escrever_processado(processados, '0777', 0, formato)
+    escrever_analises(analises, ['0777'], formato)
+    caminho = str(tmp_path / 'participantes.sqlite')
+
+    contagens = banco.criar_banco(caminho, str(processados), str(analises))
+
+    assert contagens == {'movimentos': 3, 'trials': 1, 'metricas_sessao': 3}
+    assert consultar(caminho, """
+        SELECT m.participante, COUNT(*), t.movimentos, s.total_movimentos
+        FROM movimentos m
+        JOIN trials t ON t.participante = m.participante AND t.sessao = m.sessao
+        JOIN metricas_sessao s ON s.participante = m.participante AND s.sessao = m.sessao
+        GROUP BY m.participante""") == [('0777', 3, 2, 2.0)]
+    assert not os.path.exists(caminho + '.tmp')
+
+def test_arquivo_repetido_e_ignorado(pastas, tmp_path, caplog):
+    processados, analises = pastas
+    original = escrever_processado(processados, '1000', 0, 'csv')
+    # Uma segunda cópia da mesma sessão, com outro nome no padrão T[n]_[ID]
+    shutil.copy(original, processados / 'T0_1000_Tol_copia.csv')
+    escrever_analises(analises, ['1000'], 'csv')
+    caminho = str(tmp_path / 'participantes.sqlite')
+
+    contagens = banco.criar_banco(caminho, str(processados), str(analises))
+
+    assert contagens['movimentos'] == 3
+    assert consultar(caminho, "SELECT DISTINCT participante, sessao FROM movimentos") == [('1000', 0)]
+    assert 'T0_1000_Tol_copia.csv' in caplog.text
+    assert 'T0_1000_Tol.csv' in caplog.text
+
+def test_reconstrucao_substitui_o_banco(pastas, tmp_path):
+    processados, analises = pastas
+    escrever_processado(processados, '1000', 0, 'csv')
+    caminho = str(tmp_path / 'participantes.sqlite')
+    banco.criar_banco(caminho, str(processados), str(analises))
+
+    escrever_processado(processados, '1000', 1, 'csv')
+    contagens = banco.criar_banco(caminho, str(processados), str(analises))
+
+    assert contagens == {'movimentos': 6, 'trials': 2, 'metricas_sessao': 0}
+    assert consultar(caminho, "SELECT sessao, COUNT(*) FROM movimentos GROUP BY sessao") == [(0, 3), (1, 3)]
@@ -0,0 +1,91 @@
+"""Testes do cache persistente de movimentos mínimos (CacheSolver)."""
+
+import os
+import sqlite3
+
+import process_all_files as paf
+
+def test_ida_e_volta(tmp_path):
+    caminho = str(tmp_path / 'cache.sqlite')
+    cache = paf.CacheSolver(caminho)
+    assert cache.obter('|A|B|C|', '||A|CB|', 3) is None
+    cache.guardar('|A|B|C|', '||A|CB|', 3, 4)
+    cache.salvar()
+
+    relido = paf.CacheSolver(caminho)
+    assert relido.obter('|A|B|C|', '||A|CB|', 3) == 4
+    assert relido.obter('|A|B|C|', '||A|CB|', 2) is None
+    assert (relido.acertos, relido.falhas) == (1, 1)
+
+def test_descarta_o_menos_usado(tmp_path):
+    caminho = str(tmp_path / 'cache.sqlite')
+    cache = paf.CacheSolver(caminho, capacidade=2)
+    cache.guardar('a', 'x', 3, 1)
+    cache.guardar('b', 'x', 3, 2)
+    cache.obter('a', 'x', 3)
+    cache.guardar('c', 'x', 3, 3)
+    cache.salvar()
+
+    relido = paf.CacheSolver(caminho, capacidade=2)
+    assert relido.obter('b', 'x', 3) is None
+    assert relido.obter('a', 'x', 3) == 1
+    assert relido.obter('c', 'x', 3) == 3
+
+def test_acertos_nao_regravam_o_arquivo(tmp_path):
+    caminho = str(tmp_path / 'cache.sqlite')
+    cache = paf.CacheSolver(caminho)
+    cache.guardar('a', 'x', 3, 1)
+    cache.guardar('b', 'x', 3, 2)
+    cache.salvar()
+    inode = os.stat(caminho).st_ino
+
+    cache = paf.CacheSolver(caminho)
+    assert cache.obter('a', 'x', 3) == 1
+    cache.salvar()
+    assert os.stat(caminho).st_ino == inode
+    assert not os.path.exists(f"{caminho}.tmp")
+
+    # A ordem de uso é atualizada no próprio arquivo: 'a' passa a ser a mais recente
+    conexao = sqlite3.connect(caminho)
+    ordem = [linha[0] for linha in conexao.execute("SELECT inicio FROM solucoes ORDER BY uso")]
+    conexao.close()
+    assert ordem == ['b', 'a']
+
+def test_versao_diferente_e_ignorada(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'cache.sqlite')
+    cache = paf.CacheSolver(caminho)
+    cache.guardar('a', 'x', 3, 1)
+    cache.salvar()
+
+    monkeypatch.setattr(paf, 'VERSAO_CACHE_SOLVER', paf.VERSAO_CACHE_SOLVER + 1)
+    assert paf.CacheSolver(caminho).obter('a', 'x', 3) is None
+
+def test_arquivo_sem_versao_e_ignorado(tmp_path):
+    caminho = str(tmp_path / 'cache.sqlite')
+    conexao = sqlite3.connect(caminho)
+    conexao.execute("CREATE TABLE solucoes (inicio TEXT, objetivo TEXT, tamanho INTEGER, "
+                    "movimentos INTEGER, uso INTEGER)")
+    conexao.execute("INSERT INTO solucoes VALUES ('a', 'x', 3, 1, 0)")
+    conexao.commit()
+    conexao.close()
+    assert paf.CacheSolver(caminho).obter('a', 'x', 3) is None
+
+def test_limpar(tmp_path):
+    caminho = str(tmp_path / 'cache.sqlite')
+    cache = paf.CacheSolver(caminho)
+    cache.guardar('a', 'x', 3, 1)
+    cache.salvar()
+    cache.limpar()
+    assert not os.path.exists(caminho)
+    assert cache.obter('a', 'x', 3) is None
+
+def test_sem_intermediarios_nao_cria_a_pasta_processados(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bruto = tmp_path / 'T0_1000_Tol.csv'
+    bruto.write_text("sub,trial,size,current,end,step,reset,tries,score,abstime,trialtime,clicktime,done\n"
+                     "1000,0,3,|A|B|C|,||A|CB|,0,0,1,0,0,0,0,0\n"
+                     "1000,0,3,||AB|C|,||A|CB|,1,0,1,0,0,0,0,0\n"
+                     "1000,0,3,||A|CB|,||A|CB|,2,0,1,0,0,0,0,1\n")
+    paf.processar_arquivos([str(bruto)], None, jobs=1)
+    assert os.path.exists(paf.CAMINHO_CACHE_SOLVER)
+    assert not os.path.exists('01_dados_processados')
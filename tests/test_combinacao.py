@@ -0,0 +1,40 @@
+"""Testes da combinação em lotes (combine_in_batches): isolamento de falhas por participante."""
+
+import logging
+import os
+
+import pandas as pd
+import pytest
+
+import combine_user_data
+
+USUARIOS = ['0777', '1000', '1001']
+
+@pytest.fixture
+def arquivos(tmp_path):
+    sessao = pd.DataFrame({'sub': [1, 1], 'trial': [0, 0], 'step': [0, 1], 'done': [0, 1]})
+    for user_id in USUARIOS:
+        for test_num in '012':
+            sessao.to_csv(tmp_path / f"T{test_num}_{user_id}_Tol.csv", index=False)
+    # Um arquivo ilegível: o caminho existe no agrupamento, mas é uma pasta
+    os.remove(tmp_path / "T1_1000_Tol.csv")
+    (tmp_path / "T1_1000_Tol.csv").mkdir()
+    return combine_user_data.group_files_by_user(
+        {nome: str(tmp_path / nome) for nome in sorted(os.listdir(tmp_path))})
+
+@pytest.mark.parametrize('layout', combine_user_data.LAYOUTS)
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_arquivo_ilegivel_ignora_apenas_o_participante(arquivos, tmp_path, monkeypatch, caplog, layout, jobs):
+    # Lotes de 2 usuários: com jobs=2 o usuário com erro divide o lote com outro
+    monkeypatch.setattr(combine_user_data, 'READ_BATCH_SIZE', 2)
+    saida = tmp_path / 'saida'
+    saida.mkdir()
+    with caplog.at_level(logging.INFO):
+        long_frames = combine_user_data.combine_in_batches(arquivos, str(saida), 'csv', layout, jobs)
+
+    if layout == 'longo':
+        assert list(long_frames) == ['0777', '1001']
+    else:
+        assert sorted(os.listdir(saida)) == ['0777_combined.csv', '1001_combined.csv']
+    erros = [registro.getMessage() for registro in caplog.records if registro.levelno == logging.ERROR]
+    assert len(erros) == 1 and 'Usuário 1000 ignorado' in erros[0]
@@ -0,0 +1,56 @@
+"""Testes da detecção de etapas travadas (ProgressMonitor) e dos pulsos do canal de progresso."""
+
+import json
+import os
+import time
+
+import pytest
+
+import eventos
+
+def esperar_motivo(monitor, segundos):
+    """Chama check até ele indicar um motivo ou o tempo acabar."""
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        motivo = monitor.check()
+        if motivo:
+            return motivo
+        time.sleep(0.01)
+    return None
+
+def test_tempo_de_cpu_do_processo_atual(run_pipeline):
+    cpu = run_pipeline.process_tree_cpu_seconds(os.getpid())
+    if cpu is None:
+        pytest.skip("/proc não disponível")
+    assert cpu > 0
+    assert run_pipeline.process_tree_cpu_seconds(2 ** 22 + 1) is None
+
+def test_etapa_parada_e_encerrada(run_pipeline, tmp_path):
+    canal = tmp_path / 'progresso.jsonl'
+    canal.touch()
+    monitor = run_pipeline.ProgressMonitor(str(canal), 'teste', stall_timeout=0.2, cpu_seconds=lambda: 1.0)
+    assert esperar_motivo(monitor, 2).startswith('travada')
+
+def test_etapa_usando_cpu_continua(run_pipeline, tmp_path):
+    canal = tmp_path / 'progresso.jsonl'
+    canal.touch()
+    inicio = time.monotonic()
+    monitor = run_pipeline.ProgressMonitor(str(canal), 'teste', stall_timeout=0.2,
+                                           cpu_seconds=lambda: time.monotonic() - inicio)
+    assert esperar_motivo(monitor, 0.8) is None
+
+def test_pulsos_mantem_a_etapa_ativa(run_pipeline, tmp_path, monkeypatch):
+    canal = tmp_path / 'progresso.jsonl'
+    monkeypatch.setenv(eventos.VARIAVEL_PROGRESSO, str(canal))
+    monkeypatch.setattr(eventos, 'INTERVALO_PROGRESSO', 0.05)
+    with eventos.Progresso('fase', 10):
+        pass
+    monitor = run_pipeline.ProgressMonitor(str(canal), 'teste', stall_timeout=0.3)
+    limite = time.monotonic() + 1.0
+    while time.monotonic() < limite:
+        eventos.pulsar()
+        assert monitor.check() is None
+        time.sleep(0.01)
+    # Os pulsos não substituem a última mensagem de progresso
+    assert monitor.progress['fase'] == 'fase'
+    assert any('pulso' in json.loads(linha) for linha in canal.read_text().splitlines())
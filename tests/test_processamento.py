@@ -0,0 +1,46 @@
+"""Testes do processamento de um arquivo bruto do PEBL (processar_arquivo)."""
+
+import pandas as pd
+
+import process_all_files as paf
+
+CABECALHO = "sub,trial,size,current,end,step,reset,tries,score,abstime,trialtime,clicktime,done"
+
+def escrever_bruto(caminho, linhas):
+    caminho.write_text("\n".join([CABECALHO] + [
+        f"1000,{trial},3,{atual},{objetivo},{passo},0,1,0,0,0,0,{concluido}"
+        for trial, atual, objetivo, passo, concluido in linhas
+    ]) + "\n")
+
+def test_trial_com_inicio_invalido_fica_sem_classificacao(tmp_path):
+    caminho = tmp_path / "T0_1000_Tol.csv"
+    escrever_bruto(caminho, [
+        (0, '|A|B|C|', '||A|CB|', 0, 0),
+        (0, '||AB|C|', '||A|CB|', 1, 0),
+        (0, '||A|CB|', '||A|CB|', 2, 1),
+        # step == 0 inválido: as linhas seguintes não pertencem ao trial anterior
+        (1, 'A|B|C', '|A|B|C|', 0, 0),
+        (1, '||AB|C|', '|A|B|C|', 1, 0),
+        (1, '|A|B|C|', '|A|B|C|', 2, 0),
+    ])
+    df = paf.processar_arquivo(str(caminho), None)
+
+    assert list(df['distancia_objetivo'][:3]) == [2, 1, 0]
+    assert list(df['tipo_movimento'][:3]) == ['', 'otimo', 'otimo']
+    assert list(df['distancia_objetivo'][3:]) == [-1, -1, -1]
+    assert list(df['tipo_movimento'][3:]) == ['', '', '']
+    assert df['movimentos_minimos'][3] == -1
+
+def test_saida_gravada_e_relida(tmp_path):
+    caminho = tmp_path / "T0_1000_Tol.csv"
+    escrever_bruto(caminho, [
+        (0, '|A|B|C|', '||A|CB|', 0, 0),
+        (0, '||AB|C|', '||A|CB|', 1, 0),
+        (0, '||A|CB|', '||A|CB|', 2, 1),
+    ])
+    saida = tmp_path / "saida.csv"
+    df = paf.processar_arquivo(str(caminho), str(saida))
+    relido = pd.read_csv(saida)
+    assert list(relido.columns) == list(df.columns)
+    assert relido['movimentos_minimos'].iloc[-1] == 2
+    assert relido['pontuacao_acumulada'].iloc[-1] == df['pontuacao_acumulada'].iloc[-1]
@@ -0,0 +1,133 @@
+"""
+Compara os backends de movimentos_minimos com uma BFS simples sobre
+movimentos_possiveis, a busca original do processamento, em puzzles sorteados
+com semente fixa.
+"""
+
+import random
+from collections import deque
+
+import pytest
+
+import process_all_files as paf
+
+SEMENTE = 20240601
+CAPACIDADES_TOL = (1, 2, 3)  # Torre de Londres padrão: pinos de alturas 1, 2 e 3
+
+def bfs_referencia(inicial, objetivo, capacidades):
+    """Movimentos mínimos por BFS sobre movimentos_possiveis (-1 se inalcançável)."""
+    alvo = paf.estado_para_tupla(objetivo)
+    visitados = {paf.estado_para_tupla(inicial)}
+    fila = deque([(inicial, 0)])
+    while fila:
+        estado, passos = fila.popleft()
+        if paf.estado_para_tupla(estado) == alvo:
+            return passos
+        for proximo in paf.movimentos_possiveis(estado, list(capacidades)):
+            chave = paf.estado_para_tupla(proximo)
+            if chave not in visitados:
+                visitados.add(chave)
+                fila.append((proximo, passos + 1))
+    return -1
+
+def estado_aleatorio(rng, bolas, capacidades):
+    """Distribui as bolas, em ordem aleatória, entre pinos com as capacidades dadas."""
+    while True:
+        ordem = rng.sample(bolas, len(bolas))
+        pinos = [[] for _ in capacidades]
+        for bola in ordem:
+            livres = [i for i, capacidade in enumerate(capacidades) if len(pinos[i]) < capacidade]
+            pinos[rng.choice(livres)].append(bola)
+        return pinos
+
+def puzzles_sorteados(quantidade, bolas, capacidades):
+    rng = random.Random(SEMENTE + len(bolas) + sum(capacidades))
+    return [(estado_aleatorio(rng, bolas, capacidades), estado_aleatorio(rng, bolas, capacidades))
+            for _ in range(quantidade)]
+
+CONFIGURACOES = [
+    (['A', 'B', 'C'], CAPACIDADES_TOL),
+    (['A', 'B', 'C'], (3, 3, 3)),
+    (['A', 'B', 'C', 'D'], (2, 3, 4)),
+    (['A', 'A', 'B', 'C'], (4, 4, 4)),
+]
+
+@pytest.mark.parametrize('backend', ['tabela', 'bidirecional', 'astar', 'auto'])
+@pytest.mark.parametrize('bolas, capacidades', CONFIGURACOES)
+def test_backends_iguais_a_bfs(backend, bolas, capacidades):
+    for inicial, objetivo in puzzles_sorteados(40, bolas, capacidades):
+        esperado = bfs_referencia(inicial, objetivo, capacidades)
+        obtido = paf.movimentos_minimos([list(p) for p in inicial], [list(p) for p in objetivo],
+                                        list(capacidades), backend=backend)
+        assert obtido == esperado, (inicial, objetivo)
+
+@pytest.mark.parametrize('backend', ['tabela', 'bidirecional', 'astar'])
+def test_puzzles_impossiveis(backend):
+    # Bolas diferentes, pino acima da capacidade e número de bolas diferente
+    assert paf.movimentos_minimos([['A'], ['B'], ['C']], [['A'], ['B'], ['D']], 3, backend) == -1
+    assert paf.movimentos_minimos([['A', 'B'], ['C'], []], [['A'], ['B'], ['C']], [1, 2, 3], backend) == -1
+    assert paf.movimentos_minimos([['A'], ['B'], []], [['A'], ['B'], ['C']], 3, backend) == -1
+
+def test_estado_igual_ao_objetivo():
+    assert paf.movimentos_minimos([['A'], ['B', 'C'], []], [['A'], ['B', 'C'], []], 3) == 0
+
+def test_resolver_puzzle_a_partir_das_strings():
+    # Mesmo formato das colunas current/end do PEBL
+    esperado = bfs_referencia([['A'], ['B'], ['C']], [[], ['A'], ['C', 'B']], (3, 3, 3))
+    assert paf.resolver_puzzle('|A|B|C|', '||A|CB|', 3) == esperado
+    with pytest.raises(paf.EstadoInvalidoError):
+        paf.resolver_puzzle('A|B|C', '|A|B|C|', 3)
+
+@pytest.mark.parametrize('bolas, capacidades', CONFIGURACOES)
+def test_grafo_csr_igual_a_movimentos_possiveis(bolas, capacidades):
+    tabela = paf.obter_tabela_distancias(tuple(bolas), capacidades)
+    assert len(tabela.estados) == paf.contar_estados(bolas, capacidades)
+    for indice, estado in enumerate(tabela.estados):
+        vizinhos = {tabela.destinos[k] for k in range(tabela.inicio[indice], tabela.inicio[indice + 1])}
+        esperados = {tabela.indices[paf.empacotar_estado(proximo)]
+                     for proximo in paf.movimentos_possiveis([list(p) for p in estado], list(capacidades))}
+        assert vizinhos == esperados
+
+def test_distancias_da_tabela_simetricas():
+    # Todo movimento pode ser desfeito, então a distância de a até b é igual à de b até a
+    tabela = paf.obter_tabela_distancias(('A', 'B', 'C'), CAPACIDADES_TOL)
+    rng = random.Random(SEMENTE)
+    for _ in range(50):
+        a, b = rng.randrange(len(tabela.estados)), rng.randrange(len(tabela.estados))
+        assert tabela.linha(a)[b] == tabela.linha(b)[a]
+
+def caminhos_forca_bruta(inicial, objetivo, capacidades, comprimento):
+    """Enumera todas as sequências de movimentos com o comprimento dado que terminam no objetivo."""
+    alvo = paf.estado_para_tupla(objetivo)
+    if comprimento == 0:
+        return int(paf.estado_para_tupla(inicial) == alvo)
+    return sum(caminhos_forca_bruta(proximo, objetivo, capacidades, comprimento - 1)
+               for proximo in paf.movimentos_possiveis(inicial, list(capacidades)))
+
+@pytest.mark.parametrize('bolas, capacidades', CONFIGURACOES[:3])
+def test_caminhos_otimos_iguais_a_forca_bruta(bolas, capacidades):
+    testados = 0
+    for inicial, objetivo in puzzles_sorteados(40, bolas, capacidades):
+        distancia = bfs_referencia(inicial, objetivo, capacidades)
+        if not 0 < distancia <= 6:
+            continue
+        testados += 1
+        primeiros = [proximo for proximo in paf.movimentos_possiveis(inicial, list(capacidades))
+                     if caminhos_forca_bruta(proximo, objetivo, capacidades, distancia - 1)]
+        esperado = (caminhos_forca_bruta(inicial, objetivo, capacidades, distancia), len(primeiros))
+        assert paf.caminhos_otimos(inicial, objetivo, capacidades) == esperado, (inicial, objetivo)
+    assert testados >= 10
+
+def test_caminhos_otimos_casos_especiais():
+    assert paf.caminhos_otimos([['A'], ['B'], ['C']], [['A'], ['B'], ['C']], 3) == (1, 0)
+    # Inalcançável: -1, como em movimentos_minimos
+    assert paf.caminhos_otimos([['A'], ['B'], ['C']], [['A'], ['B'], ['D']], 3) == (-1, -1)
+    assert paf.caminhos_otimos([['A', 'B'], ['C'], []], [['A'], ['B'], ['C']], [1, 2, 3]) == (-1, -1)
+
+def test_caminhos_otimos_truncados(monkeypatch):
+    inicial, objetivo, num_caminhos, primeiros = next(
+        (inicial, objetivo, *contagem) for inicial, objetivo in puzzles_sorteados(40, ['A', 'B', 'C'], (3, 3, 3))
+        for contagem in [paf.caminhos_otimos(inicial, objetivo, 3)] if contagem[0] > 1
+    )
+    monkeypatch.setattr(paf, 'LIMITE_CAMINHOS_OTIMOS', 1)
+    assert paf.caminhos_otimos(inicial, objetivo, 3) == (1, primeiros)
@@ -0,0 +1,70 @@
+"""Testes do modo watch quando o script de uma etapa é alterado durante a execução."""
+
+import argparse
+import os
+import shutil
+import signal
+import sys
+
+import pytest
+
+@pytest.fixture
+def scripts(run_pipeline, tmp_path, monkeypatch):
+    """Cópia dos scripts das etapas, usada no lugar da pasta scripts."""
+    pasta = tmp_path / 'scripts'
+    pasta.mkdir()
+    for script in run_pipeline.REQUIRED_SCRIPTS:
+        shutil.copy(os.path.join(run_pipeline.SCRIPTS_FOLDER, script), pasta / script)
+    monkeypatch.setattr(run_pipeline, 'SCRIPTS_FOLDER', str(pasta))
+    monkeypatch.setattr(run_pipeline, 'LOADED_SCRIPT_HASHES', {})
+    monkeypatch.setattr(sys, 'path', list(sys.path))
+    return pasta
+
+def alterar(caminho):
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write("\n# alterado\n")
+
+def test_manifesto_registra_o_codigo_importado(run_pipeline, scripts):
+    script = scripts / 'process_all_files.py'
+    original = run_pipeline.file_hash(str(script))
+    run_pipeline.import_stage('process_all_files')
+    alterar(script)
+
+    manifest = run_pipeline.empty_manifest()
+    run_pipeline.invalidate_changed_scripts(manifest)
+    assert manifest['scripts']['process_all_files.py'] == original
+    assert manifest['scripts']['anova.py'] == run_pipeline.file_hash(str(scripts / 'anova.py'))
+    assert run_pipeline.changed_loaded_scripts() == ['process_all_files.py']
+
+def test_watch_encerra_quando_um_script_muda(run_pipeline, scripts, tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / run_pipeline.RAW_FOLDER).mkdir()
+    (tmp_path / run_pipeline.RAW_FOLDER / 'T0_1000_Tol.csv').write_text("sub\n1000\n")
+    monkeypatch.setattr(run_pipeline, 'WATCH_INTERVAL', 0.01)
+    monkeypatch.setattr(run_pipeline, 'WATCH_DEBOUNCE', 0.0)
+    monkeypatch.setattr(signal, 'signal', lambda *args: None)
+
+    ciclos = []
+    def run_steps(pipeline_steps, args, warm_state, report):
+        # O script é editado enquanto o primeiro ciclo executa
+        ciclos.append(report['ciclo'])
+        alterar(scripts / 'process_all_files.py')
+        return len(pipeline_steps)
+    monkeypatch.setattr(run_pipeline, 'run_steps', run_steps)
+
+    # Sem a verificação dos scripts o watch não terminaria: encerra após algumas verificações da pasta
+    verificacoes = []
+    snapshot_folder = run_pipeline.snapshot_folder
+    def snapshot_limitado(folder):
+        verificacoes.append(folder)
+        if len(verificacoes) > 50:
+            raise KeyboardInterrupt
+        return snapshot_folder(folder)
+    monkeypatch.setattr(run_pipeline, 'snapshot_folder', snapshot_limitado)
+
+    args = argparse.Namespace(watch=True, stream=False, incremental=True, in_process=True, force=False,
+                              format='csv', layout='largo')
+    assert run_pipeline.watch([], args) is False
+    assert ciclos == [1]
+    assert "process_all_files.py" in caplog.text
+    assert "reinicie o --watch" in caplog.text